@@ -2,19 +2,21 @@
 chcp 65001 >nul
 
 set "BATCH_DIR=%~dp0"
+set "PYTHON_PATH=%BATCH_DIR%runtime\conda_env\python.exe"
 cd "%BATCH_DIR%runtime\conda_env\Scripts"
 
 title 一键更新依赖
 
 echo 开始更新主服务依赖...
-pip install -r "../../../src/main/xiaozhi-server/requirements.txt" -i https://pypi.tuna.tsinghua.edu.cn/simple/
+REM requirements.txt和Python版本未变化时会跳过安装，加上 --force 可强制重新安装
+"%PYTHON_PATH%" "%BATCH_DIR%scripts\step_cache.py" pip "../../../src/main/xiaozhi-server/requirements.txt" -i https://pypi.tuna.tsinghua.edu.cn/simple/
 cls
 echo 主服务依赖更新成功！
 
 REM 检测音乐服务目录（修正路径格式）
 if exist "%BATCH_DIR%src\main\music-xiaozhi-server\" (
     echo 发现音乐服务端目录，开始更新音乐服务依赖...
-    pip install -r "../../../src/main/music-xiaozhi-server/requirements.txt" -i https://pypi.tuna.tsinghua.edu.cn/simple/
+    "%PYTHON_PATH%" "%BATCH_DIR%scripts\step_cache.py" pip "../../../src/main/music-xiaozhi-server/requirements.txt" -i https://pypi.tuna.tsinghua.edu.cn/simple/
     cls
     echo 音乐服务依赖更新成功！
 ) else (
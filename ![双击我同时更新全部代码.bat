@@ -0,0 +1,9 @@
+@echo off
+chcp 65001 >nul
+
+set "BATCH_DIR=%~dp0"
+set "PYTHON_PATH=%BATCH_DIR%runtime\conda_env\python.exe"
+title 小智AI一键包全部代码更新脚本
+"%PYTHON_PATH%" "%BATCH_DIR%scripts\update_all.py"
+echo 全部代码更新完毕！请按回车键退出...
+pause
\ No newline at end of file
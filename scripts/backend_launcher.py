@@ -0,0 +1,164 @@
+import os
+import glob
+import json
+import time
+import shutil
+import subprocess
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+backend_dir = os.path.join(base_dir, 'src', 'main', 'manager-api')
+# 解压后的jar和CDS归档存放目录
+APP_DIR = os.path.join(base_dir, 'data', 'manager-api')
+# 各启动方式的就绪耗时记录
+READY_TIMES_FILE = os.path.join(base_dir, 'data', '.backend_ready_times.json')
+# 每种方式保留的记录条数
+READY_TIMES_KEEP = 10
+# 动态CDS归档：由一次正常退出的训练运行生成
+ARCHIVE_FILE = os.path.join(APP_DIR, 'manager-api.jsa')
+# 训练运行的超时（秒）
+TRAINING_TIMEOUT = 300
+
+# 默认JVM参数：管理后台并发很低，使用Serial GC和C1编译器换取更快的启动和更小的内存
+DEFAULT_JAVA_OPTIONS = [
+    "-Xms256m",
+    "-Xmx1g",
+    "-XX:+UseSerialGC",
+    "-XX:TieredStopAtLevel=1",
+    "-Xss512k",
+    "-Dfile.encoding=UTF-8",
+]
+
+
+def find_packaged_jar():
+    """查找mvn package生成的可执行jar"""
+    candidates = [
+        path for path in glob.glob(os.path.join(backend_dir, 'target', '*.jar'))
+        if not path.endswith(('-sources.jar', '-javadoc.jar', '-plain.jar'))
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getsize)
+
+
+def prepare_app(jar_path):
+    """
+    把Spring Boot可执行jar解压为“主jar + lib目录”的形式
+
+    AppCDS只能归档从普通classpath加载的类，嵌套在fat jar中的依赖无法归档，
+    所以优先使用Spring Boot 3.3+的 jarmode=tools 解压；不支持时直接使用原jar。
+    返回实际用于启动的jar路径。
+    """
+    extract_dir = os.path.join(APP_DIR, 'app')
+    if os.path.exists(extract_dir):
+        shutil.rmtree(extract_dir, ignore_errors=True)
+    os.makedirs(APP_DIR, exist_ok=True)
+    # 新jar意味着旧的CDS归档已失效
+    for archive in glob.glob(os.path.join(APP_DIR, '*.jsa')):
+        os.remove(archive)
+
+    result = subprocess.run(
+        ['java', '-Djarmode=tools', '-jar', jar_path, 'extract', '--destination', extract_dir],
+        capture_output=True, text=True, errors='replace'
+    )
+    extracted_jar = os.path.join(extract_dir, os.path.basename(jar_path))
+    if result.returncode == 0 and os.path.exists(extracted_jar):
+        print("已解压后端jar，CDS归档可以覆盖全部依赖类")
+        return extracted_jar
+    print("当前Spring Boot版本不支持jarmode=tools解压，将直接使用可执行jar（CDS仅覆盖JDK和启动器类）")
+    return jar_path
+
+
+def get_app_jar():
+    """返回用于启动的jar路径（优先解压后的jar）"""
+    jar_path = find_packaged_jar()
+    if jar_path is None:
+        return None
+    extracted_jar = os.path.join(APP_DIR, 'app', os.path.basename(jar_path))
+    return extracted_jar if os.path.exists(extracted_jar) else jar_path
+
+
+def build_java_command(java_options=None):
+    """
+    生成以java -jar启动后端的命令
+
+    CDS归档存在时（见ensure_cds_archive）通过 -XX:SharedArchiveFile 复用，不存在时正常启动。
+    """
+    jar_path = get_app_jar()
+    if jar_path is None:
+        raise FileNotFoundError("未找到后端jar，请先执行打包")
+    options = list(java_options or DEFAULT_JAVA_OPTIONS)
+    if os.path.exists(ARCHIVE_FILE):
+        options.append(f'-XX:SharedArchiveFile={ARCHIVE_FILE}')
+    return 'java ' + ' '.join(f'"{opt}"' if ' ' in opt else opt for opt in options) + f' -jar "{jar_path}"'
+
+
+def ensure_cds_archive(java_options=None):
+    """
+    没有CDS归档时做一次训练运行生成归档，返回归档是否可用
+
+    动态归档只在JVM正常退出时写入，而启动器用taskkill结束后端、用户也常直接关闭窗口，
+    所以不能依赖服务本身退出时生成（-XX:+AutoCreateSharedArchive）。训练运行使用
+    -XX:ArchiveClassesAtExit，并通过Spring的 spring.context.exit=onRefresh 在上下文刷新完成后
+    以System.exit正常退出（不启动Web服务器，不占用端口）。训练时需要连接数据库，应在MySQL和Redis就绪后调用。
+    """
+    if os.path.exists(ARCHIVE_FILE):
+        return True
+    jar_path = get_app_jar()
+    if jar_path is None:
+        return False
+    print("正在生成后端CDS归档（每次打包后只需一次）...")
+    # 先写入临时文件，训练中断时不会留下不完整的归档
+    tmp_archive = ARCHIVE_FILE + '.tmp'
+    if os.path.exists(tmp_archive):
+        os.remove(tmp_archive)
+    args = ['java'] + list(java_options or DEFAULT_JAVA_OPTIONS) + [
+        f'-XX:ArchiveClassesAtExit={tmp_archive}', '-Dspring.context.exit=onRefresh', '-jar', jar_path]
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(args, cwd=APP_DIR, capture_output=True, text=True, errors='replace', timeout=TRAINING_TIMEOUT)
+        ok = result.returncode == 0 and os.path.exists(tmp_archive)
+    except (OSError, subprocess.TimeoutExpired):
+        result, ok = None, False
+    if not ok:
+        if os.path.exists(tmp_archive):
+            os.remove(tmp_archive)
+        lines = (result.stdout + result.stderr).strip().splitlines() if result else []
+        print("⚠️ 生成CDS归档失败，本次不使用CDS启动" + (f"：{lines[-1]}" if lines else ""))
+        return False
+    os.replace(tmp_archive, ARCHIVE_FILE)
+    print(f"CDS归档已生成，用时 {time.perf_counter() - start:.1f} 秒")
+    return True
+
+
+def record_ready_time(mode, seconds):
+    """记录一次后端从启动到就绪的耗时"""
+    try:
+        with open(READY_TIMES_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    history = data.get(mode, [])
+    history.append({'seconds': round(seconds, 2), 'time': time.strftime('%Y-%m-%d %H:%M:%S')})
+    data[mode] = history[-READY_TIMES_KEEP:]
+    try:
+        os.makedirs(os.path.dirname(READY_TIMES_FILE), exist_ok=True)
+        with open(READY_TIMES_FILE, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"⚠️ 保存后端就绪耗时失败: {e}")
+    return data
+
+
+def format_ready_comparison(data):
+    """生成各启动方式平均就绪耗时的对比文本"""
+    names = {'jar': "java -jar + CDS", 'maven': "mvn spring-boot:run"}
+    lines = []
+    for mode, history in data.items():
+        if not history:
+            continue
+        average = sum(item['seconds'] for item in history) / len(history)
+        lines.append(f"  {names.get(mode, mode):<22} 最近 {len(history)} 次平均 {average:.1f} 秒，最近一次 {history[-1]['seconds']:.1f} 秒")
+    if not lines:
+        return ""
+    return "后端API就绪耗时对比:\n" + '\n'.join(lines)
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import fnmatch
+import subprocess
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+EMBEDDED_GIT = os.path.join(base_dir, "runtime", "git-2.48.1", "cmd", "git.exe")
+# 已拉取但还没有在启动器中应用的更新计划，多次更新的计划会合并
+PLAN_FILE = os.path.join(base_dir, 'data', 'update_plan.json')
+
+# 变更分类规则：仓库名 -> [(路径通配符, 分类)]，按顺序匹配第一条，都不匹配的文件（文档、图片等）不需要处理
+CHANGE_RULES = {
+    'server': [
+        ('main/manager-api/pom.xml', 'manager_api_pom'),
+        ('main/manager-api/*', 'manager_api_src'),
+        ('main/manager-web/package.json', 'manager_web_deps'),
+        ('main/manager-web/package-lock.json', 'manager_web_deps'),
+        ('main/manager-web/*', 'manager_web_src'),
+        ('main/xiaozhi-server/requirements.txt', 'xiaozhi_requirements'),
+        ('main/xiaozhi-server/config.yaml', 'xiaozhi_config'),
+        ('main/xiaozhi-server/*', 'xiaozhi_python'),
+    ],
+    'onekey': [
+        ('scripts/requirements.txt', 'launcher_requirements'),
+        ('scripts/*', 'launcher'),
+    ],
+    'music': [
+        ('requirements.txt', 'music_requirements'),
+        ('*', 'music'),
+    ],
+}
+
+# 分类 -> (显示名称, 需要执行的构建步骤, 需要重启的服务, 提示)
+CATEGORY_ACTIONS = {
+    'manager_api_pom': ("后端依赖（pom.xml）", ['maven'], ['manager_api'], None),
+    'manager_api_src': ("后端源码", ['maven'], ['manager_api'], None),
+    'manager_web_deps': ("前端依赖（package.json）", ['npm_install', 'frontend_build'], ['frontend'], None),
+    'manager_web_src': ("前端源码", ['frontend_build'], ['frontend'], None),
+    'xiaozhi_requirements': ("小智服务端依赖（requirements.txt）", ['pip_xiaozhi'], ['xiaozhi_server'], None),
+    'xiaozhi_config': ("配置模板（config.yaml）", [], ['xiaozhi_server'],
+                       "配置模板有变化，请对照检查 data/.config.yaml 是否需要新增配置项"),
+    'xiaozhi_python': ("小智服务端代码", [], ['xiaozhi_server'], None),
+    'launcher_requirements': ("一键包脚本依赖", ['pip_scripts'], [], "一键包脚本已更新，重新打开启动器后生效"),
+    'launcher': ("一键包脚本", [], [], "一键包脚本已更新，重新打开启动器后生效"),
+    'music_requirements': ("音乐服务端依赖", ['pip_music'], [], "音乐服务端已更新，请手动重启音乐服务端"),
+    'music': ("音乐服务端代码", [], [], "音乐服务端已更新，请手动重启音乐服务端"),
+}
+
+# 构建步骤和服务的显示名称，也是执行顺序：先构建，再按依赖顺序启动（后端API先于小智AI服务器）
+BUILD_LABELS = {
+    'pip_scripts': "安装一键包脚本依赖",
+    'pip_xiaozhi': "安装小智服务端依赖",
+    'pip_music': "安装音乐服务端依赖",
+    'maven': "编译后端",
+    'npm_install': "安装前端依赖",
+    'frontend_build': "构建前端",
+}
+SERVICE_LABELS = {
+    'manager_api': "后端API服务器",
+    'frontend': "前端服务器",
+    'xiaozhi_server': "小智AI服务器",
+}
+
+
+def find_git():
+    if os.path.exists(EMBEDDED_GIT):
+        return EMBEDDED_GIT
+    return shutil.which('git')
+
+
+class ChangePlan:
+    """一次或多次更新需要执行的最少操作：各分类的变更文件数、构建步骤、重启的服务和提示"""
+
+    def __init__(self, categories=None, revisions=None):
+        # {分类: 变更文件数}
+        self.categories = dict(categories or {})
+        # {仓库名: [更新前的提交, 更新后的提交]}
+        self.revisions = dict(revisions or {})
+
+    def _collect(self, index, order):
+        names = {name for category in self.categories for name in CATEGORY_ACTIONS[category][index]}
+        return [name for name in order if name in names]
+
+    @property
+    def builds(self):
+        return self._collect(1, BUILD_LABELS)
+
+    @property
+    def restarts(self):
+        return self._collect(2, SERVICE_LABELS)
+
+    @property
+    def notices(self):
+        notices = (CATEGORY_ACTIONS[category][3] for category in self.categories)
+        return list(dict.fromkeys(notice for notice in notices if notice))
+
+    @property
+    def empty(self):
+        return not self.categories
+
+    def merge(self, other):
+        for category, count in other.categories.items():
+            self.categories[category] = self.categories.get(category, 0) + count
+        for repo_name, (before, after) in other.revisions.items():
+            # 保留最早的更新前提交，计划覆盖多次更新的全部变更
+            self.revisions[repo_name] = [self.revisions.get(repo_name, [before])[0], after]
+        return self
+
+    def to_dict(self):
+        return {'categories': self.categories, 'revisions': self.revisions, 'updated_at': time.time()}
+
+    @classmethod
+    def from_dict(cls, data):
+        categories = {name: count for name, count in (data.get('categories') or {}).items() if name in CATEGORY_ACTIONS}
+        return cls(categories, data.get('revisions'))
+
+
+def classify_paths(repo_name, paths):
+    """按CHANGE_RULES对变更文件分类，返回ChangePlan"""
+    plan = ChangePlan()
+    rules = CHANGE_RULES.get(repo_name, [])
+    for path in paths:
+        for pattern, category in rules:
+            if fnmatch.fnmatchcase(path, pattern):
+                plan.categories[category] = plan.categories.get(category, 0) + 1
+                break
+    return plan
+
+
+def changed_paths(git, repo_path, before, after):
+    """返回两个提交之间变更的文件（相对仓库根目录），无法比较时返回None"""
+    result = subprocess.run([git, 'diff', '--name-only', '--no-renames', '-z', before, after], cwd=repo_path,
+                            capture_output=True, text=True, encoding='utf-8', errors='replace')
+    if result.returncode != 0:
+        return None
+    return [path for path in result.stdout.split('\0') if path]
+
+
+def plan_update(git, repo_name, repo_path, before, after):
+    """
+    根据一次更新的变更文件生成计划
+
+    无法比较提交时（例如浅克隆中缺少更新前的提交）按该仓库的所有分类处理，宁可多重建也不漏掉。
+    """
+    if not before or not after or before == after:
+        return ChangePlan()
+    paths = changed_paths(git, repo_path, before, after)
+    if paths is None:
+        plan = ChangePlan({category: 0 for _, category in CHANGE_RULES.get(repo_name, [])})
+    else:
+        plan = classify_paths(repo_name, paths)
+    plan.revisions[repo_name] = [before, after]
+    return plan
+
+
+def load_pending():
+    """读取待应用的更新计划，没有时返回空计划"""
+    try:
+        with open(PLAN_FILE, 'r', encoding='utf-8') as f:
+            return ChangePlan.from_dict(json.load(f))
+    except (OSError, ValueError, AttributeError):
+        return ChangePlan()
+
+
+def save_pending(plan):
+    try:
+        os.makedirs(os.path.dirname(PLAN_FILE), exist_ok=True)
+        tmp_file = PLAN_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(plan.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, PLAN_FILE)
+    except OSError:
+        pass
+
+
+def clear_pending():
+    try:
+        os.remove(PLAN_FILE)
+    except OSError:
+        pass
+
+
+def record_update(git, repo_name, repo_path, before, after):
+    """更新完成后调用：生成本次的计划并合并到待应用的计划中，返回本次的计划"""
+    plan = plan_update(git, repo_name, repo_path, before, after)
+    if not plan.empty:
+        save_pending(load_pending().merge(plan))
+    return plan
+
+
+def format_plan(plan):
+    """生成计划的说明文本"""
+    if plan.empty:
+        return ["本次更新没有需要重建或重启的内容（只有文档等文件变化）"]
+    lines = ["变更内容: " + "、".join(f"{CATEGORY_ACTIONS[category][0]}" + (f" {count} 个文件" if count else "")
+                                    for category, count in plan.categories.items())]
+    if plan.builds:
+        lines.append("需要执行: " + "、".join(BUILD_LABELS[name] for name in plan.builds))
+    if plan.restarts:
+        lines.append("需要重启: " + "、".join(SERVICE_LABELS[name] for name in plan.restarts))
+    lines.extend(f"⚠️ {notice}" for notice in plan.notices)
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='对两个提交之间的变更分类，给出需要的构建和重启')
+    parser.add_argument('before', nargs='?', help='更新前的提交，不指定时显示待应用的计划')
+    parser.add_argument('after', nargs='?', default='HEAD', help='更新后的提交（默认HEAD）')
+    parser.add_argument('--repo', default='server', choices=list(CHANGE_RULES), help='仓库（默认server）')
+    parser.add_argument('--path', default=None, help='仓库目录，默认按仓库名推断')
+    parser.add_argument('--clear', action='store_true', help='清除待应用的计划')
+    args = parser.parse_args()
+
+    if args.clear:
+        clear_pending()
+        print("已清除待应用的更新计划")
+        sys.exit(0)
+    if args.before is None:
+        for line in format_plan(load_pending()):
+            print(line)
+        sys.exit(0)
+    git = find_git()
+    if git is None:
+        print(f"[ERROR] 未找到Git程序：{EMBEDDED_GIT}")
+        sys.exit(1)
+    default_paths = {'server': 'src', 'onekey': '.', 'music': os.path.join('src', 'main', 'music-xiaozhi-server')}
+    repo_path = args.path or os.path.join(base_dir, default_paths[args.repo])
+    for line in format_plan(plan_update(git, args.repo, repo_path, args.before, args.after)):
+        print(line)
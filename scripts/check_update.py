@@ -3,10 +3,8 @@ import re
 import sys
 import subprocess
 import json
-import requests
 from typing import Tuple, List
-import pop_window_pyside as pwp
-from PySide6.QtWidgets import QApplication, QMessageBox
+import release_client
 
 # 获取脚本所在目录的上级目录
 script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -32,15 +30,10 @@ def check_updates():
     
     # 使用GitHub API检查最新版本
     try:
-        # 使用加速地址检查更新
-        url = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/releases/latest"
         print("检查新版本……")
         
-        # 设置超时
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        release_data = response.json()
+        # 与更新弹窗共用同一份缓存，弹窗打开时不再重复请求
+        release_data = release_client.get_latest_release()
         remote_tag = release_data.get("tag_name", "")
         print(f"远程最新版本: {remote_tag}")
         
@@ -57,7 +50,8 @@ def check_updates():
             print(f'\n{"="*50}')
             print(f'建议按照弹窗提示，运行更新脚本获取一键包最新版！')
             
-            # 显示弹窗并获取用户选择结果
+            # 显示弹窗并获取用户选择结果（PySide6导入较慢，只在需要弹窗时才导入）
+            import pop_window_pyside as pwp
             update_result = pwp.show_github_release()
             # 如果用户选择了立即更新，退出程序
             if update_result:
@@ -140,14 +134,15 @@ def check_mysql_config():
 
 
 if __name__ == '__main__':
-    # 创建QApplication实例
-    app = QApplication(sys.argv)
     # 检查路径合法性
     if not check_path_for_chinese():
+        from PySide6.QtWidgets import QApplication, QMessageBox
+        app = QApplication(sys.argv)
         QMessageBox.warning(None, "警告！", f"警告，当前路径包含中文等特殊字符: “{os.getcwd()}”\n已自动退出，请将一键包移动到非中文目录再启动！")
         sys.exit()
     if not os.path.exists("./data/.is_first_run"):
         print("检测到首次运行一键包，正在打开说明。")
+        import pop_window_pyside as pwp
         if not pwp.first_run():
             print("用户已取消，程序退出。")
             sys.exit()
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from tracing import span
+from resource_profiles import popen_background
+from update_all import REPOSITORIES, EMBEDDED_GIT, find_git
+
+# psutil为可选依赖（已加入requirements.txt），未安装时不判断CPU是否空闲
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 各仓库最近一次维护的时间、各任务耗时和维护前后的对象统计
+STATE_FILE = os.path.join(base_dir, 'data', 'git_maintenance.json')
+
+# 增量维护任务（git maintenance run --task），按顺序执行：
+# loose-objects先删除已打包的松散对象，再把剩余的松散对象打成一个包，prune-packed随即删除刚打包的松散对象
+# （git自身的维护要等到下一次才删除）；incremental-repack写入多包索引（multi-pack-index），并把小包合并成较大的包；
+# commit-graph写入提交图，加快历史遍历和拉取时的协商；pack-refs把松散引用打包
+MAINTENANCE_TASKS = [
+    ('loose-objects', "打包松散对象"),
+    ('prune-packed', "删除已打包的松散对象"),
+    ('incremental-repack', "增量重新打包"),
+    ('commit-graph', "写入提交图"),
+    ('pack-refs', "打包引用"),
+]
+# 同一仓库两次维护的最短间隔（秒）
+MAINTENANCE_INTERVAL = 24 * 3600
+# 单个任务的超时（秒）
+TASK_TIMEOUT = 600
+# 启动器启动后等待多久才开始检查（秒），避开服务启动和后台预取最忙的时候；之后每隔多久检查一次
+MAINTENANCE_DELAY = 300
+MAINTENANCE_POLL = 600
+# 采样期间整机CPU占用低于该百分比才算空闲
+IDLE_CPU_PERCENT = 25
+IDLE_SAMPLE_SECONDS = 5
+
+
+def _git(git, cwd, args):
+    result = subprocess.run([git] + args, cwd=cwd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    return result.returncode, (result.stdout + result.stderr).strip()
+
+
+def object_stats(git, repo_path):
+    """git count-objects -v 的统计：松散对象数、松散对象大小(KB)、包文件数、包文件大小(KB)"""
+    code, output = _git(git, repo_path, ['count-objects', '-v'])
+    stats = {}
+    if code == 0:
+        for line in output.splitlines():
+            key, _, value = line.partition(':')
+            if key in ('count', 'size', 'packs', 'size-pack'):
+                stats[key] = int(value.strip() or 0)
+    return stats
+
+
+def time_status(git, repo_path):
+    """测量一次git status的耗时（秒），作为维护前后的对比"""
+    started = time.perf_counter()
+    _git(git, repo_path, ['status', '--porcelain'])
+    return time.perf_counter() - started
+
+
+def is_busy(repo_path):
+    """仓库中是否有其他git操作正在进行（拉取、检出、另一个维护）"""
+    git_dir = os.path.join(repo_path, '.git')
+    return any(os.path.exists(os.path.join(git_dir, name)) for name in ('index.lock', 'objects/maintenance.lock'))
+
+
+def machine_idle(threshold=IDLE_CPU_PERCENT, seconds=IDLE_SAMPLE_SECONDS):
+    """整机CPU占用是否低于阈值，未安装psutil时视为空闲"""
+    if psutil is None:
+        return True
+    return psutil.cpu_percent(interval=seconds) < threshold
+
+
+def run_task(git, repo_path, task, timeout=TASK_TIMEOUT):
+    """以最低优先级执行一个维护任务，返回 (是否成功, 耗时, 输出)"""
+    started = time.perf_counter()
+    with span(f"git maintenance {task}", cat='git', repo=repo_path) as s:
+        args = ['prune-packed', '--quiet'] if task == 'prune-packed' else ['maintenance', 'run', f'--task={task}', '--quiet']
+        process = popen_background('maintenance', [git] + args, repo_path)
+        try:
+            output, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            output, _ = process.communicate()
+        s.set(returncode=process.returncode)
+    return process.returncode == 0, time.perf_counter() - started, output.decode('utf-8', errors='replace').strip()
+
+
+def maintain_repository(git, repo_path, tasks=None):
+    """依次执行维护任务，返回包含各任务耗时和维护前后统计的报告"""
+    report = {
+        'at': time.time(),
+        'before': object_stats(git, repo_path),
+        'status_before': round(time_status(git, repo_path), 3),
+        'tasks': [],
+    }
+    for task, _ in MAINTENANCE_TASKS:
+        if tasks and task not in tasks:
+            continue
+        ok, seconds, output = run_task(git, repo_path, task)
+        entry = {'task': task, 'ok': ok, 'seconds': round(seconds, 2)}
+        if not ok:
+            lines = output.splitlines()
+            entry['error'] = lines[-1] if lines else "未知错误"
+        report['tasks'].append(entry)
+    report['after'] = object_stats(git, repo_path)
+    report['status_after'] = round(time_status(git, repo_path), 3)
+    return report
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    try:
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        with open(STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+
+
+def managed_repositories(root=base_dir):
+    """返回已安装的仓库 [(名称, 显示名称, 路径)]"""
+    repos = []
+    for name, label, rel_path, _ in REPOSITORIES:
+        path = os.path.normpath(os.path.join(root, rel_path))
+        if os.path.exists(os.path.join(path, '.git')):
+            repos.append((name, label, path))
+    return repos
+
+
+def due_repositories(root=base_dir, state=None, interval=MAINTENANCE_INTERVAL):
+    """返回距离上次维护超过interval的仓库"""
+    state = load_state() if state is None else state
+    now = time.time()
+    return [repo for repo in managed_repositories(root) if now - state.get(repo[0], {}).get('at', 0) >= interval]
+
+
+def format_report(label, report):
+    """生成一个仓库维护报告的文本"""
+    before, after = report.get('before', {}), report.get('after', {})
+    total = sum(entry['seconds'] for entry in report.get('tasks', []))
+    lines = [f"{label}：松散对象 {before.get('count', '-')} → {after.get('count', '-')}，"
+             f"包文件 {before.get('packs', '-')} → {after.get('packs', '-')}，"
+             f"git status {report.get('status_before', 0) * 1000:.0f}ms → {report.get('status_after', 0) * 1000:.0f}ms，"
+             f"维护用时 {total:.1f}s"]
+    labels = dict(MAINTENANCE_TASKS)
+    for entry in report.get('tasks', []):
+        status = f"{entry['seconds']:.1f}s" if entry['ok'] else f"失败（{entry.get('error', '')}）"
+        lines.append(f"    {labels.get(entry['task'], entry['task']):<12}{status}")
+    return lines
+
+
+def run_due_maintenance(root=base_dir, force=False, check_idle=True, tasks=None, log=print):
+    """
+    维护到期的仓库，返回本次维护的仓库数
+
+    check_idle为True时每个仓库开始之前都确认CPU空闲，忙碌时停止，等下次检查再继续。
+    """
+    git = find_git()
+    if git is None:
+        log(f"[ERROR] 未找到Git程序：{EMBEDDED_GIT}")
+        return 0
+    state = load_state()
+    repos = managed_repositories(root) if force else due_repositories(root, state)
+    count = 0
+    for name, label, path in repos:
+        if is_busy(path):
+            log(f"{label}：有其他git操作正在进行，跳过")
+            continue
+        if check_idle and not machine_idle():
+            log("系统繁忙，稍后再进行维护")
+            break
+        report = maintain_repository(git, path, tasks)
+        state[name] = report
+        save_state(state)
+        count += 1
+        for line in format_report(label, report):
+            log(line)
+    return count
+
+
+def maintenance_loop(root=base_dir, busy=None, delay=MAINTENANCE_DELAY, poll=MAINTENANCE_POLL):
+    """
+    启动器的后台维护线程：启动delay秒后开始，之后每隔poll秒检查一次，空闲时维护到期的仓库
+
+    busy为无参数函数，返回True时（例如正在后台预取）跳过本次检查。维护结果只写入状态文件，不输出到菜单。
+    """
+    time.sleep(delay)
+    while True:
+        if not (busy and busy()):
+            try:
+                run_due_maintenance(root, log=lambda message: None)
+            except Exception:
+                pass
+        time.sleep(poll)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='对一键包管理的仓库进行增量git维护（提交图、多包索引、增量重新打包、清理松散对象）')
+    parser.add_argument('--root', default=base_dir, help='一键包根目录')
+    parser.add_argument('--force', action='store_true', help='忽略维护间隔和CPU占用，立即维护所有仓库')
+    parser.add_argument('--task', action='append', choices=[task for task, _ in MAINTENANCE_TASKS], help='只执行指定的任务（可重复）')
+    parser.add_argument('--report', action='store_true', help='只显示最近一次维护的报告')
+    args = parser.parse_args()
+
+    if args.report:
+        state = load_state()
+        for name, label, _ in managed_repositories(args.root):
+            if name in state:
+                print(f"[{time.strftime('%Y-%m-%d %H:%M', time.localtime(state[name]['at']))}] ", end='')
+                for line in format_report(label, state[name]):
+                    print(line)
+            else:
+                print(f"{label}：尚未维护")
+        sys.exit(0)
+
+    count = run_due_maintenance(args.root, force=args.force, check_idle=not args.force, tasks=args.task)
+    if count == 0:
+        print("没有需要维护的仓库")
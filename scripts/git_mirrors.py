@@ -0,0 +1,443 @@
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait
+from tracing import span
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 镜像评分表：记录每个镜像的成功率、握手延迟和传输速度，下次更新时直接使用
+SCOREBOARD_FILE = os.path.join(base_dir, 'data', 'mirror_scores.json')
+
+# GitHub镜像代理地址（按原有的尝试顺序排列）
+GITHUB_PROXY_URLS = [
+    "https://ghfast.top",
+    "https://github.acmsz.top",
+    "https://gh.b52m.cn",
+    "https://gh.nxnow.top",
+    "https://gh.ddlc.top",
+    "https://slink.ltd",
+    "https://cors.isteed.cc",
+    "https://hub.gitmirror.com",
+    "https://sciproxy.com",
+    "https://ghproxy.net",
+    "https://gitclone.com",
+    "https://hub.incept.pw",
+    "https://github.moeyy.xyz",
+    "https://dl.ghpig.top",
+    "https://gh-proxy.com",
+    "https://hub.whtrys.space",
+    "https://gh-proxy.ygxz.in",
+]
+# 探测所有镜像的总时限（秒），在此之前没有响应的镜像本次不使用
+PROBE_TIMEOUT = 4.0
+# smart HTTP协议的引用广告，响应以这一行开头才说明镜像真的能用于git
+UPLOAD_PACK_SERVICE = b"# service=git-upload-pack"
+
+# 指数加权移动平均中新观测值的权重
+EWMA_ALPHA = 0.3
+# 没有观测数据时的先验：成功率、握手延迟（秒）、传输速度（字节/秒）
+PRIOR_SUCCESS = 0.5
+PRIOR_LATENCY = 1.0
+PRIOR_THROUGHPUT = 512 * 1024
+# 估算拉取耗时时假设的传输量（字节）
+EXPECTED_TRANSFER_BYTES = 5 * 1024 * 1024
+# 观测数据的半衰期（秒）：旧数据逐渐向先验回归，长期没用的镜像有机会重新被选中
+SCORE_HALF_LIFE = 3 * 24 * 3600
+# 连续失败达到该次数后隔离镜像，隔离时长从QUARANTINE_BASE开始每次翻倍，最长QUARANTINE_MAX（秒）
+QUARANTINE_AFTER = 2
+QUARANTINE_BASE = 30 * 60
+QUARANTINE_MAX = 7 * 24 * 3600
+# 成功率不低于该值且未被隔离的镜像，下次更新时不探测直接使用
+TRUSTED_SUCCESS = 0.8
+# 检查是否有更新时最多尝试的镜像数，以及引用广告的最大读取长度
+REF_CHECK_ATTEMPTS = 3
+MAX_ADVERTISEMENT_BYTES = 4 * 1024 * 1024
+
+
+class MirrorResult:
+    """一个镜像的探测结果"""
+
+    def __init__(self, proxy, url, latency=None, error=None):
+        # proxy为空字符串表示直连GitHub
+        self.proxy = proxy
+        self.url = url
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.latency is not None
+
+    @property
+    def label(self):
+        return self.proxy or "直连GitHub"
+
+
+def mirror_url(proxy, repo_url):
+    """拼接镜像代理地址，proxy为空时返回原地址"""
+    return f"{proxy.rstrip('/')}/{repo_url}" if proxy else repo_url
+
+
+def probe_mirror(url, timeout=PROBE_TIMEOUT):
+    """
+    请求仓库的 info/refs（git ls-remote 的第一步），返回 (耗时秒数, 错误信息)
+
+    只读取响应开头的几十个字节，确认是git的引用广告而不是镜像返回的错误页面。
+    """
+    started = time.perf_counter()
+    try:
+        request = urllib.request.Request(
+            f"{url.rstrip('/')}/info/refs?service=git-upload-pack",
+            headers={'User-Agent': 'git/2.48.1', 'Git-Protocol': 'version=2'},
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            head = response.read(64)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        return None, str(getattr(e, 'reason', e))
+    if UPLOAD_PACK_SERVICE not in head:
+        return None, "响应不是git仓库"
+    return time.perf_counter() - started, None
+
+
+def rank_mirrors(repo_url, proxies=None, timeout=PROBE_TIMEOUT, include_direct=True):
+    """
+    并发探测所有镜像，返回按响应速度排序的结果列表（可用的在前）
+
+    所有探测共用一个总时限，超时未响应的镜像记为不可用，不会拖慢整体。
+    """
+    proxies = list(dict.fromkeys(GITHUB_PROXY_URLS if proxies is None else proxies))
+    if include_direct:
+        proxies.append('')
+    results = [MirrorResult(proxy, mirror_url(proxy, repo_url)) for proxy in proxies]
+    with span("探测镜像", cat='git', mirrors=len(results)) as s:
+        executor = ThreadPoolExecutor(max_workers=max(1, len(results)))
+        futures = {executor.submit(probe_mirror, result.url, timeout): result for result in results}
+        done, _ = wait(futures, timeout=timeout)
+        # 未完成的探测线程会在各自的socket超时后结束，这里不等待它们
+        executor.shutdown(wait=False)
+        for future, result in futures.items():
+            if future in done:
+                result.latency, result.error = future.result()
+            else:
+                result.error = "超时"
+        ranked = sorted(results, key=lambda result: (not result.ok, result.latency or 0))
+        s.set(available=sum(1 for result in ranked if result.ok))
+    return ranked
+
+
+def _decay(value, prior, age):
+    """按半衰期把观测值向先验回归"""
+    if value is None:
+        return prior
+    return prior + (value - prior) * 0.5 ** (max(age, 0) / SCORE_HALF_LIFE)
+
+
+def _ewma(old, new):
+    return new if old is None else old + EWMA_ALPHA * (new - old)
+
+
+def parse_received_bytes(output):
+    """
+    从git输出的 "Receiving objects: 100% (n/n), 1.23 MiB | ..." 中取出传输量（字节），没有时返回None
+
+    对象较少时（少于fetch.unpackLimit）git直接解包，进度显示为 "Unpacking objects"。
+    """
+    matches = re.findall(r'(?:Receiving|Unpacking) objects:.*?,\s*([\d.]+)\s*(bytes|KiB|MiB|GiB)', output or '')
+    if not matches:
+        return None
+    value, unit = matches[-1]
+    return float(value) * {'bytes': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3}[unit]
+
+
+class MirrorScoreboard:
+    """
+    持久化的镜像评分表
+
+    每个镜像记录成功率、握手延迟和传输速度的指数加权移动平均，以及连续失败次数和隔离截止时间。
+    连续失败的镜像按指数退避隔离；观测数据随时间衰减，所以隔离结束后镜像会重新参与探测。
+    """
+
+    def __init__(self, path=SCOREBOARD_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.scores = json.load(f)
+        except (OSError, ValueError):
+            self.scores = {}
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_file = self.path + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.scores, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.path)
+        except OSError:
+            pass
+
+    def _entry(self, proxy):
+        return self.scores.setdefault(proxy or 'direct', {
+            'success': None, 'latency': None, 'throughput': None,
+            'failures': 0, 'quarantined_until': 0, 'updated_at': 0,
+        })
+
+    def stats(self, proxy, now=None):
+        """返回衰减后的 (成功率, 延迟, 传输速度)"""
+        entry = self.scores.get(proxy or 'direct') or {}
+        age = (now or time.time()) - entry.get('updated_at', 0)
+        return (_decay(entry.get('success'), PRIOR_SUCCESS, age),
+                _decay(entry.get('latency'), PRIOR_LATENCY, age),
+                _decay(entry.get('throughput'), PRIOR_THROUGHPUT, age))
+
+    def quarantined(self, proxy, now=None):
+        entry = self.scores.get(proxy or 'direct') or {}
+        return entry.get('quarantined_until', 0) > (now or time.time())
+
+    def expected_time(self, proxy, now=None):
+        """预计拉取耗时（秒）：一次尝试的耗时除以成功率，即包括失败重试在内的期望耗时"""
+        success, latency, throughput = self.stats(proxy, now)
+        return (latency + EXPECTED_TRANSFER_BYTES / max(throughput, 1)) / max(success, 0.05)
+
+    def order(self, proxies, now=None):
+        """按预计耗时排序，被隔离的镜像排在最后"""
+        return sorted(proxies, key=lambda proxy: (self.quarantined(proxy, now), self.expected_time(proxy, now)))
+
+    def trusted(self, proxies, now=None):
+        """返回可以不经探测直接使用的最佳镜像，没有时返回None"""
+        now = now or time.time()
+        for proxy in self.order(proxies, now):
+            entry = self.scores.get(proxy or 'direct')
+            if entry and entry.get('success') is not None and not self.quarantined(proxy, now) \
+                    and self.stats(proxy, now)[0] >= TRUSTED_SUCCESS:
+                return proxy
+        return None
+
+    def _record_failure(self, entry, now):
+        # 上次记录已超过一个半衰期时，之前的连续失败不再计入
+        if now - entry['updated_at'] > SCORE_HALF_LIFE:
+            entry['failures'] = 0
+        entry['failures'] += 1
+        if entry['failures'] >= QUARANTINE_AFTER:
+            duration = min(QUARANTINE_BASE * 2 ** (entry['failures'] - QUARANTINE_AFTER), QUARANTINE_MAX)
+            entry['quarantined_until'] = now + duration
+
+    def record_probe(self, proxy, latency, now=None):
+        """记录一次探测：成功时更新握手延迟，失败计入连续失败次数"""
+        now = now or time.time()
+        with self._lock:
+            entry = self._entry(proxy)
+            if latency is None:
+                self._record_failure(entry, now)
+            else:
+                entry['latency'] = _ewma(entry['latency'], latency)
+            entry['updated_at'] = now
+
+    def record_attempt(self, proxy, ok, seconds, received_bytes=None, now=None):
+        """记录一次拉取：更新成功率，有传输量时更新传输速度"""
+        now = now or time.time()
+        with self._lock:
+            entry = self._entry(proxy)
+            entry['success'] = _ewma(entry['success'], 1.0 if ok else 0.0)
+            if ok:
+                entry['failures'] = 0
+                entry['quarantined_until'] = 0
+                if received_bytes and seconds > 0:
+                    entry['throughput'] = _ewma(entry['throughput'], received_bytes / seconds)
+            else:
+                self._record_failure(entry, now)
+            entry['updated_at'] = now
+
+
+def try_mirrors(repo_url, attempt, proxies=None, timeout=PROBE_TIMEOUT, include_direct=True, scoreboard=None, log=print):
+    """
+    依次对镜像执行 attempt(url)，直到某次成功，返回成功的镜像结果，全部失败时返回None
+
+    attempt返回 (是否成功, git输出)，或加上第三项 (传输字节数, 传输耗时)，此时按实际传输阶段记录镜像的下载速度，
+    不把服务器压缩对象和检出文件的时间算进去。评分表中有可信的镜像时先直接使用它，不做探测；
+    否则并发探测未被隔离的镜像，按评分表估算的耗时依次尝试有响应的镜像。
+    全部没有响应时（例如网络屏蔽了探测请求）按原顺序逐个尝试。
+    同时更新多个仓库时共用一个scoreboard，并通过log给输出加上仓库名。
+    """
+    scoreboard = scoreboard or MirrorScoreboard()
+    proxies = list(dict.fromkeys(GITHUB_PROXY_URLS if proxies is None else proxies))
+    if include_direct:
+        proxies.append('')
+    tried = set()
+
+    def run(result):
+        tried.add(result.proxy)
+        started = time.perf_counter()
+        outcome = attempt(result.url)
+        ok, output = outcome[:2]
+        seconds = time.perf_counter() - started
+        received_bytes = parse_received_bytes(output)
+        if len(outcome) > 2 and outcome[2] and outcome[2][1] > 0:
+            received_bytes, seconds = outcome[2]
+        scoreboard.record_attempt(result.proxy, ok, seconds, received_bytes)
+        scoreboard.save()
+        return ok
+
+    best = scoreboard.trusted(proxies)
+    if best is not None:
+        result = MirrorResult(best, mirror_url(best, repo_url))
+        log(f"\n使用上次表现最好的镜像：{result.label}")
+        if run(result):
+            return result
+
+    active = [proxy for proxy in proxies if proxy not in tried and not scoreboard.quarantined(proxy)]
+    if not active:
+        active = [proxy for proxy in proxies if proxy not in tried]
+    skipped = len(proxies) - len(tried) - len(active)
+    log(f"\n正在测试各镜像的响应速度...{f'（跳过 {skipped} 个隔离中的镜像）' if skipped else ''}")
+    ranked = rank_mirrors(repo_url, active, timeout, include_direct=False)
+    for result in ranked:
+        scoreboard.record_probe(result.proxy, result.latency)
+    scoreboard.save()
+
+    candidates = [result for result in ranked if result.ok]
+    candidates.sort(key=lambda result: scoreboard.expected_time(result.proxy))
+    for result in candidates[:5]:
+        log(f"  {result.latency * 1000:6.0f}ms  预计 {scoreboard.expected_time(result.proxy):5.1f}s  {result.label}")
+    if not candidates:
+        log("⚠️ 没有镜像在时限内响应，按默认顺序逐个尝试")
+        candidates = [MirrorResult(proxy, mirror_url(proxy, repo_url)) for proxy in proxies if proxy not in tried]
+    else:
+        log(f"共 {len(candidates)}/{len(ranked)} 个镜像可用，按预计耗时依次尝试")
+    for result in candidates:
+        if run(result):
+            return result
+    return None
+
+
+def parse_ref_advertisement(data):
+    """解析smart HTTP协议v0的引用广告（pkt-line格式），返回 {引用名: 提交哈希}"""
+    refs = {}
+    pos = 0
+    while pos + 4 <= len(data):
+        try:
+            length = int(data[pos:pos + 4], 16)
+        except ValueError:
+            break
+        if length < 4:
+            # flush-pkt（0000）分隔服务声明和引用列表
+            pos += 4
+            continue
+        line = data[pos + 4:pos + length].split(b'\0')[0].strip()
+        pos += length
+        sha, _, ref = line.partition(b' ')
+        if len(sha) == 40 and ref:
+            refs[ref.decode('utf-8', errors='replace')] = sha.decode('ascii')
+    return refs
+
+
+def fetch_remote_ref(url, branch, timeout=PROBE_TIMEOUT, git=None):
+    """
+    用一次请求读取远程分支指向的提交，失败时返回None
+
+    HTTP地址直接请求 info/refs（不协商对象、不下载任何内容），其他地址（本地路径、ssh）使用 git ls-remote。
+    """
+    ref = f'refs/heads/{branch}'
+    if not url.startswith(('http://', 'https://')):
+        git = git or shutil.which('git')
+        if git is None:
+            return None
+        try:
+            result = subprocess.run([git, 'ls-remote', url, ref], capture_output=True, text=True, timeout=timeout * 3)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        line = result.stdout.split('\n', 1)[0].split('\t')
+        return line[0] if result.returncode == 0 and len(line) == 2 and line[1] == ref else None
+    try:
+        # 不发送Git-Protocol头，服务端按v0协议直接返回引用列表
+        request = urllib.request.Request(f"{url.rstrip('/')}/info/refs?service=git-upload-pack",
+                                         headers={'User-Agent': 'git/2.48.1'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = response.read(MAX_ADVERTISEMENT_BYTES)
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+    if UPLOAD_PACK_SERVICE not in data[:64]:
+        return None
+    return parse_ref_advertisement(data).get(ref)
+
+
+def _git_local(git, cwd, args):
+    try:
+        result = subprocess.run([git] + args, cwd=cwd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    except OSError:
+        return 1, ''
+    return result.returncode, result.stdout.strip()
+
+
+def check_up_to_date(git, repo_path, repo_url, branch=None, proxies=None, include_direct=True,
+                     scoreboard=None, timeout=PROBE_TIMEOUT):
+    """
+    不拉取任何对象，检查本地仓库是否已经是最新
+
+    按评分表依次向最好的几个镜像请求远程分支的提交哈希，通常一次请求即可得到结果。
+    返回 (是否最新, 远程提交哈希, 使用的镜像)；无法确定时返回 (None, None, None)，调用者应照常拉取。
+    本地提交领先于远程（远程提交是HEAD的祖先）时也视为最新。
+    """
+    if branch is None:
+        code, branch = _git_local(git, repo_path, ['rev-parse', '--abbrev-ref', 'HEAD'])
+        if code != 0 or branch == 'HEAD':
+            return None, None, None
+    code, head = _git_local(git, repo_path, ['rev-parse', 'HEAD'])
+    if code != 0:
+        return None, None, None
+    scoreboard = scoreboard or MirrorScoreboard()
+    proxies = list(dict.fromkeys(GITHUB_PROXY_URLS if proxies is None else proxies))
+    if include_direct:
+        proxies.append('')
+    for proxy in scoreboard.order(proxies)[:REF_CHECK_ATTEMPTS]:
+        started = time.perf_counter()
+        remote = fetch_remote_ref(mirror_url(proxy, repo_url), branch, timeout, git)
+        scoreboard.record_probe(proxy, time.perf_counter() - started if remote else None)
+        if remote is None:
+            continue
+        scoreboard.save()
+        if remote == head:
+            return True, remote, proxy
+        # 远程提交存在于本地且是HEAD的祖先：本地领先，没有需要拉取的内容
+        exists, _ = _git_local(git, repo_path, ['cat-file', '-e', f'{remote}^{{commit}}'])
+        if exists == 0:
+            ancestor, _ = _git_local(git, repo_path, ['merge-base', '--is-ancestor', remote, head])
+            return ancestor == 0, remote, proxy
+        return False, remote, proxy
+    scoreboard.save()
+    return None, None, None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='测试GitHub镜像代理的响应速度')
+    parser.add_argument('--repo', default="https://github.com/xinnan-tech/xiaozhi-esp32-server.git", help='仓库地址')
+    parser.add_argument('--timeout', type=float, default=PROBE_TIMEOUT, help=f'探测总时限（秒），默认{PROBE_TIMEOUT}')
+    parser.add_argument('--scores', action='store_true', help='只显示评分表，不进行探测')
+    args = parser.parse_args()
+
+    scoreboard = MirrorScoreboard()
+    if args.scores:
+        proxies = GITHUB_PROXY_URLS + ['']
+        for proxy in scoreboard.order(proxies):
+            success, latency, throughput = scoreboard.stats(proxy)
+            status = "隔离中" if scoreboard.quarantined(proxy) else f"预计 {scoreboard.expected_time(proxy):6.1f}s"
+            print(f"{proxy or '直连GitHub':<32}成功率 {success:4.0%}  延迟 {latency * 1000:6.0f}ms  "
+                  f"速度 {throughput / 1024:8.0f}KB/s  {status}")
+    else:
+        for result in rank_mirrors(args.repo, timeout=args.timeout):
+            scoreboard.record_probe(result.proxy, result.latency)
+            status = f"{result.latency * 1000:6.0f}ms" if result.ok else f"不可用（{result.error}）"
+            print(f"{result.label:<32}{status}")
+        scoreboard.save()
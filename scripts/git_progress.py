@@ -0,0 +1,242 @@
+import re
+import sys
+import time
+import subprocess
+from collections import deque
+
+# 诊断用保留的最后几行普通输出（进度行不保留），"Already up to date." 等结论总在最后
+TAIL_LINES = 50
+# 最多打印多少行普通输出（例如大量文件的diffstat），超出的只在最后显示几行
+MAX_PRINTED_LINES = 40
+SHOWN_TAIL_LINES = 5
+# 状态行的最短刷新间隔（秒），Windows控制台输出很慢，git每秒会输出几十次进度
+STATUS_INTERVAL = 0.5
+# 计算速度的滑动窗口（秒）
+RATE_WINDOW = 5.0
+# 会输出传输进度的命令，管道中运行时git默认不输出进度，需要加上 --progress
+PROGRESS_COMMANDS = ('pull', 'fetch', 'clone')
+
+# git --progress 的进度行，例如：
+# "remote: Compressing objects:  45% (450/1000)"
+# "Receiving objects:  45% (450/1000), 1.20 MiB | 300.00 KiB/s"
+PROGRESS_LINE = re.compile(
+    r'^(?:remote: )?(?P<phase>[A-Z][a-z]+(?: [a-z]+)*):\s+(?P<percent>\d+)% \((?P<done>\d+)/(?P<total>\d+)\)'
+    r'(?:, (?P<size>[\d.]+) (?P<unit>bytes|KiB|MiB|GiB))?'
+)
+SIZE_UNITS = {'bytes': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3}
+PHASE_LABELS = {
+    'Counting objects': "远程统计对象",
+    'Compressing objects': "远程压缩对象",
+    'Receiving objects': "接收对象",
+    'Unpacking objects': "解包对象",
+    'Resolving deltas': "处理差异",
+    'Updating files': "更新文件",
+    'Checking out files': "检出文件",
+}
+# 传输数据的阶段：对象较多时为Receiving（index-pack），较少时为Unpacking（unpack-objects）
+TRANSFER_PHASES = ('Receiving objects', 'Unpacking objects')
+
+
+def _format_rate(value):
+    if value >= 1024 ** 2:
+        return f"{value / 1024 ** 2:.1f}MB/s"
+    return f"{value / 1024:.0f}KB/s"
+
+
+def _format_eta(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class GitProgress:
+    """
+    git --progress 输出的流式解析器
+
+    进度行（以\\r刷新）只更新阶段、百分比、对象数和已接收字节数，不保留；
+    普通输出行只保留最后tail_lines行用于诊断，内存占用与输出长度无关。
+    """
+
+    def __init__(self, tail_lines=TAIL_LINES):
+        self.tail = deque(maxlen=tail_lines)
+        self.line_count = 0
+        # 解析到的进度行数，调用者据此判断进度是否有变化
+        self.updates = 0
+        self.phase = None
+        self.percent = None
+        self.done = 0
+        self.total = 0
+        self.received_bytes = None
+        self.transfer_started = None
+        self.transfer_ended = None
+        self._samples = deque()
+        self._pending = b''
+
+    def feed(self, chunk):
+        """输入一段原始输出（bytes），返回其中完整的普通输出行"""
+        parts = re.split(rb'[\r\n]', self._pending + chunk)
+        self._pending = parts.pop()
+        return [line for line in (self._parse(part) for part in parts) if line]
+
+    def finish(self):
+        """进程结束后处理最后不完整的一行，返回其中的普通输出行"""
+        pending, self._pending = self._pending, b''
+        line = self._parse(pending)
+        return [line] if line else []
+
+    def _parse(self, raw):
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line:
+            return None
+        match = PROGRESS_LINE.match(line)
+        if match is None:
+            self.line_count += 1
+            self.tail.append(line)
+            return line
+        now = time.perf_counter()
+        self.updates += 1
+        phase = match.group('phase')
+        if phase != self.phase:
+            self.phase = phase
+            self._samples.clear()
+        self.percent = int(match.group('percent'))
+        self.done = int(match.group('done'))
+        self.total = int(match.group('total'))
+        if phase in TRANSFER_PHASES:
+            if match.group('size'):
+                self.received_bytes = float(match.group('size')) * SIZE_UNITS[match.group('unit')]
+            if self.transfer_started is None:
+                self.transfer_started = now
+            self.transfer_ended = now
+        self._samples.append((now, self.done, self.received_bytes or 0))
+        while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW:
+            self._samples.popleft()
+        return None
+
+    def _rate(self, index):
+        if len(self._samples) < 2:
+            return None
+        first, last = self._samples[0], self._samples[-1]
+        elapsed = last[0] - first[0]
+        return (last[index] - first[index]) / elapsed if elapsed > 0 else None
+
+    @property
+    def objects_rate(self):
+        """当前阶段最近几秒的处理速度（对象/秒）"""
+        return self._rate(1)
+
+    @property
+    def bytes_rate(self):
+        """传输阶段最近几秒的下载速度（字节/秒）"""
+        return self._rate(2) if self.phase in TRANSFER_PHASES else None
+
+    @property
+    def eta(self):
+        """按当前速度估算当前阶段的剩余时间（秒）"""
+        rate = self.objects_rate
+        return (self.total - self.done) / rate if rate else None
+
+    @property
+    def transfer(self):
+        """(传输字节数, 传输耗时)，用于记录镜像的下载速度；没有传输进度时返回None"""
+        if self.received_bytes is None or self.transfer_started is None:
+            return None
+        return self.received_bytes, self.transfer_ended - self.transfer_started
+
+    @property
+    def output(self):
+        return '\n'.join(self.tail)
+
+    def status_text(self):
+        if self.phase is None:
+            return ""
+        parts = [f"{PHASE_LABELS.get(self.phase, self.phase)} {self.percent}% ({self.done}/{self.total})"]
+        if self.bytes_rate:
+            parts.append(_format_rate(self.bytes_rate))
+        if self.objects_rate:
+            parts.append(f"{self.objects_rate:.0f}对象/s")
+        if self.eta is not None and self.percent < 100:
+            parts.append(f"剩余 {_format_eta(self.eta)}")
+        return " ".join(parts)
+
+
+class StatusLine:
+    """在同一行刷新的状态显示（用\\r覆盖），按interval限制刷新频率"""
+
+    def __init__(self, interval=STATUS_INTERVAL, stream=None):
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.shown_at = 0
+        self.width = 0
+
+    def update(self, text, force=False):
+        now = time.perf_counter()
+        if not text or (not force and now - self.shown_at < self.interval):
+            return
+        self.shown_at = now
+        self.stream.write('\r' + text + ' ' * max(0, self.width - len(text)))
+        self.stream.flush()
+        self.width = len(text)
+
+    def clear(self):
+        if self.width:
+            self.stream.write('\r' + ' ' * self.width + '\r')
+            self.width = 0
+
+    def print(self, line):
+        """输出普通行：先清除状态行，下一次update时重新显示"""
+        self.clear()
+        self.stream.write(line + '\n')
+        self.shown_at = 0
+
+    def close(self):
+        if self.width:
+            self.stream.write('\n')
+            self.width = 0
+        self.stream.flush()
+
+
+def with_progress_flag(args):
+    """拉取类命令加上 --progress（管道中运行时git默认不输出进度）"""
+    if args and args[0] in PROGRESS_COMMANDS and '--progress' not in args:
+        return [args[0], '--progress'] + list(args[1:])
+    return list(args)
+
+
+def run_git(git, args, cwd=None, show=True, tail_lines=TAIL_LINES):
+    """
+    执行git命令并流式解析输出，返回 (退出码, GitProgress)
+
+    show为True时普通输出逐行打印（最多MAX_PRINTED_LINES行），进度在同一行按STATUS_INTERVAL刷新显示速度和剩余时间。
+    """
+    process = subprocess.Popen([git] + with_progress_flag(args), cwd=cwd,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    progress = GitProgress(tail_lines)
+    status = StatusLine() if show else None
+
+    def show_lines(lines):
+        for index, line in enumerate(lines, progress.line_count - len(lines)):
+            if index < MAX_PRINTED_LINES:
+                status.print(line)
+
+    updates = 0
+    while True:
+        chunk = process.stdout.read1(4096)
+        if not chunk:
+            break
+        lines = progress.feed(chunk)
+        if status:
+            show_lines(lines)
+            if progress.updates != updates:
+                updates = progress.updates
+                status.update(progress.status_text())
+    lines = progress.finish()
+    code = process.wait()
+    if status:
+        show_lines(lines)
+        skipped = progress.line_count - MAX_PRINTED_LINES
+        if skipped > 0:
+            status.print(f"...（省略 {skipped} 行输出，最后几行如下）")
+            for line in list(progress.tail)[-min(skipped, SHOWN_TAIL_LINES):]:
+                status.print(line)
+        status.close()
+    return code, progress
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# 上一次记录的导入耗时基线，--check时与它比较
+BASELINE_FILE = os.path.join(base_dir, 'data', 'import_baseline.json')
+
+# 各启动脚本冷启动导入耗时的上限（毫秒）
+IMPORT_BUDGETS_MS = {
+    'main': 300,
+    'check_update': 150,
+    'updater': 400,
+    'update_onekey_pack': 400,
+}
+# 相对基线允许的增长比例，以及绝对的噪声容差（毫秒），两者都超出才算退化
+REGRESSION_RATIO = 0.25
+REGRESSION_SLACK_MS = 20
+# 每个模块测量的次数，取最小值以排除磁盘缓存和系统调度的干扰
+DEFAULT_RUNS = 5
+
+
+class ImportProfile:
+    """一次 -X importtime 测量的结果"""
+
+    def __init__(self, module, total_us, packages, error=None):
+        self.module = module
+        self.total_us = total_us
+        # {顶层包名: 自身耗时(微秒)}，包括其所有子模块
+        self.packages = packages
+        self.error = error
+
+    @property
+    def total_ms(self):
+        return self.total_us / 1000
+
+
+def parse_importtime(stderr, module):
+    """解析 -X importtime 的输出，返回 (模块的累计耗时, {顶层包名: 自身耗时})，单位均为微秒"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        except ValueError:
+            continue
+        # 包名前每两个空格代表一层嵌套，第0层是被 -c 中的语句直接导入的模块
+        level = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((int(self_us), int(cumulative_us), level, name.strip()))
+    # 一个模块完成导入时才输出它自己那一行，它的所有子导入都紧挨着排在前面
+    for index in range(len(entries) - 1, -1, -1):
+        _, total_us, level, name = entries[index]
+        if level == 0 and name == module:
+            start = index
+            while start > 0 and entries[start - 1][2] > 0:
+                start -= 1
+            packages = {}
+            for self_us, _, _, name in entries[start:index + 1]:
+                top = name.split('.')[0]
+                packages[top] = packages.get(top, 0) + self_us
+            return total_us, packages
+    return None, {}
+
+
+def measure_import(module, runs=DEFAULT_RUNS, python=sys.executable, cwd=SCRIPTS_DIR):
+    """在全新的解释器中导入模块，测量runs次取最快的一次"""
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=cwd, capture_output=True, text=True, errors='replace')
+        if result.returncode != 0:
+            lines = result.stderr.strip().splitlines()
+            return ImportProfile(module, 0, {}, error=lines[-1] if lines else f"退出码 {result.returncode}")
+        total_us, packages = parse_importtime(result.stderr, module)
+        if total_us is None:
+            return ImportProfile(module, 0, {}, error="未找到导入记录")
+        if best is None or total_us < best.total_us:
+            best = ImportProfile(module, total_us, packages)
+    return best
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_baseline(profiles):
+    baseline = load_baseline()
+    baseline.update({profile.module: round(profile.total_ms, 1) for profile in profiles if profile.error is None})
+    os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+    with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+
+
+def check_profile(profile, baseline):
+    """检查是否超出预算或相对基线退化，返回问题列表"""
+    if profile.error is not None:
+        return [f"导入失败: {profile.error}"]
+    problems = []
+    budget = IMPORT_BUDGETS_MS.get(profile.module)
+    if budget is not None and profile.total_ms > budget:
+        problems.append(f"超出预算 {profile.total_ms:.0f}ms > {budget}ms")
+    previous = baseline.get(profile.module)
+    if previous is not None:
+        limit = max(previous * (1 + REGRESSION_RATIO), previous + REGRESSION_SLACK_MS)
+        if profile.total_ms > limit:
+            problems.append(f"相对基线退化 {previous:.0f}ms → {profile.total_ms:.0f}ms")
+    return problems
+
+
+def format_profile(profile, top=8):
+    """生成单个模块的耗时报告"""
+    if profile.error is not None:
+        return [f"{profile.module}: 导入失败（{profile.error}）"]
+    budget = IMPORT_BUDGETS_MS.get(profile.module)
+    budget_text = f"，预算 {budget}ms" if budget is not None else ""
+    lines = [f"{profile.module}: {profile.total_ms:.1f}ms{budget_text}"]
+    for name, self_us in sorted(profile.packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        share = self_us / profile.total_us * 100 if profile.total_us else 0
+        lines.append(f"    {name:<28}{self_us / 1000:8.1f}ms {share:5.1f}%")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='启动脚本的导入耗时报告（基于 python -X importtime）')
+    parser.add_argument('modules', nargs='*', default=list(IMPORT_BUDGETS_MS), help='要测量的模块，默认为所有启动脚本')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help=f'每个模块测量的次数，取最快的一次（默认{DEFAULT_RUNS}）')
+    parser.add_argument('--top', type=int, default=8, help='每个模块显示耗时最多的前几个包')
+    parser.add_argument('--check', action='store_true', help='超出预算或相对基线退化时以非零状态退出')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果记录为新的基线')
+    args = parser.parse_args()
+
+    baseline = load_baseline()
+    profiles = []
+    failed = False
+    for module in args.modules:
+        profile = measure_import(module, max(1, args.runs))
+        profiles.append(profile)
+        for line in format_profile(profile, args.top):
+            print(line)
+        if args.check:
+            for problem in check_profile(profile, baseline):
+                failed = True
+                print(f"    ❌ {problem}")
+        print()
+
+    if args.save_baseline:
+        save_baseline(profiles)
+        print(f"已记录基线: {BASELINE_FILE}")
+    if failed:
+        sys.exit(1)
@@ -13,6 +13,9 @@ import mysql.connector
 from mysql.connector import Error
 from logging.handlers import RotatingFileHandler
 from write_password_to_config import write_password_to_config as wpc
+from probes import probe_mysql, read_mysql_greeting, wait_until_ready
+from tracing import Phases
+from shutdown import ShutdownStep, run_ordered_shutdown, request_mysql_shutdown, MYSQL_SHUTDOWN_TIMEOUT
 
 
 def create_mysql_connection(user='root', password=None, host='localhost', port=3306, database=None):
@@ -197,19 +200,12 @@ def clean_data_directory(data_dir):
                 logger.info("🧹 开始清理数据目录...")
                 # 结束mysql服务
                 logger.warning("   正在停止MySQL服务...")
-                try:
-                    subprocess.run(
-                        ['taskkill', '/F', '/T', '/IM', 'mysqld.exe'],
-                        check=False,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True
-                    )
-                    logger.info("✅ MySQL服务已停止")
-                except Exception as e:
-                    logger.error(f"❌ 停止MySQL服务失败: {e}")
+                mysql_dir = os.path.join(get_project_root(), 'runtime', 'mysql-8.4.7')
+                if not shutdown_mysql_gracefully(mysql_dir):
+                    logger.error("❌ 停止MySQL服务失败")
                     logger.warning("⚠️ 请手动检查并关闭MySQL服务")
                     return False
+                logger.info("✅ MySQL服务已停止")
                 
                 logger.warning("   正在清理目录...")
                 shutil.rmtree(data_dir)
@@ -682,6 +678,35 @@ def initialize_mysql(mysql_dir, data_dir):
         logger.error(traceback.format_exc())
         return False
 
+def force_kill_mysql():
+    """强制结束所有mysqld进程（安全关闭超时后使用）"""
+    subprocess.run(
+        ['taskkill', '/F', '/T', '/IM', 'mysqld.exe'],
+        check=False,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+
+
+def shutdown_mysql_gracefully(mysql_dir, password=None):
+    """
+    安全关闭MySQL：先执行mysqladmin shutdown，超时后才强制结束
+
+    强制结束会让下次启动的InnoDB进行崩溃恢复，所以只作为最后手段。
+    返回MySQL是否已停止。
+    """
+    mysqladmin = os.path.join(mysql_dir, 'bin', 'mysqladmin.exe')
+    if not os.path.exists(mysqladmin):
+        mysqladmin = 'mysqladmin'
+    step = ShutdownStep(
+        'mysql', "MySQL",
+        lambda: request_mysql_shutdown(password, mysqladmin=mysqladmin),
+        check_mysql_process, force_kill_mysql, timeout=MYSQL_SHUTDOWN_TIMEOUT
+    )
+    return run_ordered_shutdown([step])
+
+
 def check_mysql_process():
     """检查是否有MySQL进程正在运行"""
     try:
@@ -849,8 +874,8 @@ def start_mysql_server(mysql_dir, data_dir):
             encoding='utf-8'
         )
         
-        # 移除无意义的等待提示，改为简单的等待
-        time.sleep(3)  # 短暂等待确保服务器启动
+        # 通过MySQL握手包探测服务器是否就绪，进程退出则立即停止等待
+        wait_until_ready(probe_mysql, "MySQL服务器", timeout=30, alive=lambda: process.poll() is None)
         
         # 检查进程是否仍在运行
         if process.poll() is None:
@@ -859,24 +884,12 @@ def start_mysql_server(mysql_dir, data_dir):
             logger.info(f"   配置文件: {my_ini_path}")
             logger.info("   端口: 3306")
             
-            # 测试连接
-            mysql_path = os.path.join(mysql_dir, 'bin', 'mysql.exe')
-            test_cmd = [mysql_path, '-u', 'root', '-e', 'SELECT VERSION();']
-            try:
-                test_result = subprocess.run(
-                    test_cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=5,
-                    text=True
-                )
-                if test_result.returncode == 0:
-                    logger.info("✅ 成功连接到MySQL服务器！")
-                    # 避免在f-string中使用转义字符
-                    output_lines = test_result.stdout.strip().splitlines()
-                    server_version = output_lines[-1] if output_lines else "未知"
-                    logger.info(f"   服务器版本: {server_version}")
-            except:
+            # 握手包中带有服务器版本，无需再启动mysql.exe测试连接
+            server_version = read_mysql_greeting()
+            if server_version:
+                logger.info("✅ 成功连接到MySQL服务器！")
+                logger.info(f"   服务器版本: {server_version}")
+            else:
                 logger.warning("⚠️  无法立即测试连接，请稍后手动验证")
                 
             return process
@@ -909,27 +922,11 @@ def start_mysql_server(mysql_dir, data_dir):
 
 
 def wait_for_mysql_ready(mysql_dir, password=None, timeout=30):
-    """等待MySQL服务器就绪"""
+    """等待MySQL服务器就绪（读取服务器握手包，不再每次启动mysql.exe；认证由后续连接完成）"""
     logger.info("⏳ 等待MySQL服务器就绪...")
-    mysql_path = os.path.join(mysql_dir, 'bin', 'mysql.exe')
-    
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            cmd = [mysql_path, '-u', 'root']
-            if password:
-                cmd.append(f'--password={password}')
-            cmd.extend(['-e', 'SELECT 1;'])
-            
-            result = subprocess.run(cmd, capture_output=True, timeout=5)
-            if result.returncode == 0:
-                logger.info("✅ MySQL服务器已就绪")
-                return True
-        except:
-            pass
-        
-        time.sleep(2)
-        show_progress(int(time.time() - start_time), timeout, "等待MySQL启动")
+    if wait_until_ready(probe_mysql, "MySQL服务器", timeout=timeout) is not None:
+        logger.info("✅ MySQL服务器已就绪")
+        return True
     
     logger.error("❌ MySQL服务器启动超时")
     return False
@@ -1015,8 +1012,12 @@ def main():
     logger.info(f"{'='*70}")
     
     mysql_process = None
+    mysql_dir = None
+    complex_password = None
     start_time = time.time()
     verification_result = None
+    # 按步骤记录时间线，导出后可查看每一步的耗时
+    steps = Phases(cat='init_mysql')
     
     try:
         # 显示进度
@@ -1024,11 +1025,13 @@ def main():
         
         # 1. 创建my.ini配置文件
         logger.info("[1/5] 创建配置文件")
+        steps.begin("[1/5] 创建配置文件")
         mysql_dir, data_dir, my_ini_path = create_my_ini()
         print()
         
         # 2. 初始化MySQL
         logger.info("[2/5] 初始化MySQL数据库")
+        steps.begin("[2/5] 初始化MySQL数据库")
         # 初始化MySQL数据库（使用无密码模式）
         init_result = initialize_mysql(mysql_dir, data_dir)
         # 无密码初始化时不需要提取临时密码
@@ -1042,14 +1045,12 @@ def main():
         
         # 3. 启动MySQL服务器
         logger.info("[3/5] 启动MySQL服务器")
+        steps.begin("[3/5] 启动MySQL服务器")
         mysql_process = start_mysql_server(mysql_dir, data_dir)
         if not mysql_process:
             logger.error("服务器启动失败，退出程序")
             sys.exit(1)
         
-        # 添加等待时间确保服务器完全启动
-        time.sleep(5)
-        
         # 生成一个复杂的16位随机密码
         complex_password = generate_strong_password(16)
         # 修改MySQL root密码
@@ -1066,6 +1067,7 @@ def main():
         
         # 4. 创建小智AI数据库和表结构
         logger.info("[4/5] 创建数据库和表结构")
+        steps.begin("[4/5] 创建数据库和表结构")
         # 保存生成的随机密码到文件
         save_password_to_file(complex_password)
         
@@ -1081,11 +1083,11 @@ def main():
         
         # 5. 验证初始化结果
         logger.info("[5/5] 验证初始化结果")
+        steps.begin("[5/5] 验证初始化结果")
         # 重新启动MySQL以确保服务正常运行
         if not check_mysql_process():
             logger.warning("MySQL进程未运行，重新启动...")
             mysql_process = start_mysql_server(mysql_dir, data_dir)
-            time.sleep(2)  # 保留短暂等待确保服务器启动
         
         # 执行验证，首先使用生成的随机密码
         verification_result = verify_mysql_installation(mysql_dir, password=complex_password)
@@ -1152,16 +1154,15 @@ def main():
         traceback.print_exc()
         logger.warning("请检查错误信息并尝试解决问题后重新运行")
     finally:
-        try:
-            # 检查mysqld.exe进程是否存在
-            result = subprocess.run(["tasklist", "/FI", "IMAGENAME eq mysqld.exe"], capture_output=True, text=True)
-            if "mysqld.exe" in result.stdout:
-                subprocess.run(["taskkill", "/F", "/IM", "mysqld.exe"], check=True)
-                logger.warning("MySQL进程已终止")
+        steps.end()
+        # 安全关闭初始化时启动的MySQL，避免下次启动时进行崩溃恢复
+        if check_mysql_process():
+            if shutdown_mysql_gracefully(mysql_dir or os.path.join(get_project_root(), 'runtime', 'mysql-8.4.7'), complex_password):
+                logger.info("MySQL已安全关闭")
             else:
-                logger.info("MySQL进程未运行，无需终止")
-        except subprocess.CalledProcessError:
-            logger.warning("终止MySQL进程时出错")
+                logger.warning("终止MySQL进程时出错")
+        else:
+            logger.info("MySQL进程未运行，无需终止")
         logger.info("初始化工具执行完毕，5秒后自动退出，如果没有自动退出，请手动关闭本窗口")
         time.sleep(5)
 
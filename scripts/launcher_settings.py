@@ -0,0 +1,54 @@
+import os
+import json
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 启动器设置文件，不存在时使用默认设置
+SETTINGS_FILE = os.path.join(base_dir, 'data', 'launcher_settings.json')
+
+# 默认设置
+DEFAULT_SETTINGS = {
+    # 前端启动方式：production（构建后由静态服务器提供）或 dev（npm run serve 开发服务器）
+    "frontend_mode": "production",
+    # 后端启动方式：jar（打包后java -jar + AppCDS）或 maven（mvn spring-boot:run）
+    "backend_mode": "jar",
+    # jar模式的JVM参数，为null时使用backend_launcher.DEFAULT_JAVA_OPTIONS
+    "backend_java_options": None,
+    # 小智AI服务器工作进程数：1为单进程；大于1或"auto"（按CPU核心数）时启动多个进程并由负载均衡器分配设备
+    "xiaozhi_workers": 1,
+    # 是否为各服务应用资源配置（优先级、CPU亲和性、内存上限）
+    "resource_profiles_enabled": True,
+    # 覆盖resource_profiles.DEFAULT_PROFILES中的配置；内存上限默认不启用，需要时按服务开启，
+    # 例如 {"mysql": {"memory_mb": 4096}}，上限要明显高于服务实际占用（manager-api的maven模式包含两个JVM）
+    "resource_profiles": {},
+    # 是否对src仓库使用稀疏检出，只检出sparse_modules中的模块（见sparse_profile.SPARSE_MODULES）
+    "sparse_checkout": False,
+    "sparse_modules": ["xiaozhi_server", "manager_api", "manager_web", "digital_human"],
+    # 是否在后台（低优先级）预先下载代码更新，以及限速（KB/s，0为不限速）
+    "update_prefetch": True,
+    "update_prefetch_rate_kb": 512,
+    # 是否在空闲时对各仓库进行增量git维护（见git_maintenance.MAINTENANCE_TASKS）
+    "git_maintenance": True,
+}
+
+
+def load_settings():
+    """读取启动器设置，缺失的项使用默认值"""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
+            user_settings = json.load(f)
+        if isinstance(user_settings, dict):
+            settings.update(user_settings)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"⚠️ 读取启动器设置失败，将使用默认设置: {e}")
+    return settings
+
+
+def save_settings(settings):
+    """保存启动器设置"""
+    os.makedirs(os.path.dirname(SETTINGS_FILE), exist_ok=True)
+    with open(SETTINGS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=4)
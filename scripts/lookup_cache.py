@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import threading
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 装饰性网络查询（一言等）的磁盘缓存
+CACHE_FILE = os.path.join(base_dir, 'data', '.lookup_cache.json')
+# 查询失败后至少间隔多久再重试（秒），避免离线时不停发起请求
+RETRY_AFTER_FAILURE = 60
+
+_lock = threading.Lock()
+_lookups = {}
+_entries = None
+_inflight = set()
+
+
+class Lookup:
+    """一个可以在后台刷新的查询"""
+
+    def __init__(self, name, fetch, ttl, expire=None):
+        """
+        参数:
+        name: 缓存键
+        fetch: 实际执行查询的函数，返回可JSON序列化的值，失败时抛出异常
+        ttl: 缓存值超过该秒数后在读取时触发后台刷新，0表示每次读取后都刷新
+        expire: 缓存值超过该秒数后不再使用，None表示一直可用
+        """
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.expire = expire
+        self.failed_at = 0
+
+
+def _load():
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+                _entries = json.load(f)
+        except (OSError, ValueError):
+            _entries = {}
+    return _entries
+
+
+def _save():
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp_file = CACHE_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(_entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, CACHE_FILE)
+    except OSError:
+        pass
+
+
+def register_lookup(name, fetch, ttl, expire=None):
+    """登记一个查询，之后可以通过get_cached读取"""
+    _lookups[name] = Lookup(name, fetch, ttl, expire)
+
+
+def _refresh(lookup):
+    try:
+        value = lookup.fetch()
+    except Exception:
+        lookup.failed_at = time.time()
+        value = None
+    with _lock:
+        _inflight.discard(lookup.name)
+        if value is not None:
+            _load()[lookup.name] = {'value': value, 'fetched_at': time.time()}
+            _save()
+
+
+def refresh_async(name):
+    """在后台线程中刷新查询，同一个查询同时只有一个刷新在进行"""
+    lookup = _lookups[name]
+    with _lock:
+        if name in _inflight or time.time() - lookup.failed_at < RETRY_AFTER_FAILURE:
+            return
+        _inflight.add(name)
+    threading.Thread(target=_refresh, args=(lookup,), daemon=True).start()
+
+
+def prefetch_all():
+    """启动时在后台预取所有登记的查询"""
+    for name in _lookups:
+        refresh_async(name)
+
+
+def get_cached(name, default=None):
+    """
+    立即返回缓存值（从不等待网络），缓存过期时在后台刷新
+
+    没有可用的缓存值时返回default。
+    """
+    lookup = _lookups[name]
+    with _lock:
+        entry = _load().get(name)
+    age = time.time() - entry['fetched_at'] if entry else None
+    if entry is None or age >= lookup.ttl:
+        refresh_async(name)
+    if entry is None or (lookup.expire is not None and age > lookup.expire):
+        return default
+    return entry['value']
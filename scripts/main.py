@@ -2,9 +2,26 @@ import os
 import sys
 import time
 import json
-import requests
+import threading
 import subprocess
-import ctypes
+from supervisor import Supervisor
+from process_control import get_backend
+from step_cache import run_cached_step, get_skipped_summary, pip_install_cached
+from launcher_settings import load_settings
+from static_server import precompress_dir
+from backend_launcher import (find_packaged_jar, prepare_app, build_java_command, ensure_cds_archive,
+                              record_ready_time, format_ready_comparison)
+from tracing import span, traced, export_chrome_trace
+from ws_balancer import resolve_worker_count
+from resource_profiles import get_profile
+from resource_monitor import ResourceSampler
+from lookup_cache import register_lookup, get_cached, prefetch_all
+from change_plan import load_pending, clear_pending, format_plan
+from shutdown import (ShutdownStep, run_ordered_shutdown, request_mysql_shutdown, request_redis_shutdown,
+                      MYSQL_SHUTDOWN_TIMEOUT, REDIS_SHUTDOWN_TIMEOUT)
+from service_graph import ServiceNode, run_service_graph, format_report
+from probes import (probe_mysql, probe_redis, probe_http, probe_tcp, wait_until_ready,
+                    MANAGER_API_URL, MANAGER_WEB_URL, XIAOZHI_WS_PORT)
 
 try:
     import webbrowser
@@ -22,6 +39,63 @@ except Exception as e:
 # 获取当前脚本所在目录的父目录作为基础路径
 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 runtime_dir = os.path.join(base_dir, 'runtime')
+# 安装Python依赖使用的PyPI镜像
+PIP_MIRROR_URL = "https://pypi.tuna.tsinghua.edu.cn/simple/"
+
+# 启动器设置
+settings = load_settings()
+# 进程控制后端（Windows / POSIX）
+process_backend = get_backend()
+# 常驻服务由守护器持有，崩溃后自动重启
+supervisor = Supervisor(process_backend)
+
+
+def profile_for(name):
+    """服务的资源配置（优先级、CPU亲和性、内存上限），每次启动都会应用"""
+    if not settings['resource_profiles_enabled']:
+        return None
+    return get_profile(name, settings['resource_profiles'])
+
+
+def sampler_targets():
+    """资源采样对象：守护器持有的进程，其次是之前的启动器留下的PID文件"""
+    targets = {}
+    for name, service in supervisor.services.items():
+        pid = service.pid if service.is_running() else process_backend.read_pid(name)
+        targets[name] = (service.label, pid)
+    return targets
+
+
+# 后台资源采样器，在菜单中查看实时仪表盘
+resource_sampler = ResourceSampler(sampler_targets)
+
+supervisor.register('mysql', 'mysqld --console', label="MySQL服务器", profile=profile_for('mysql'))
+supervisor.register('redis', 'redis-server', cwd=os.path.join(base_dir, 'data'), label="Redis服务器", profile=profile_for('redis'))
+frontend_dir = os.path.join(base_dir, 'src', 'main', 'manager-web')
+if settings['frontend_mode'] == 'dev':
+    # 开发模式：webpack开发服务器（文件监听、热更新）
+    supervisor.register('frontend', 'npm run serve', cwd=frontend_dir, label="前端服务器", profile=profile_for('frontend'))
+else:
+    # 生产模式：由静态服务器提供构建好的dist目录
+    static_server_script = os.path.join(base_dir, 'scripts', 'static_server.py')
+    frontend_dist = os.path.join(frontend_dir, 'dist')
+    supervisor.register('frontend', f'"{sys.executable}" "{static_server_script}" --root "{frontend_dist}" --port 8001',
+                        cwd=frontend_dir, label="前端服务器", profile=profile_for('frontend'))
+if settings['backend_mode'] == 'maven':
+    # Maven模式：每次启动都经过依赖解析和编译检查
+    supervisor.register('manager_api', 'mvn spring-boot:run', cwd=os.path.join(base_dir, 'src', 'main', 'manager-api'), label="后端API服务器", profile=profile_for('manager_api'))
+else:
+    # jar模式：启动打包好的jar并复用CDS归档，命令在启动时根据最新的jar生成
+    supervisor.register('manager_api', lambda: build_java_command(settings['backend_java_options']),
+                        cwd=os.path.join(base_dir, 'src', 'main', 'manager-api'), label="后端API服务器", profile=profile_for('manager_api'))
+xiaozhi_workers = resolve_worker_count(settings['xiaozhi_workers'])
+if xiaozhi_workers == 1:
+    supervisor.register('xiaozhi_server', 'python app.py', cwd=os.path.join(base_dir, 'src', 'main', 'xiaozhi-server'), label="小智AI服务器", profile=profile_for('xiaozhi_server'))
+else:
+    # 多进程模式：负载均衡器监听原端口，按设备ID把连接分配给多个app.py工作进程
+    balancer_script = os.path.join(base_dir, 'scripts', 'ws_balancer.py')
+    supervisor.register('xiaozhi_server', f'"{sys.executable}" "{balancer_script}" --workers {xiaozhi_workers}',
+                        cwd=os.path.join(base_dir, 'scripts'), label="小智AI服务器", profile=profile_for('xiaozhi_server'))
 
 # 定义终端输出
 def print_gradient_text(text, start_color, end_color):
@@ -50,24 +124,84 @@ def print_gradient_text(text, start_color, end_color):
     # 组合所有字符并重置颜色
     print(''.join(gradient_text) + '\033[0m')
 
+def fetch_hitokoto():
+    """从网络获取一言，失败时抛出异常（由lookup_cache在后台调用）"""
+    # requests导入较慢，在后台线程中用到时才导入，不拖慢启动器
+    import requests
+    response = requests.get('https://v1.hitokoto.cn/', timeout=5)
+    response.raise_for_status()
+    data = response.json()
+    return {
+        'hitokoto': data.get('hitokoto', ''),
+        'from': data.get('from', ''),
+        'from_who': data.get('from_who') or '未知',
+    }
+
+
+# 一言：每次显示后都在后台换下一条，30天内的缓存都可以显示
+register_lookup('hitokoto', fetch_hitokoto, ttl=0, expire=30 * 24 * 3600)
+
+
+# 后台预取中的仓库 {名称: update_all.RepoUpdate}，菜单据此显示实时进度
+update_prefetch = {}
+
+
+def fetch_code_updates():
+    """检查一键包和各服务端代码是否有更新，开启预取时在后台低优先级下载新提交（由lookup_cache在后台调用）"""
+    # update_all会导入网络相关模块，用到时才导入，不拖慢启动器
+    if not settings['update_prefetch']:
+        from update_all import check_repositories
+        return check_repositories(base_dir)
+    from update_all import prefetch_repositories
+    return prefetch_repositories(base_dir, settings['update_prefetch_rate_kb'] * 1024, live=update_prefetch)
+
+
+# 代码更新检查和预取：每次启动时在后台进行一次，之后每小时一次，结果显示在菜单中
+register_lookup('code_updates', fetch_code_updates, ttl=3600, expire=7 * 24 * 3600)
+
+
+def prefetch_running():
+    """后台预取是否正在进行"""
+    return any(repo.state in ("检查更新", "选择镜像", "下载中") for repo in update_prefetch.values())
+
+
+def start_git_maintenance():
+    """在后台线程中于空闲时对各仓库进行增量git维护，后台预取期间不进行"""
+    def run():
+        # git_maintenance会导入update_all等模块，在线程中才导入，不拖慢启动器
+        from git_maintenance import maintenance_loop
+        maintenance_loop(base_dir, busy=prefetch_running)
+
+    if settings['git_maintenance']:
+        threading.Thread(target=run, daemon=True).start()
+
+
+def code_update_text():
+    """菜单中显示的代码更新状态，没有需要提示的内容时返回None"""
+    plan = load_pending()
+    if plan.builds or plan.restarts:
+        return "🔧 已拉取的代码更新尚未应用，请选择 13. 应用代码更新\n" + "\n".join(format_plan(plan))
+    if prefetch_running():
+        return "后台预取更新: " + " | ".join(repo.progress_text() for repo in update_prefetch.values())
+    updates = get_cached('code_updates') or {}
+    outdated = [item for item in updates.values() if item['up_to_date'] is False]
+    if not outdated:
+        return None
+    labels = '、'.join(item['label'] for item in outdated)
+    if all(item.get('ready') for item in outdated):
+        return f"📦 代码更新已在后台下载完成：{labels}（运行“双击我同时更新全部代码”，几秒即可完成更新）"
+    return f"📦 发现代码更新：{labels}（运行“双击我同时更新全部代码”即可更新）"
+
+
 def get_hitokoto():
-    """获取一言"""
-    print_gradient_text("正在加载中，请耐心等待...", (200, 250, 50), (0, 128, 0))
-    try:
-        response = requests.get('https://v1.hitokoto.cn/', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            hitokoto = data.get('hitokoto', '')
-            from_ = data.get('from', '')
-            from_who = data.get('from_who', '未知')
-            if not from_who:
-                from_who = '未知'
-            return True, f"""===================================【一言】========================================
-    {hitokoto}  —— 【{from_}】 {from_who}
+    """获取一言（只读取缓存，从不等待网络）"""
+    data = get_cached('hitokoto')
+    if not data:
+        return False, ""
+    return True, f"""===================================【一言】========================================
+    {data['hitokoto']}  —— 【{data['from']}】 {data['from_who']}
 ===================================================================================
 """
-    except Exception as e:
-        return False, ""
 
 def get_welcome_text():
     """生成欢迎页面文本"""
@@ -99,6 +233,7 @@ def get_welcome_text():
         print_gradient_text(line, (160, 240, 160), (40, 200, 40))
 
 # 设置环境变量
+@traced("设置环境变量")
 def set_environment_variables():
     """设置环境变量.bat"""
     # Java环境变量
@@ -122,7 +257,7 @@ def set_environment_variables():
     # 获取当前PATH
     current_path = os.environ.get('PATH', '')
     # 构建新的PATH
-    new_path = f"{runtime_path};{jdk_path};{maven_path};{mysql_path};{redis_path};{node_path};{python_path};{ffmpeg_path};{current_path}"
+    new_path = os.pathsep.join([runtime_path, jdk_path, maven_path, mysql_path, redis_path, node_path, python_path, ffmpeg_path, current_path])
     # 设置环境变量
     os.environ['RUNTIME_PATH'] = runtime_path
     os.environ['JDK_PATH'] = jdk_path
@@ -137,30 +272,32 @@ def set_environment_variables():
 
     print_gradient_text("🎉运行环境初始化成功！\n", (200, 250, 50), (0, 128, 0))
 
-def start_process(cmd, cwd=None, window_title=None, wait=False):
-    """在单独的窗口启动进程，如果wait=True则等待进程完成并返回布尔值表示成功与否"""
-    try:
-        if wait:
-            # 使用cmd /c让命令执行完后自动关闭窗口，并等待完成
-            process = subprocess.run(
-                f'start "{window_title}" cmd /c "{cmd}"', 
-                cwd=cwd, 
-                shell=True,
-                check=False,
-                capture_output=True,
-                text=True
-            )
-            return process.returncode == 0
-        else:
-            # 不等待进程完成
-            if window_title:
-                subprocess.Popen(f'start "{window_title}" cmd /k "{cmd}"', cwd=cwd, shell=True)
-            else:
-                subprocess.Popen(f'start cmd /k "{cmd}"', cwd=cwd, shell=True)
-            return True
-    except Exception as e:
-        print(f"执行命令时出错: {e}")
-        return False
+def start_process(cmd, cwd=None, window_title=None, wait=False, profile=None):
+    """在单独的窗口启动进程，如果wait=True则等待进程完成并返回布尔值表示成功与否；profile为资源配置"""
+    with span(f"执行: {window_title or cmd}", cat='process', cmd=cmd, wait=wait) as s:
+        try:
+            result = process_backend.run(cmd, cwd=cwd, title=window_title, wait=wait, profile=profile)
+        except Exception as e:
+            print(f"执行命令时出错: {e}")
+            result = False
+        s.set(result=result)
+    return result
+
+def script_command(script):
+    """用当前Python解释器运行scripts目录下脚本的命令，Windows和POSIX都可用"""
+    script_path = os.path.join(base_dir, 'scripts', script)
+    return f'"{sys.executable}" "{script_path}"'
+
+def clear_screen():
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+def stop_service(name, use_admin=False):
+    """结束服务：先让守护器停止自动重启并结束它持有的进程，再按PID文件结束之前启动的进程"""
+    managed = supervisor.services[name].is_running()
+    stopped = supervisor.stop(name) and managed
+    if use_admin or not stopped:
+        stopped = process_backend.stop_service(name, use_admin=use_admin)
+    return stopped
 
 def check_config():
     # 定义配置成功文件路径 - 移到函数开头确保所有代码路径都能访问
@@ -172,7 +309,7 @@ def check_config():
         print("正在打开配置初始化工具...")
         # 启动配置初始化工具并等待其完成
         print("请完成配置初始化...")
-        success = start_process(r'python scripts\init_config_pyside6.py', cwd=base_dir, window_title="小智服务端配置初始化", wait=True)
+        success = start_process(script_command('init_config_pyside6.py'), cwd=base_dir, window_title="小智服务端配置初始化", wait=True)
         
         # 检查配置是否已初始化
         if not os.path.exists(config_success_file):
@@ -194,6 +331,7 @@ def check_mysql():
     else:
         return False
 
+@traced("单独启动MySQL服务")
 def start_mysql_service():
     """单独启动MySQL服务"""
     if not check_mysql():
@@ -209,148 +347,271 @@ def start_mysql_service():
         if is_init:
             # 执行初始化MySQL数据库
             print("正在初始化MySQL数据库，请不要关闭本窗口...")
-            start_process(r'python scripts\init_mysql.py', cwd=base_dir, window_title="MySQL初始化", wait=True)
+            start_process(script_command('init_mysql.py'), cwd=base_dir, window_title="MySQL初始化", wait=True)
             print("MySQL初始化完成，现在启动MySQL服务...")
         else:
             print("已取消MySQL数据库初始化操作！")
             return
             
     print("正在启动MySQL服务...")
-    mysql_cmd = 'mysqld --console'
-    start_process(mysql_cmd, window_title="MySQL服务器")
-    print("MySQL服务已启动！")
+    if supervisor.start('mysql'):
+        print("MySQL服务已启动！")
 
 
+@traced("单独启动Redis服务")
 def start_redis_service():
     """单独启动Redis服务"""
     print("正在启动Redis服务...")
-    redis_cwd = os.path.join(base_dir, 'data')
-    print(f"Redis运行目录: {redis_cwd}")
-    redis_cmd = 'redis-server.exe'
-    start_process(redis_cmd, cwd=redis_cwd, window_title="Redis服务器")
-    print("Redis服务已启动！")
+    print(f"Redis运行目录: {supervisor.services['redis'].cwd}")
+    if supervisor.start('redis'):
+        print("Redis服务已启动！")
 
 
+def install_frontend_deps():
+    """安装前端依赖，package.json和package-lock.json未变化时跳过"""
+    frontend_cwd = os.path.join(base_dir, 'src', 'main', 'manager-web')
+
+    def install():
+        print("开始安装前端依赖...")
+        if start_process('npm install', cwd=frontend_cwd, window_title="前端依赖安装", wait=True, profile=profile_for('build')):
+            print("前端依赖安装成功！")
+            return True
+        print("前端依赖安装失败！")
+        return False
+
+    return run_cached_step(
+        'npm_install', "前端依赖安装",
+        [os.path.join(frontend_cwd, 'package.json'), os.path.join(frontend_cwd, 'package-lock.json')],
+        install, outputs=[os.path.join(frontend_cwd, 'node_modules')]
+    )
+
+def build_frontend():
+    """生产模式下构建前端并生成预压缩文件，源码未变化时跳过"""
+    frontend_cwd = os.path.join(base_dir, 'src', 'main', 'manager-web')
+    dist_dir = os.path.join(frontend_cwd, 'dist')
+
+    def build():
+        print("开始构建前端...")
+        if not start_process('npm run build', cwd=frontend_cwd, window_title="前端构建", wait=True, profile=profile_for('build')):
+            print("前端构建失败！")
+            return False
+        count = precompress_dir(dist_dir)
+        print(f"前端构建完成！已生成 {count} 个预压缩文件")
+        return True
+
+    inputs = [os.path.join(frontend_cwd, name) for name in (
+        'package.json', 'package-lock.json', 'vue.config.js', 'babel.config.js', '.env', '.env.production', 'src', 'public'
+    )]
+    return run_cached_step('frontend_build', "前端构建", inputs, build, outputs=[os.path.join(dist_dir, 'index.html')])
+
+def build_backend():
+    """编译（Maven模式）或打包（jar模式）后端API服务器，pom.xml和源码未变化时跳过"""
+    backend_cwd = os.path.join(base_dir, 'src', 'main', 'manager-api')
+    inputs = [os.path.join(backend_cwd, 'pom.xml'), os.path.join(backend_cwd, 'src')]
+
+    if settings['backend_mode'] == 'maven':
+        def build():
+            print("开始编译后端API服务器...")
+            if start_process('mvn -q -DskipTests compile', cwd=backend_cwd, window_title="后端API编译", wait=True, profile=profile_for('build')):
+                print("后端API编译完成！")
+                return True
+            print("后端API编译失败！")
+            return False
+
+        return run_cached_step('maven_compile', "后端编译", inputs, build,
+                               outputs=[os.path.join(backend_cwd, 'target', 'classes')])
+
+    def package():
+        print("开始打包后端API服务器...")
+        if not start_process('mvn -q -DskipTests package', cwd=backend_cwd, window_title="后端API打包", wait=True, profile=profile_for('build')):
+            print("后端API打包失败！")
+            return False
+        jar_path = find_packaged_jar()
+        if jar_path is None:
+            print("未找到打包生成的jar！")
+            return False
+        prepare_app(jar_path)
+        print(f"后端API打包完成: {jar_path}")
+        return True
+
+    # jar不存在时（例如被mvn clean删除）传入空路径，使缓存失效
+    return run_cached_step('maven_package', "后端打包", inputs, package, outputs=[find_packaged_jar() or ''])
+
+def wait_for_backend_ready_and_record():
+    """等待后端就绪，并记录本次启动方式的就绪耗时用于对比"""
+    start = time.perf_counter()
+    if not wait_for_backend_api():
+        return False
+    data = record_ready_time(settings['backend_mode'], time.perf_counter() - start)
+    comparison = format_ready_comparison(data)
+    if comparison:
+        print(comparison)
+    return True
+
+@traced("单独启动前端服务")
 def start_frontend_service():
     """单独启动前端服务"""
     print("启动前端服务...")
-    frontend_cwd = os.path.join(base_dir, 'src', 'main', 'manager-web')
-    # 先安装依赖（等待完成）
-    print("开始安装前端依赖...")
-    if start_process('npm install', cwd=frontend_cwd, window_title="前端依赖安装", wait=True):
-        print("前端依赖安装成功！")
+    # 先安装依赖（等待完成，依赖未变化时跳过）；生产模式还需要构建
+    if install_frontend_deps() and (settings['frontend_mode'] == 'dev' or build_frontend()):
         # 启动服务（不等待）
         print("启动前端服务...")
-        start_process('title 前端服务器 & npm run serve', cwd=frontend_cwd, window_title="前端服务器")
+        supervisor.start('frontend')
         print("请在浏览器中访问 http://localhost:8001 查看。")
-        print("即将在5秒后自动打开浏览器...")
-        time.sleep(5)
+        print("前端服务就绪后将自动打开浏览器...")
+        wait_until_ready(lambda: probe_http(MANAGER_WEB_URL), "前端服务", timeout=120)
         webbrowser.open("http://localhost:8001")
     else:
-        print("前端依赖安装失败！")
+        print("前端依赖安装或构建失败，无法启动前端服务！")
 
-def kill_mysql(use_admin=False):
-    """单独结束MySQL服务"""
-    if use_admin:
-        try:
-            print("正在以管理员权限结束MySQL进程...")
-            print("期间可能会弹出两次UAC弹窗，请点击“是”。")
-            # 结束MySQL相关进程
-            # 以管理员权限执行taskkill命令结束mysqld.exe进程
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", "/F /IM mysqld.exe /T", None, 0)
-            # 以管理员权限执行taskkill命令结束mysql.exe进程
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", "/F /IM mysql.exe /T", None, 0)
-        except Exception as e:
-            print(f"以管理员身份结束进程时出错: {e}")
-    else:
-        try:
-            print("正在结束MySQL...")
-            subprocess.run("taskkill /F /IM mysqld.exe /T", shell=True)
-            subprocess.run("taskkill /F /IM mysql.exe /T", shell=True)
-        except Exception as e:
-            print(f"结束进程时出错: {e}")
+def service_alive(name):
+    """服务是否仍在运行：优先用守护器持有的进程判断，其次是PID文件和进程映像名"""
+    if supervisor.services[name].is_running():
+        return True
+    return process_backend.read_pid(name) is not None or process_backend.is_image_running(name)
 
+def build_shutdown_steps(use_admin=False):
+    """
+    有序停止的步骤：先停依赖数据库的小智AI服务器和后端API，再安全关闭MySQL和Redis
+
+    MySQL使用mysqladmin shutdown让InnoDB干净地关闭，Redis使用SHUTDOWN SAVE先保存快照，
+    超时后才强制结束进程。
+    """
+    def stop_app(name):
+        return lambda: stop_service(name)
+
+    def force(name):
+        return lambda: stop_service(name, use_admin)
+
+    def alive(name):
+        return lambda: service_alive(name)
+
+    def request_mysql():
+        supervisor.release('mysql')
+        return request_mysql_shutdown()
+
+    def request_redis():
+        supervisor.release('redis')
+        return request_redis_shutdown()
+
+    return [
+        ShutdownStep('xiaozhi_server', "小智AI服务器", stop_app('xiaozhi_server'), alive('xiaozhi_server'), force('xiaozhi_server')),
+        ShutdownStep('manager_api', "后端API服务器", stop_app('manager_api'), alive('manager_api'), force('manager_api')),
+        ShutdownStep('frontend', "前端服务器", stop_app('frontend'), alive('frontend'), force('frontend')),
+        ShutdownStep('mysql', "MySQL", request_mysql, alive('mysql'), force('mysql'), timeout=MYSQL_SHUTDOWN_TIMEOUT),
+        ShutdownStep('redis', "Redis", request_redis, alive('redis'), force('redis'), timeout=REDIS_SHUTDOWN_TIMEOUT),
+    ]
+
+def shutdown_services(names, use_admin=False):
+    """按有序停止的顺序停止指定的服务"""
+    steps = [step for step in build_shutdown_steps(use_admin) if step.name in names]
+    try:
+        run_ordered_shutdown(steps)
+    except Exception as e:
+        print(f"停止服务时出错: {e}")
+    # 更新守护器中的状态并清理PID文件
+    for step in steps:
+        supervisor.stop(step.name)
+
+def kill_mysql(use_admin=False):
+    """单独安全关闭MySQL服务"""
+    shutdown_services(['mysql'], use_admin)
     print("已成功执行操作！将在3秒后继续...")
     time.sleep(3)
 
 def kill_redis(use_admin=False):
-    """单独结束MySQL服务"""
-    if use_admin:
-        try:
-            print("正在以管理员权限结束MySQL和Redis相关进程...")
-            print("期间可能会弹出四次UAC弹窗，请点击“是”。")
-            # 以管理员权限执行taskkill命令结束redis-server.exe进程
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", "/F /IM redis-server.exe /T", None, 0)
-            # 以管理员权限执行taskkill命令结束redis-cli.exe进程
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", "/F /IM redis-cli.exe /T", None, 0)
-        except Exception as e:
-            print(f"以管理员身份结束进程时出错: {e}")
-    else:
-        try:
-            print("正在结束Redis...")
-            print("结束Redis相关进程...")
-            subprocess.run("taskkill /F /IM redis-server.exe /T", shell=True)
-            subprocess.run("taskkill /F /IM redis-cli.exe /T", shell=True)
-        except Exception as e:
-            print(f"结束进程时出错: {e}")
-
+    """单独安全关闭Redis服务"""
+    shutdown_services(['redis'], use_admin)
     print("已成功执行操作！将在3秒后继续...")
     time.sleep(3)
 
-def end_database_processes(use_admin=False):
-    """使用管理员权限结束MySQL和Redis相关进程"""
+@traced("有序停止所有服务")
+def stop_all_services(use_admin=False):
+    """按 小智AI服务器 -> 后端API -> 前端 -> MySQL -> Redis 的顺序停止所有服务，use_admin=True时强制结束使用管理员权限"""
     if use_admin:
-        try:
-            print("正在以管理员权限结束MySQL和Redis相关进程...")
-            print("期间可能会弹出四次UAC弹窗，请点击“是”。")
-            # 结束MySQL相关进程
-            print("结束MySQL相关进程...")
-            # 以管理员权限执行taskkill命令结束mysqld.exe进程
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", "/F /IM mysqld.exe /T", None, 0)
-            # 以管理员权限执行taskkill命令结束mysql.exe进程
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", "/F /IM mysql.exe /T", None, 0)
-            # 结束Redis相关进程
-            print("结束Redis相关进程...")
-            # 以管理员权限执行taskkill命令结束redis-server.exe进程
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", "/F /IM redis-server.exe /T", None, 0)
-            # 以管理员权限执行taskkill命令结束redis-cli.exe进程
-            ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", "/F /IM redis-cli.exe /T", None, 0)
-        except Exception as e:
-            print(f"以管理员身份结束进程时出错: {e}")
+        print("正在有序停止所有服务，需要强制结束时将使用管理员权限...")
+        print("期间可能会弹出UAC弹窗，请点击“是”。")
     else:
-        try:
-            print("正在结束MySQL和Redis相关进程...")
-            print("结束MySQL相关进程...")
-            subprocess.run("taskkill /F /IM mysqld.exe /T", shell=True)
-            subprocess.run("taskkill /F /IM mysql.exe /T", shell=True)
-            print("结束Redis相关进程...")
-            subprocess.run("taskkill /F /IM redis-server.exe /T", shell=True)
-            subprocess.run("taskkill /F /IM redis-cli.exe /T", shell=True)
-        except Exception as e:
-            print(f"结束进程时出错: {e}")
-
+        print("正在有序停止所有服务...")
+    shutdown_services([step.name for step in build_shutdown_steps()], use_admin)
     print("已成功执行操作！将在3秒后继续...")
     time.sleep(3)
 
+def run_update_build(name):
+    """执行更新计划中的一个构建步骤，返回是否成功（源码和依赖未变化的步骤由step_cache跳过）"""
+    if name == 'pip_xiaozhi':
+        return pip_install_cached(os.path.join(base_dir, 'src', 'main', 'xiaozhi-server', 'requirements.txt'),
+                                  PIP_MIRROR_URL, label="小智服务器依赖")
+    if name == 'pip_music':
+        return pip_install_cached(os.path.join(base_dir, 'src', 'main', 'music-xiaozhi-server', 'requirements.txt'),
+                                  PIP_MIRROR_URL, label="音乐服务器依赖")
+    if name == 'pip_scripts':
+        return pip_install_cached(os.path.join(base_dir, 'scripts', 'requirements.txt'), PIP_MIRROR_URL, label="一键包依赖")
+    if name == 'maven':
+        return build_backend()
+    if name == 'npm_install':
+        return install_frontend_deps()
+    if name == 'frontend_build':
+        # 开发模式由开发服务器热更新，不需要构建
+        return settings['frontend_mode'] == 'dev' or build_frontend()
+    return True
+
+@traced("应用代码更新")
+def apply_code_update():
+    """
+    按更新计划只重建和重启受影响的服务
+
+    先停止受影响且正在运行的服务，执行计划中的构建步骤，再按依赖顺序重新启动它们；
+    未运行的服务不需要重启，下次启动时会使用新代码。全部构建成功后才清除计划。
+    """
+    plan = load_pending()
+    if not plan.builds and not plan.restarts:
+        print("没有待应用的代码更新。")
+        time.sleep(3)
+        return
+    print('\n'.join(format_plan(plan)))
+    running = [name for name in plan.restarts if service_alive(name)]
+    if running:
+        print("正在停止受影响的服务...")
+        shutdown_services(running)
+    failed = [name for name in plan.builds if not run_update_build(name)]
+    for name in running:
+        print(f"正在重新启动{supervisor.services[name].label}...")
+        supervisor.start(name)
+        if name == 'manager_api' and 'xiaozhi_server' in running:
+            # 小智AI服务器启动时从后端API读取配置
+            wait_for_backend_ready_and_record()
+    if failed:
+        print("部分构建步骤失败，更新计划已保留，处理后可再次选择 13. 应用代码更新")
+    else:
+        clear_pending()
+        print("代码更新已应用！" + ("" if running else "受影响的服务未在运行，下次启动时生效。"))
+    time.sleep(5)
+
+@traced("单独启动后端API服务器")
 def start_backend_service():
     """单独启动后端API服务器"""
     print("启动后端API服务器...")
-    backend_cwd = os.path.join(base_dir, 'src', 'main', 'manager-api')
-    backend_cmd = 'chcp 65001 & mvn spring-boot:run'
-    start_process(backend_cmd, cwd=backend_cwd, window_title="后端API服务器")
-    print("后端API服务器已启动！请等待一段时间让服务完全启动。")
+    if not build_backend():
+        print("后端API构建失败，无法启动！")
+        return
+    if settings['backend_mode'] == 'jar':
+        ensure_cds_archive(settings['backend_java_options'])
+    if supervisor.start('manager_api'):
+        print("后端API服务器已启动！请等待一段时间让服务完全启动。")
 
 
+@traced("单独启动小智AI服务器")
 def start_python_service():
     """单独启动Python服务端（小智AI服务器）"""
     print("启动小智AI服务器...")
-    python_cwd = os.path.join(base_dir, 'src', 'main', 'xiaozhi-server')
-    python_cmd = 'python app.py'
     
     # 检查配置
     if check_config():
-        # 启动服务（不等待）
-        start_process(python_cmd, cwd=python_cwd, window_title="小智AI服务器")
+        # 启动服务并交给守护器
+        supervisor.start('xiaozhi_server')
+        if xiaozhi_workers > 1:
+            print(f"小智AI服务器已以 {xiaozhi_workers} 个工作进程启动，设备连接由负载均衡器按设备ID分配。")
         print("小智AI服务器已启动！")
     else:
         print("无法启动服务，配置未初始化或用户取消了操作。")
@@ -358,11 +619,10 @@ def start_python_service():
 def start_init_config():
     """启动小智服务端配置文件初始化工具"""
     print("正在重新配置服务器密钥...")
-    python_cwd = os.path.join(base_dir, 'scripts')
-    python_cmd = 'python init_config_pyside6.py'
     # 启动服务（不等待）
-    start_process(python_cmd, cwd=python_cwd, window_title="小智AI服务器")
+    start_process(script_command('init_config_pyside6.py'), cwd=os.path.join(base_dir, 'scripts'), window_title="小智AI服务器")
 
+@traced("一键启动所有服务")
 def start_all_services():
     """一键启动所有服务，参考一键启动带智控台的服务端.bat"""
     if not check_mysql():
@@ -377,110 +637,148 @@ def start_all_services():
         # 检测是否需要初始化
         if is_init:
             # 执行初始化MySQL数据库
-            start_process(r'python scripts\init_mysql.py', cwd=base_dir, window_title="MySQL初始化", wait=True)
+            start_process(script_command('init_mysql.py'), cwd=base_dir, window_title="MySQL初始化", wait=True)
             print("MySQL初始化完成，继续启动其他服务...")
         else:
             print("已取消MySQL数据库初始化操作！")
             sys.exit(1)
 
+    # 配置初始化需要交互，先在主线程判断好
+    config_ready = os.path.exists(os.path.join(base_dir, 'data', '.config_init_success'))
+
     print("正在启动所有服务...")
-    
-    # 1. 启动MySQL服务
-    print("启动MySQL服务...")
-    mysql_cmd = 'mysqld --console'
-    start_process(mysql_cmd, window_title="MySQL服务器")
-
-    # 2. 启动Redis服务
-    print("启动Redis服务...")
-    redis_cwd = os.path.join(base_dir, 'data')
-    print(f"Redis运行目录: {redis_cwd}")
-    redis_cmd = 'redis-server.exe'
-    start_process(redis_cmd, cwd=redis_cwd, window_title="Redis服务器")
-
-    # 3. 启动前端服务
-    print("启动前端服务...")
-    frontend_cwd = os.path.join(base_dir, 'src', 'main', 'manager-web')
-    # 先安装依赖（等待完成）
-    print("开始安装前端依赖...")
-    if start_process('npm install', cwd=frontend_cwd, window_title="前端依赖安装", wait=True):
-        print("前端依赖安装成功！")
-        # 启动服务（不等待）
-        print("启动前端服务...")
-        start_process('title 前端服务器 & npm run serve', cwd=frontend_cwd, window_title="前端服务器")
-    else:
-        print("前端依赖安装失败！")
-    
-    # 4. 启动后端API服务器
-    print("启动后端API服务器...")
-    backend_cwd = os.path.join(base_dir, 'src', 'main', 'manager-api')
-    backend_cmd = 'chcp 65001 & mvn spring-boot:run'
-    start_process(backend_cmd, cwd=backend_cwd, window_title="后端API服务器")
-    
-    # 等待后端API服务器启动完成
-    backend_url = "http://localhost:8002/xiaozhi/doc.html"
-    max_attempts = 120  # 最多等待120秒
-    attempt = 0
-    
-    print(f"等待后端API服务器启动中，正在尝试连接后端服务...")
-    
-    while attempt < max_attempts:
-        attempt += 1
-        try:
-            # 发送GET请求到后端API
-            response = requests.get(backend_url, timeout=2)
-            # 检查响应状态码是否为200（成功）
-            if response.status_code == 200:
-                print(f"成功连接到后端API服务器！")
-                break
-            else:
-                # 服务器已启动但返回非200状态码
-                print(f"第 {attempt} 秒：后端API服务器已响应，但状态码为 {response.status_code}，继续等待...")
-        except requests.ConnectionError:
-            # 连接失败
-            if attempt % 5 == 0:  # 每5秒打印一次提示，避免输出过多
-                print(f"第 {attempt} 秒：后端API服务器尚未启动或无法连接，继续等待...")
-        except requests.Timeout:
-            # 请求超时
-            print(f"第 {attempt} 秒：连接后端API服务器超时，继续等待...")
-        except requests.RequestException as e:
-            # 捕获其他所有请求相关异常
-            print(f"第 {attempt} 秒：请求发生异常: {str(e)}")
-        except Exception as e:
-            # 捕获所有其他意外异常
-            print(f"第 {attempt} 秒：发生意外错误: {str(e)}")
-        
-        time.sleep(1)  # 每秒尝试一次
-    
-    if attempt >= max_attempts:
-        print(f"警告：在 {max_attempts} 秒内未能成功连接到后端API服务器")
-        print(f"将继续执行后续步骤，但可能会影响功能")
-    else:
-        print(f"后端API服务器检查完成，耗时 {attempt} 秒，准备启动小智AI服务端...")
-    
-    # 5. 启动Python服务端
-    if check_config():
-        print("启动小智AI服务器...")
-        python_cwd = os.path.join(base_dir, 'src', 'main', 'xiaozhi-server')
-        python_cmd = 'python app.py'
-        start_process(python_cmd, cwd=python_cwd, window_title="小智AI服务器")
+    nodes = build_startup_graph(config_ready)
+    success, total = run_service_graph(nodes)
+    print(format_report(nodes, total))
+    skipped_summary = get_skipped_summary()
+    if skipped_summary:
+        print(skipped_summary)
+    trace_file = export_chrome_trace(os.path.join(base_dir, 'data', 'trace', 'last_launch.trace.json'))
+    if trace_file:
+        print(f"启动时间线已导出到 {trace_file}，可在 https://ui.perfetto.dev 中打开查看")
+    if success:
+        print("所有服务启动完成！")
     else:
+        print("部分服务未能成功启动，请查看上方报告和对应的服务窗口。")
+    time.sleep(5)
+
+def wait_for_backend_api(timeout=120):
+    """等待后端API服务器启动完成，返回是否成功连接"""
+    print("等待后端API服务器启动中，正在探测后端服务...")
+    if wait_until_ready(lambda: probe_http(MANAGER_API_URL), "后端API服务器", timeout=timeout) is not None:
+        return True
+    print(f"警告：在 {timeout} 秒内未能成功连接到后端API服务器")
+    print(f"将继续执行后续步骤，但可能会影响功能")
+    return False
+
+def build_startup_graph(config_ready):
+    """
+    构建一键启动的服务依赖图
+
+    MySQL、Redis、前端依赖安装、后端Maven编译之间互不依赖，会同时开始；
+    后端API等待MySQL、Redis就绪和编译完成；小智AI服务器只等待后端API就绪。
+    """
+    def start_mysql():
+        print("启动MySQL服务...")
+        return supervisor.start('mysql')
+
+    def start_redis():
+        print("启动Redis服务...")
+        return supervisor.start('redis')
+
+    def start_frontend():
+        print("启动前端服务...")
+        return supervisor.start('frontend')
+
+    def start_backend():
+        if settings['backend_mode'] == 'jar':
+            ensure_cds_archive(settings['backend_java_options'])
+        print("启动后端API服务器...")
+        return supervisor.start('manager_api')
+
+    def mysql_ready():
+        return wait_until_ready(probe_mysql, "MySQL") is not None
+
+    def redis_ready():
+        return wait_until_ready(probe_redis, "Redis") is not None
+
+    def xiaozhi_ready():
+        return wait_until_ready(lambda: probe_tcp('127.0.0.1', XIAOZHI_WS_PORT), "小智AI服务器") is not None
+
+    def frontend_ready():
+        if settings['frontend_mode'] == 'dev':
+            # 开发服务器首次编译完成后才开始监听，编译可能需要几分钟
+            return wait_until_ready(lambda: probe_tcp('127.0.0.1', 8001), "前端服务", timeout=300) is not None
+        return wait_until_ready(lambda: probe_http(MANAGER_WEB_URL), "前端服务") is not None
+
+    def start_xiaozhi():
+        if config_ready:
+            print("启动小智AI服务器...")
+            return supervisor.start('xiaozhi_server')
         print("检测到配置文件尚未初始化，正在启动初始化...")
         print("已自动打开智控台。请前往智控台注册登录账号后在初始化窗口填写服务器密钥。")
         webbrowser.open("http://localhost:8001")
-        start_process(r'python scripts\init_config_pyside6.py', cwd=base_dir, window_title="小智服务端配置初始化")
-    print("所有服务启动完成！")
-    time.sleep(5)
+        start_process(script_command('init_config_pyside6.py'), cwd=base_dir, window_title="小智服务端配置初始化")
+        return True
+
+    nodes = [
+        ServiceNode('mysql', start_mysql, ready=mysql_ready, label="MySQL"),
+        ServiceNode('redis', start_redis, ready=redis_ready, label="Redis"),
+        ServiceNode('npm_install', install_frontend_deps, label="前端依赖安装"),
+        ServiceNode('maven_build', build_backend, label="后端编译" if settings['backend_mode'] == 'maven' else "后端打包"),
+        ServiceNode('manager_api', start_backend, deps=['mysql', 'redis', 'maven_build'],
+                    ready=wait_for_backend_ready_and_record, label="后端API", soft=True),
+        ServiceNode('xiaozhi_server', start_xiaozhi, deps=['manager_api'],
+                    ready=xiaozhi_ready if config_ready else None, label="小智AI服务器", soft=True),
+    ]
+    if settings['frontend_mode'] == 'dev':
+        nodes.append(ServiceNode('frontend', start_frontend, deps=['npm_install'], ready=frontend_ready, label="前端服务"))
+    else:
+        nodes.append(ServiceNode('frontend_build', build_frontend, deps=['npm_install'], label="前端构建"))
+        nodes.append(ServiceNode('frontend', start_frontend, deps=['frontend_build'], ready=frontend_ready, label="前端服务"))
+    return nodes
+
+def show_service_status():
+    """实时显示守护器中各服务的状态和资源占用（火花线为最近约10分钟），按Ctrl+C返回菜单"""
+    try:
+        while True:
+            clear_screen()
+            print("=" * 55)
+            print("服务运行状态（每秒刷新，按 Ctrl+C 返回菜单）")
+            print("=" * 55)
+            print('\n'.join(supervisor.status_lines()) or "  暂无已启动的服务")
+            print("=" * 55)
+            print("资源占用: ")
+            print('\n'.join(resource_sampler.dashboard_lines()))
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
 
 def main():
     """主函数"""
     # 初始化终端
-    os.system('cls')
+    clear_screen()
+    # 后台预取一言等网络查询，不阻塞菜单
+    prefetch_all()
+    # 空闲时在后台维护各仓库，保持git pull和git status的速度
+    start_git_maintenance()
     # 欢迎界面
     get_welcome_text()
     # 1. 设置环境变量
     set_environment_variables()
+    # 2. 开始后台采集各服务的资源占用
+    resource_sampler.start()
     
     while True:
+        status_lines = supervisor.status_lines()
+        if status_lines:
+            print("=" * 55)
+            print("服务运行状态: ")
+            print('\n'.join(status_lines))
+        update_text = code_update_text()
+        if update_text:
+            print("=" * 55)
+            print(update_text)
         print("=" * 55)
         print("首次运行建议直接按回车执行 1. 一键启动所有服务并自动初始化")
         print("请选择操作: ")
@@ -493,12 +791,14 @@ def main():
         print("6. 单独启动小智AI服务器(Python)")
         print("=" * 55)
         print("7. 重新配置服务器密钥")
-        print("8. 结束MySQL和Redis相关进程")
-        print("9. 结束MySQL和Redis相关进程（管理员身份）")
+        print("8. 有序停止所有服务（MySQL和Redis安全关闭）")
+        print("9. 有序停止所有服务（超时后以管理员身份强制结束）")
         print("10. 重新初始化MySQL数据库")
         print("11. 退出")
+        print("12. 查看服务运行状态和资源占用（实时刷新）")
+        print("13. 应用代码更新（只重建和重启受影响的服务）")
         print("=" * 55)
-        choice = input("请输入选项 (1-11)(留空则默认执行1): ") or '1'
+        choice = input("请输入选项 (1-13)(留空则默认执行1): ") or '1'
         
         if choice == '1':
             start_all_services()
@@ -515,21 +815,26 @@ def main():
         elif choice == '7':
             start_init_config()
         elif choice == '8':
-            end_database_processes(False)
+            stop_all_services(False)
         elif choice == '9':
-            end_database_processes(True)
+            stop_all_services(True)
         elif choice == '10':
-            start_process(r'python scripts\init_mysql.py', cwd=base_dir, window_title="小智服务端MySQL数据库初始化")
+            start_process(script_command('init_mysql.py'), cwd=base_dir, window_title="小智服务端MySQL数据库初始化")
         elif choice == '11':
             print("退出程序...")
+            print("已启动的服务将继续在各自窗口中运行，但不再自动重启。")
             sys.exit(0)
+        elif choice == '12':
+            show_service_status()
+        elif choice == '13':
+            apply_code_update()
         elif choice == '':
             start_all_services()
         else:
-            print("无效选项，请重新输入有效选项(1-11)")
+            print("无效选项，请重新输入有效选项(1-13)")
             time.sleep(3)
 
-        os.system('cls')
+        clear_screen()
         get_welcome_text()
 
 if __name__ == "__main__":
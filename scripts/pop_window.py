@@ -1,12 +1,13 @@
 import re
 import json
 import os
-import requests
+import queue
 import subprocess
 import webbrowser
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 from datetime import datetime, timedelta
+import release_client
 
 # GitHub仓库信息
 GITHUB_REPO_OWNER = "VanillaNahida"
@@ -120,17 +121,37 @@ class GitHubReleaseChecker:
         ttk.Frame(self.bottom_frame, width=20).pack(side=tk.LEFT)
     
     def fetch_latest_release(self):
+        # 有缓存时先立即显示
+        cached = release_client.get_cached_release()
+        if cached:
+            self.show_release(cached)
+        # tkinter不能在其他线程中操作界面，后台线程把结果放入队列，由主循环定时取出
+        self.release_queue = queue.Queue()
+        release_client.fetch_release_async(lambda release, error: self.release_queue.put((release, error)))
+        self.root.after(100, self.poll_release)
+
+    def poll_release(self):
+        try:
+            release_data, error = self.release_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self.poll_release)
+            return
+        if error is None:
+            self.show_release(release_data)
+        elif not self.latest_release:
+            # 处理请求异常
+            error_message = f"获取信息失败:\n{error}"
+            # 更新窗口标题，显示错误信息
+            self.root.title(f"小智AI全模块服务端一键包 - 获取更新信息失败！")
+            # 刷新窗口以确保标题更新立即生效
+            self.root.update_idletasks()
+
+            self.display_release_info(error_message)
+
+    def show_release(self, release_data):
+        if release_data == self.latest_release:
+            return
         try:
-            # 构建GitHub API URL
-            url = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/releases/latest"
-            
-            # 发送请求获取最新release信息
-            response = requests.get(url)
-            response.raise_for_status()  # 检查请求是否成功
-            
-            # 解析JSON响应
-            release_data = response.json()
-            
             # 保存最新release数据
             self.latest_release = release_data
             
@@ -146,15 +167,6 @@ class GitHubReleaseChecker:
             # 显示信息
             self.display_release_info(release_text)
             
-        except requests.exceptions.RequestException as e:
-            # 处理请求异常
-            error_message = f"获取信息失败:\n{e}"
-            # 更新窗口标题，显示错误信息
-            self.root.title(f"小智AI全模块服务端一键包 - 获取更新信息失败！")
-            # 刷新窗口以确保标题更新立即生效
-            self.root.update_idletasks()
-
-            self.display_release_info(error_message)
         except Exception as e:
             # 处理其他异常
             error_message = f"程序运行出错:\n{str(e)}"
@@ -2,7 +2,6 @@ import re
 import json
 import os
 import sys
-import requests
 import subprocess
 import webbrowser
 from datetime import datetime, timedelta
@@ -24,9 +23,10 @@ except ImportError:
 from PySide6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                               QWidget, QTextEdit, QPushButton, QCheckBox, QMessageBox,
                               QScrollArea, QLabel, QFrame, QDialog)
-from PySide6.QtCore import Qt, QTimer, QUrl, QPoint
+from PySide6.QtCore import Qt, QTimer, QUrl, QPoint, Signal
 from PySide6.QtGui import (QFont, QCursor, QDesktopServices, QTextCursor, 
                           QTextCharFormat, QColor, QMouseEvent)
+import release_client
 # GitHub仓库信息
 GITHUB_REPO_OWNER = "VanillaNahida"
 GITHUB_REPO_NAME = "xiaozhi-server-full-module-onekey"
@@ -190,6 +190,9 @@ class ClickableTextEdit(QTextEdit):
         super().mouseMoveEvent(event)
 
 class GitHubReleaseChecker(QDialog):
+    # 后台线程获取完成后通过信号把结果交给界面线程
+    release_loaded = Signal(object, object)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.latest_release = {}
@@ -285,12 +288,25 @@ class GitHubReleaseChecker(QDialog):
         main_layout.addLayout(bottom_layout)
     
     def fetch_latest_release(self):
+        # 有缓存时先立即显示，再在后台线程中重新验证，避免网络请求卡住界面
+        cached = release_client.get_cached_release()
+        if cached:
+            self.show_release(cached)
+        self.release_loaded.connect(self.on_release_loaded)
+        release_client.fetch_release_async(self.release_loaded.emit)
+
+    def on_release_loaded(self, release_data, error):
+        if error is None:
+            self.show_release(release_data)
+        elif not self.latest_release:
+            error_message = f"获取信息失败:\n{error}"
+            self.setWindowTitle("小智AI全模块服务端一键包 - 获取更新信息失败！")
+            self.display_release_info(error_message)
+
+    def show_release(self, release_data):
+        if release_data == self.latest_release:
+            return
         try:
-            url = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/releases/latest"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            release_data = response.json()
             self.latest_release = release_data
             
             if 'tag_name' in release_data:
@@ -299,10 +315,6 @@ class GitHubReleaseChecker(QDialog):
             release_text = self.format_release_info(release_data)
             self.display_release_info(release_text)
             
-        except requests.exceptions.RequestException as e:
-            error_message = f"获取信息失败:\n{e}"
-            self.setWindowTitle("小智AI全模块服务端一键包 - 获取更新信息失败！")
-            self.display_release_info(error_message)
         except Exception as e:
             error_message = f"程序运行出错:\n{str(e)}"
             self.display_release_info(error_message)
@@ -0,0 +1,144 @@
+import time
+import socket
+import http.client
+from urllib.parse import urlsplit
+from tracing import span
+
+# 各服务默认端口
+MYSQL_PORT = 3306
+REDIS_PORT = 6379
+MANAGER_API_URL = "http://127.0.0.1:8002/xiaozhi/doc.html"
+MANAGER_WEB_URL = "http://127.0.0.1:8001/"
+XIAOZHI_WS_PORT = 8000
+
+
+def probe_tcp(host, port, timeout=1.0):
+    """TCP探测：端口能建立连接即视为就绪（用于WebSocket端口）"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _recv_exact(sock, size):
+    """从socket读取指定长度的数据"""
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def read_mysql_greeting(host='127.0.0.1', port=MYSQL_PORT, timeout=1.0):
+    """
+    读取MySQL服务器握手包，返回服务器版本号；服务器未就绪时返回None
+
+    MySQL在接受连接后会主动发送握手包：3字节长度 + 1字节序号 + 负载，
+    负载首字节为协议版本10，随后是以\\0结尾的服务器版本字符串。
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            header = _recv_exact(sock, 4)
+            if len(header) < 4:
+                return None
+            length = int.from_bytes(header[:3], 'little')
+            payload = _recv_exact(sock, length)
+            # 0xff为错误包（例如服务器正在启动或连接数已满）
+            if not payload or payload[0] != 10:
+                return None
+            return payload[1:].split(b'\0', 1)[0].decode('utf-8', errors='replace')
+    except OSError:
+        return None
+
+
+def probe_mysql(host='127.0.0.1', port=MYSQL_PORT, timeout=1.0):
+    """MySQL探测：收到协议版本10的握手包即视为就绪"""
+    return read_mysql_greeting(host, port, timeout) is not None
+
+
+def redis_command(args, host='127.0.0.1', port=REDIS_PORT, timeout=1.0):
+    """发送一条RESP格式的Redis命令并返回第一行回复（去掉结尾换行），失败返回None"""
+    request = f"*{len(args)}\r\n".encode()
+    for arg in args:
+        arg = str(arg).encode()
+        request += b"$%d\r\n%s\r\n" % (len(arg), arg)
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            sock.sendall(request)
+            reply = b''
+            while not reply.endswith(b'\r\n'):
+                chunk = sock.recv(256)
+                if not chunk:
+                    break
+                reply += chunk
+            return reply.decode('utf-8', errors='replace').strip()
+    except OSError:
+        return None
+
+
+def probe_redis(host='127.0.0.1', port=REDIS_PORT, timeout=1.0):
+    """Redis探测：PING返回PONG即就绪；-NOAUTH说明服务已可用，-LOADING说明仍在加载数据"""
+    reply = redis_command(['PING'], host, port, timeout)
+    if reply is None:
+        return False
+    return reply.startswith('+PONG') or reply.startswith('-NOAUTH')
+
+
+def probe_http(url, timeout=2.0):
+    """HTTP探测：发送HEAD请求，返回2xx/3xx即视为就绪"""
+    parts = urlsplit(url)
+    conn_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    conn = conn_class(parts.hostname, parts.port, timeout=timeout)
+    try:
+        conn.request('HEAD', parts.path or '/')
+        status = conn.getresponse().status
+        return 200 <= status < 400
+    except (OSError, http.client.HTTPException):
+        return False
+    finally:
+        conn.close()
+
+
+def wait_until_ready(probe, name, timeout=60, alive=None, initial_delay=0.05, max_delay=1.0, factor=1.6):
+    """
+    使用指数退避反复探测，直到服务就绪或超时
+
+    参数:
+    probe: 无参数的探测函数，返回True表示就绪
+    name: 服务名称，用于输出
+    timeout: 最长等待秒数
+    alive: 可选的存活检测函数，返回False时（例如进程已退出）立即放弃
+    返回:
+    就绪时返回等待的毫秒数，超时或进程退出返回None
+    """
+    with span(f"等待就绪: {name}", cat='probe', timeout=timeout) as s:
+        elapsed_ms, attempts = _wait(probe, name, timeout, alive, initial_delay, max_delay, factor)
+        s.set(ready=elapsed_ms is not None, attempts=attempts)
+    return elapsed_ms
+
+
+def _wait(probe, name, timeout, alive, initial_delay, max_delay, factor):
+    """wait_until_ready的探测循环，返回 (毫秒数或None, 探测次数)"""
+    start = time.perf_counter()
+    delay = initial_delay
+    attempts = 0
+    while True:
+        attempts += 1
+        if probe():
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"✅ {name} 已就绪，耗时 {elapsed_ms:.0f} 毫秒（探测 {attempts} 次）")
+            return elapsed_ms, attempts
+        if alive is not None and not alive():
+            print(f"❌ {name} 进程已退出，停止等待")
+            return None, attempts
+        remaining = timeout - (time.perf_counter() - start)
+        if remaining <= 0:
+            print(f"⚠️ 等待 {name} 就绪超时（{timeout} 秒）")
+            return None, attempts
+        time.sleep(min(delay, remaining))
+        delay = min(delay * factor, max_delay)
@@ -0,0 +1,265 @@
+import os
+import sys
+import time
+import signal
+import ctypes
+import subprocess
+import resource_profiles
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Windows进程创建标志
+CREATE_NEW_CONSOLE = 0x00000010
+CREATE_NEW_PROCESS_GROUP = 0x00000200
+# Windows进程查询相关常量
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+STILL_ACTIVE = 259
+ERROR_ACCESS_DENIED = 5
+
+# 没有PID文件时（例如服务不是由启动器启动的），Windows下按映像名兜底结束的进程
+WINDOWS_IMAGE_NAMES = {
+    'mysql': ['mysqld.exe', 'mysql.exe'],
+    'redis': ['redis-server.exe', 'redis-cli.exe'],
+}
+
+
+class ProcessBackend:
+    """
+    进程控制后端基类
+
+    负责在独立的进程组中启动服务、把PID写入PID文件、按PID结束整个进程组。
+    可执行文件一律通过PATH查找，测试时在PATH前面放上同名的替身程序即可。
+    """
+
+    def __init__(self, pid_dir=None, log_dir=None):
+        self.pid_dir = pid_dir or os.path.join(base_dir, 'data', 'pids')
+        self.log_dir = log_dir or os.path.join(base_dir, 'logs')
+
+    # ---------- PID文件 ----------
+    def pid_file(self, name):
+        return os.path.join(self.pid_dir, f"{name}.pid")
+
+    def write_pid(self, name, pid):
+        os.makedirs(self.pid_dir, exist_ok=True)
+        with open(self.pid_file(name), 'w', encoding='utf-8') as f:
+            f.write(str(pid))
+
+    def read_pid(self, name):
+        """读取PID文件，进程已不存在时删除过期的PID文件并返回None"""
+        try:
+            with open(self.pid_file(name), 'r', encoding='utf-8') as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+        if not self.is_alive(pid):
+            self.remove_pid(name)
+            return None
+        return pid
+
+    def remove_pid(self, name):
+        try:
+            os.remove(self.pid_file(name))
+        except OSError:
+            pass
+
+    # ---------- 需要各平台实现的方法 ----------
+    def spawn(self, name, cmd, cwd=None, title=None, profile=None):
+        """在新的进程组中启动常驻服务，返回Popen对象；profile为resource_profiles中的资源配置"""
+        raise NotImplementedError
+
+    def run(self, cmd, cwd=None, title=None, wait=False, profile=None):
+        """运行一次性命令（安装依赖、初始化工具等），wait=True时等待结束并返回是否成功"""
+        raise NotImplementedError
+
+    def is_alive(self, pid):
+        raise NotImplementedError
+
+    def _signal_group(self, pid, force):
+        """向进程组发送结束信号，force=True时强制结束"""
+        raise NotImplementedError
+
+    # ---------- 通用逻辑 ----------
+    def terminate(self, pid, timeout=10, process=None):
+        """
+        先请求进程组正常退出，超时后强制结束，返回是否已结束
+
+        传入process（自己启动的Popen对象）时通过它判断存活并回收子进程。
+        """
+        def alive():
+            return process.poll() is None if process is not None else self.is_alive(pid)
+
+        try:
+            self._signal_group(pid, force=False)
+        except OSError:
+            return not alive()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if not alive():
+                return True
+            time.sleep(0.2)
+        try:
+            self._signal_group(pid, force=True)
+        except OSError:
+            pass
+        time.sleep(0.5)
+        return not alive()
+
+    def is_image_running(self, name):
+        """没有PID文件时按进程映像名判断服务是否在运行（仅Windows支持）"""
+        return False
+
+    def stop_service(self, name, timeout=10, use_admin=False):
+        """按PID文件结束服务，返回是否找到并结束了进程"""
+        pid = self.read_pid(name)
+        if pid is None:
+            return False
+        stopped = self.terminate(pid, timeout)
+        if stopped:
+            self.remove_pid(name)
+        return stopped
+
+
+class WindowsBackend(ProcessBackend):
+    """Windows实现：新控制台窗口 + 新进程组，taskkill按PID结束进程树"""
+
+    def _popen(self, cmd, cwd, creationflags, profile):
+        """有资源配置时先挂起创建进程，放入作业对象后再恢复"""
+        if profile:
+            creationflags |= resource_profiles.CREATE_SUSPENDED
+        process = subprocess.Popen(cmd, cwd=cwd, creationflags=creationflags)
+        if profile:
+            resource_profiles.apply_windows_profile(process.pid, profile)
+        return process
+
+    def spawn(self, name, cmd, cwd=None, title=None, profile=None):
+        wrapped = f'cmd /c "title {title or name} & chcp 65001 >nul & {cmd}"'
+        process = self._popen(wrapped, cwd, CREATE_NEW_CONSOLE | CREATE_NEW_PROCESS_GROUP, profile)
+        self.write_pid(name, process.pid)
+        return process
+
+    def run(self, cmd, cwd=None, title=None, wait=False, profile=None):
+        if profile:
+            # start命令启动的进程不是本进程的子进程，无法放入作业对象，改为直接创建新控制台窗口
+            if wait:
+                process = self._popen(f'cmd /c "title {title or cmd} & {cmd}"', cwd, CREATE_NEW_CONSOLE, profile)
+                return process.wait() == 0
+            self._popen(f'cmd /k "title {title or cmd} & {cmd}"', cwd, CREATE_NEW_CONSOLE, profile)
+            return True
+        if wait:
+            # 使用start /wait等待窗口中的命令执行完毕，cmd /c让命令执行完后自动关闭窗口
+            process = subprocess.run(
+                f'start "{title}" /wait cmd /c "{cmd}"',
+                cwd=cwd,
+                shell=True,
+                check=False,
+                capture_output=True,
+                text=True
+            )
+            return process.returncode == 0
+        # 不等待进程完成
+        if title:
+            subprocess.Popen(f'start "{title}" cmd /k "{cmd}"', cwd=cwd, shell=True)
+        else:
+            subprocess.Popen(f'start cmd /k "{cmd}"', cwd=cwd, shell=True)
+        return True
+
+    def is_alive(self, pid):
+        handle = ctypes.windll.kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            # 拒绝访问说明进程存在但属于其他用户（例如以管理员身份运行）
+            return ctypes.windll.kernel32.GetLastError() == ERROR_ACCESS_DENIED
+        try:
+            exit_code = ctypes.c_ulong()
+            if not ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return False
+            return exit_code.value == STILL_ACTIVE
+        finally:
+            ctypes.windll.kernel32.CloseHandle(handle)
+
+    def _signal_group(self, pid, force):
+        args = ['taskkill', '/PID', str(pid), '/T']
+        if force:
+            args.append('/F')
+        subprocess.run(args, capture_output=True)
+
+    def is_image_running(self, name):
+        for image in WINDOWS_IMAGE_NAMES.get(name, [])[:1]:
+            result = subprocess.run(['tasklist', '/FI', f'IMAGENAME eq {image}'], capture_output=True, text=True, errors='replace')
+            if image.lower() in result.stdout.lower():
+                return True
+        return False
+
+    def stop_service(self, name, timeout=10, use_admin=False):
+        if use_admin:
+            # 以管理员权限执行taskkill，无法得知结果，按映像名结束
+            for image in WINDOWS_IMAGE_NAMES.get(name, []):
+                ctypes.windll.shell32.ShellExecuteW(None, "runas", "taskkill.exe", f"/F /IM {image} /T", None, 0)
+            self.remove_pid(name)
+            return True
+        if super().stop_service(name, timeout):
+            return True
+        # 没有PID文件时按映像名兜底
+        found = False
+        for image in WINDOWS_IMAGE_NAMES.get(name, []):
+            result = subprocess.run(f"taskkill /F /IM {image} /T", shell=True, capture_output=True)
+            found = found or result.returncode == 0
+        return found
+
+
+class PosixBackend(ProcessBackend):
+    """POSIX实现：独立会话/进程组，SIGTERM超时后升级为SIGKILL，输出写入logs目录"""
+
+    def _open_log(self, name):
+        os.makedirs(self.log_dir, exist_ok=True)
+        return open(os.path.join(self.log_dir, f"{name}.log"), 'ab')
+
+    def spawn(self, name, cmd, cwd=None, title=None, profile=None):
+        with self._open_log(name) as log:
+            process = subprocess.Popen(
+                resource_profiles.wrap_posix_command(name, cmd, profile), cwd=cwd, shell=True, start_new_session=True,
+                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                preexec_fn=resource_profiles.posix_preexec(name, profile)
+            )
+        self.write_pid(name, process.pid)
+        return process
+
+    def run(self, cmd, cwd=None, title=None, wait=False, profile=None):
+        name = title or 'process'
+        cmd = resource_profiles.wrap_posix_command(name, cmd, profile)
+        preexec = resource_profiles.posix_preexec(name, profile)
+        if wait:
+            return subprocess.run(cmd, cwd=cwd, shell=True, preexec_fn=preexec).returncode == 0
+        with self._open_log(name) as log:
+            subprocess.Popen(cmd, cwd=cwd, shell=True, start_new_session=True, preexec_fn=preexec,
+                             stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+        return True
+
+    def is_alive(self, pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _signal_group(self, pid, force):
+        sig = signal.SIGKILL if force else signal.SIGTERM
+        try:
+            os.killpg(pid, sig)
+        except ProcessLookupError:
+            # 进程不是进程组组长时，只结束该进程
+            os.kill(pid, sig)
+
+    def stop_service(self, name, timeout=10, use_admin=False):
+        if use_admin:
+            print("当前系统不支持以管理员身份结束进程，将以当前用户身份结束。")
+        return super().stop_service(name, timeout)
+
+
+def get_backend(**kwargs):
+    """根据当前平台返回进程控制后端"""
+    if sys.platform == 'win32':
+        return WindowsBackend(**kwargs)
+    return PosixBackend(**kwargs)
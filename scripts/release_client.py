@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import threading
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# GitHub仓库信息
+GITHUB_REPO_OWNER = "VanillaNahida"
+GITHUB_REPO_NAME = "xiaozhi-server-full-module-onekey"
+RELEASE_URL = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/releases/latest"
+# Release信息的磁盘缓存（包括ETag和Last-Modified，用于条件请求）
+CACHE_FILE = os.path.join(base_dir, 'data', '.release_cache.json')
+# 缓存在该时间内直接使用，超过后才向GitHub发送条件请求重新验证（秒）
+REVALIDATE_TTL = 600
+REQUEST_TIMEOUT = 10
+
+# 同一时间只有一个请求在进行，其他调用者等待后直接使用它的结果
+_fetch_lock = threading.Lock()
+
+
+def _load_cache():
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache.get('release'), dict) else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _save_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp_file = CACHE_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_file, CACHE_FILE)
+    except OSError:
+        pass
+
+
+def get_cached_release():
+    """返回缓存中的Release信息（不访问网络），没有缓存时返回None"""
+    cache = _load_cache()
+    return cache['release'] if cache else None
+
+
+def get_latest_release(timeout=REQUEST_TIMEOUT, ttl=REVALIDATE_TTL):
+    """
+    获取最新Release信息
+
+    缓存未超过ttl时直接返回缓存；否则带上If-None-Match/If-Modified-Since重新验证，
+    GitHub返回304时只刷新验证时间（304不计入API频率限制）。
+    网络请求失败时返回旧缓存，没有缓存时抛出requests异常。
+    """
+    # requests导入较慢，只在真正需要访问网络时才导入
+    import requests
+    with _fetch_lock:
+        cache = _load_cache()
+        if cache and time.time() - cache.get('checked_at', 0) < ttl:
+            return cache['release']
+
+        headers = {'Accept': 'application/vnd.github+json'}
+        if cache and cache.get('etag'):
+            headers['If-None-Match'] = cache['etag']
+        if cache and cache.get('last_modified'):
+            headers['If-Modified-Since'] = cache['last_modified']
+        try:
+            response = requests.get(RELEASE_URL, headers=headers, timeout=timeout)
+            if response.status_code == 304 and cache:
+                cache['checked_at'] = time.time()
+                _save_cache(cache)
+                return cache['release']
+            response.raise_for_status()
+            release = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            if cache:
+                return cache['release']
+            raise
+
+        _save_cache({
+            'release': release,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'checked_at': time.time(),
+        })
+        return release
+
+
+def fetch_release_async(callback, timeout=REQUEST_TIMEOUT, ttl=REVALIDATE_TTL):
+    """
+    在后台线程中获取最新Release信息，完成后在该线程中调用 callback(release, error)
+
+    GUI调用者需要自行把结果转交给界面线程。
+    """
+    def run():
+        try:
+            release = get_latest_release(timeout, ttl)
+        except Exception as e:
+            callback(None, e)
+            return
+        callback(release, None)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
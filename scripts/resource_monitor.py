@@ -0,0 +1,189 @@
+import time
+import threading
+from collections import deque
+
+# psutil为可选依赖（已加入requirements.txt），未安装时仪表盘只显示提示
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 采样间隔（秒）和每个指标保留的采样数（默认约10分钟）
+SAMPLE_INTERVAL = 2.0
+HISTORY_SIZE = 300
+# 监听端口的采集开销较大，每隔几次采样才刷新一次
+PORTS_EVERY = 5
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class ServiceSeries:
+    """单个服务的采样历史（固定长度的环形缓冲区）"""
+
+    def __init__(self, name, label, size=HISTORY_SIZE):
+        self.name = name
+        self.label = label
+        self.times = deque(maxlen=size)
+        self.cpu = deque(maxlen=size)
+        self.rss = deque(maxlen=size)
+        self.threads = deque(maxlen=size)
+        self.handles = deque(maxlen=size)
+        self.ports = []
+        self.pid = None
+        self.process_count = 0
+
+    def add(self, cpu, rss, threads, handles):
+        self.times.append(time.time())
+        self.cpu.append(cpu)
+        self.rss.append(rss)
+        self.threads.append(threads)
+        self.handles.append(handles)
+
+    def rss_trend(self):
+        """内存变化速度（MB/分钟），采样时间不足1分钟时返回None"""
+        if len(self.times) < 2 or self.times[-1] - self.times[0] < 60:
+            return None
+        return (self.rss[-1] - self.rss[0]) / 1024 / 1024 / ((self.times[-1] - self.times[0]) / 60)
+
+
+def sparkline(values, width=30, low=None, high=None):
+    """把数值序列画成一行火花线，数据多于宽度时按区间取平均"""
+    values = list(values)
+    if not values:
+        return ""
+    if len(values) > width:
+        step = len(values) / width
+        values = [
+            sum(values[int(i * step):int((i + 1) * step)]) / max(1, int((i + 1) * step) - int(i * step))
+            for i in range(width)
+        ]
+    low = min(values) if low is None else low
+    high = max(values) if high is None else high
+    if high <= low:
+        return SPARK_CHARS[0] * len(values)
+    scale = len(SPARK_CHARS) - 1
+    return ''.join(SPARK_CHARS[int((min(max(v, low), high) - low) / (high - low) * scale)] for v in values)
+
+
+def _format_bytes(value):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024 or unit == 'GB':
+            return f"{value:.0f}{unit}" if unit in ('B', 'KB') else f"{value:.1f}{unit}"
+        value /= 1024
+
+
+class ResourceSampler:
+    """
+    后台资源采样器
+
+    定期采集每个服务整个进程树（例如cmd窗口及其中的mysqld、java）的CPU占用、内存、
+    线程数、句柄数和监听端口，写入各服务的环形缓冲区。
+    targets为无参数函数，返回 {服务名: (显示名称, 根进程PID)}。
+    """
+
+    def __init__(self, targets, interval=SAMPLE_INTERVAL, size=HISTORY_SIZE):
+        self.targets = targets
+        self.interval = interval
+        self.size = size
+        self.series = {}
+        self._processes = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._rounds = 0
+
+    @property
+    def available(self):
+        return psutil is not None
+
+    def start(self):
+        if psutil is None or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.sample()
+            except Exception:
+                pass
+            time.sleep(self.interval)
+
+    def _process(self, pid):
+        """复用psutil.Process对象，cpu_percent需要与上一次调用比较"""
+        proc = self._processes.get(pid)
+        if proc is None or not proc.is_running():
+            proc = psutil.Process(pid)
+            proc.cpu_percent(None)
+            self._processes[pid] = proc
+        return proc
+
+    def sample(self):
+        self._rounds += 1
+        with self._lock:
+            for name, (label, pid) in self.targets().items():
+                series = self.series.get(name)
+                if series is None:
+                    series = self.series[name] = ServiceSeries(name, label, self.size)
+                if pid is None:
+                    series.pid = None
+                    continue
+                try:
+                    root = psutil.Process(pid)
+                    tree = [root] + root.children(recursive=True)
+                except psutil.Error:
+                    series.pid = None
+                    continue
+                cpu = rss = threads = handles = 0
+                procs = []
+                for item in tree:
+                    try:
+                        proc = self._process(item.pid)
+                        with proc.oneshot():
+                            cpu += proc.cpu_percent(None)
+                            rss += proc.memory_info().rss
+                            threads += proc.num_threads()
+                            handles += proc.num_handles() if hasattr(proc, 'num_handles') else proc.num_fds()
+                        procs.append(proc)
+                    except psutil.Error:
+                        continue
+                series.pid = pid
+                series.process_count = len(procs)
+                series.add(cpu, rss, threads, handles)
+                if self._rounds % PORTS_EVERY == 1:
+                    series.ports = self._listening_ports(procs)
+            # 清理已退出进程的缓存
+            self._processes = {pid: proc for pid, proc in self._processes.items() if proc.is_running()}
+
+    @staticmethod
+    def _listening_ports(procs):
+        ports = set()
+        for proc in procs:
+            try:
+                connections = proc.net_connections('inet') if hasattr(proc, 'net_connections') else proc.connections('inet')
+            except psutil.Error:
+                continue
+            ports.update(conn.laddr.port for conn in connections if conn.status == psutil.CONN_LISTEN)
+        return sorted(ports)
+
+    def dashboard_lines(self, width=30):
+        """生成仪表盘文本"""
+        if psutil is None:
+            return ["  未安装psutil，无法采集资源占用（运行“一键更新依赖”或 pip install psutil 后重启启动器）"]
+        lines = []
+        with self._lock:
+            for series in self.series.values():
+                if series.pid is None or not series.cpu:
+                    continue
+                trend = series.rss_trend()
+                trend_text = f"{trend:+.1f}MB/分" if trend is not None else "采样中"
+                lines.append(f"  {series.label}（PID {series.pid}，{series.process_count} 个进程）"
+                             f"  端口 {', '.join(map(str, series.ports)) or '-'}")
+                lines.append(f"    CPU  {series.cpu[-1]:6.1f}%  {sparkline(series.cpu, width, 0, max(100, max(series.cpu)))}")
+                lines.append(f"    内存 {_format_bytes(series.rss[-1]):>7}  {sparkline(series.rss, width, 0)}  {trend_text}")
+                lines.append(f"    线程 {series.threads[-1]:>6}   句柄 {series.handles[-1]:>6}")
+        if not lines:
+            lines.append("  暂无正在运行的服务")
+        memory = psutil.virtual_memory()
+        lines.append(f"  系统: CPU {psutil.cpu_percent(None):.0f}%  内存 {_format_bytes(memory.used)}/{_format_bytes(memory.total)}"
+                     f"（{memory.percent:.0f}%）")
+        return lines
@@ -0,0 +1,273 @@
+import os
+import sys
+import shlex
+import shutil
+import ctypes
+import subprocess
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 各服务的资源配置，每次启动（包括崩溃后重启）都会应用
+# priority: idle / below_normal / normal / above_normal / high
+# cpus: None不限制；"background"为除保留核心外的全部核心；"reserved"只用保留核心；也可以是核心编号列表
+# memory_mb: 内存上限（MB），None不限制；Windows使用作业对象，Linux使用cgroup v2的memory.max
+# 内存上限是整个进程树的硬性上限，达到后分配内存失败、服务直接退出，所以默认都不限制，
+# 需要时在启动器设置的resource_profiles中为服务单独开启，例如 {"mysql": {"memory_mb": 4096}}
+DEFAULT_PROFILES = {
+    # 实时语音：较高优先级，可使用全部核心（包括为它保留的核心）
+    'xiaozhi_server': {'priority': 'above_normal', 'cpus': None, 'memory_mb': None},
+    'mysql': {'priority': 'normal', 'cpus': 'background', 'memory_mb': None},
+    'redis': {'priority': 'normal', 'cpus': 'background', 'memory_mb': None},
+    'manager_api': {'priority': 'below_normal', 'cpus': 'background', 'memory_mb': None},
+    'frontend': {'priority': 'below_normal', 'cpus': 'background', 'memory_mb': None},
+    # Maven打包、npm安装和前端构建：最低优先级，不占用保留核心
+    'build': {'priority': 'idle', 'cpus': 'background', 'memory_mb': None},
+    # 后台预取代码更新：最低优先级，不占用保留核心
+    'prefetch': {'priority': 'idle', 'cpus': 'background', 'memory_mb': None},
+    # 空闲时的git维护（提交图、多包索引、增量重新打包）：最低优先级，不占用保留核心
+    'maintenance': {'priority': 'idle', 'cpus': 'background', 'memory_mb': None},
+}
+# 为实时语音保留的核心比例（从编号最大的核心开始），至少保留1个核心，单核机器不保留
+RESERVED_CPU_RATIO = 0.25
+
+# POSIX下各优先级对应的nice值（负值需要root权限，没有权限时忽略）
+POSIX_NICE = {'idle': 15, 'below_normal': 5, 'normal': 0, 'above_normal': -2, 'high': -5}
+# Windows优先级类
+WINDOWS_PRIORITY_CLASS = {
+    'idle': 0x00000040,
+    'below_normal': 0x00004000,
+    'normal': 0x00000020,
+    'above_normal': 0x00008000,
+    'high': 0x00000080,
+}
+# cgroup v2根目录：需要管理员预先创建并把目录授权给当前用户（未设置时尝试systemd-run）
+CGROUP_ROOT_ENV = 'XIAOZHI_CGROUP_ROOT'
+
+# Windows作业对象相关常量
+CREATE_SUSPENDED = 0x00000004
+JOB_OBJECT_LIMIT_AFFINITY = 0x00000010
+JOB_OBJECT_LIMIT_PRIORITY_CLASS = 0x00000020
+JOB_OBJECT_LIMIT_JOB_MEMORY = 0x00000200
+JOB_OBJECT_EXTENDED_LIMIT_INFORMATION_CLASS = 9
+PROCESS_TERMINATE = 0x0001
+PROCESS_SET_QUOTA = 0x0100
+PROCESS_SUSPEND_RESUME = 0x0800
+
+_warned = set()
+_systemd_run_ok = None
+
+
+def get_profile(name, overrides=None):
+    """返回服务的资源配置，overrides为启动器设置中的覆盖项 {服务名: {字段: 值}}"""
+    if name not in DEFAULT_PROFILES and not (overrides and name in overrides):
+        return None
+    profile = dict(DEFAULT_PROFILES.get(name, {}))
+    profile.update((overrides or {}).get(name) or {})
+    return profile
+
+
+def resolve_cpus(spec, cpu_count=None):
+    """把cpus配置转换为核心编号列表，None表示不限制"""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if spec is None:
+        return None
+    if isinstance(spec, (list, tuple)):
+        cpus = sorted({int(cpu) for cpu in spec if 0 <= int(cpu) < cpu_count})
+        return cpus or None
+    reserved = max(1, int(cpu_count * RESERVED_CPU_RATIO)) if cpu_count > 1 else 0
+    if spec == 'background':
+        return list(range(cpu_count - reserved)) if reserved else None
+    if spec == 'reserved':
+        return list(range(cpu_count - reserved, cpu_count)) if reserved else None
+    return None
+
+
+def describe_profile(profile):
+    """生成资源配置的简短说明"""
+    if not profile:
+        return "不限制"
+    parts = [f"优先级 {profile.get('priority') or 'normal'}"]
+    cpus = resolve_cpus(profile.get('cpus'))
+    if cpus:
+        parts.append(f"CPU {cpus[0]}-{cpus[-1]}" if cpus == list(range(cpus[0], cpus[-1] + 1)) else f"CPU {cpus}")
+    if profile.get('memory_mb'):
+        parts.append(f"内存上限 {profile['memory_mb']}MB")
+    return "，".join(parts)
+
+
+def _warn_once(key, message):
+    if key not in _warned:
+        _warned.add(key)
+        print(f"⚠️ {message}")
+
+
+# ---------- Windows：作业对象 ----------
+class _IoCounters(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_ulonglong) for name in (
+        'ReadOperationCount', 'WriteOperationCount', 'OtherOperationCount',
+        'ReadTransferCount', 'WriteTransferCount', 'OtherTransferCount')]
+
+
+class _BasicLimitInformation(ctypes.Structure):
+    _fields_ = [
+        ('PerProcessUserTimeLimit', ctypes.c_int64),
+        ('PerJobUserTimeLimit', ctypes.c_int64),
+        ('LimitFlags', ctypes.c_uint32),
+        ('MinimumWorkingSetSize', ctypes.c_size_t),
+        ('MaximumWorkingSetSize', ctypes.c_size_t),
+        ('ActiveProcessLimit', ctypes.c_uint32),
+        ('Affinity', ctypes.c_size_t),
+        ('PriorityClass', ctypes.c_uint32),
+        ('SchedulingClass', ctypes.c_uint32),
+    ]
+
+
+class _ExtendedLimitInformation(ctypes.Structure):
+    _fields_ = [
+        ('BasicLimitInformation', _BasicLimitInformation),
+        ('IoInfo', _IoCounters),
+        ('ProcessMemoryLimit', ctypes.c_size_t),
+        ('JobMemoryLimit', ctypes.c_size_t),
+        ('PeakProcessMemoryUsed', ctypes.c_size_t),
+        ('PeakJobMemoryUsed', ctypes.c_size_t),
+    ]
+
+
+def apply_windows_profile(pid, profile):
+    """
+    把以CREATE_SUSPENDED创建的进程放入带限制的作业对象后再恢复运行
+
+    作业对象中的限制对进程树中之后创建的所有子进程都生效（cmd窗口中启动的mysqld、java等），
+    进程先挂起再放入作业，避免子进程在放入之前就已创建。无论是否成功都会恢复进程。
+    """
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(PROCESS_SET_QUOTA | PROCESS_TERMINATE | PROCESS_SUSPEND_RESUME, False, pid)
+    if not handle:
+        _warn_once('win-open', f"无法打开进程 {pid}，资源配置未生效")
+        return False
+    try:
+        info = _ExtendedLimitInformation()
+        limits = info.BasicLimitInformation
+        priority = WINDOWS_PRIORITY_CLASS.get(profile.get('priority') or 'normal')
+        if priority is not None:
+            limits.LimitFlags |= JOB_OBJECT_LIMIT_PRIORITY_CLASS
+            limits.PriorityClass = priority
+        cpus = resolve_cpus(profile.get('cpus'))
+        if cpus:
+            limits.LimitFlags |= JOB_OBJECT_LIMIT_AFFINITY
+            limits.Affinity = sum(1 << cpu for cpu in cpus)
+        if profile.get('memory_mb'):
+            limits.LimitFlags |= JOB_OBJECT_LIMIT_JOB_MEMORY
+            info.JobMemoryLimit = int(profile['memory_mb']) * 1024 * 1024
+
+        job = kernel32.CreateJobObjectW(None, None)
+        if not job:
+            _warn_once('win-job', "创建作业对象失败，资源配置未生效")
+            return False
+        # 不设置KILL_ON_JOB_CLOSE：关闭句柄后作业中的服务继续运行，启动器退出不影响服务
+        ok = (kernel32.SetInformationJobObject(job, JOB_OBJECT_EXTENDED_LIMIT_INFORMATION_CLASS,
+                                               ctypes.byref(info), ctypes.sizeof(info))
+              and kernel32.AssignProcessToJobObject(job, handle))
+        kernel32.CloseHandle(job)
+        if not ok:
+            _warn_once('win-assign', f"设置作业对象失败（错误码 {kernel32.GetLastError()}），资源配置未生效")
+        return bool(ok)
+    finally:
+        ctypes.windll.ntdll.NtResumeProcess(handle)
+        kernel32.CloseHandle(handle)
+
+
+# ---------- POSIX：nice、CPU亲和性、cgroup ----------
+def _cgroup_dir(name, memory_mb):
+    """在预先授权的cgroup根目录下为服务准备子cgroup，返回其目录，不可用时返回None"""
+    root = os.environ.get(CGROUP_ROOT_ENV)
+    if not root or not os.access(root, os.W_OK):
+        return None
+    path = os.path.join(root, name)
+    try:
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'memory.max'), 'w') as f:
+            f.write(str(int(memory_mb) * 1024 * 1024))
+    except OSError as e:
+        _warn_once('cgroup', f"设置cgroup内存上限失败: {e}")
+        return None
+    return path
+
+
+def wrap_posix_command(name, cmd, profile):
+    """
+    没有可用的cgroup根目录时，用systemd-run --user --scope为命令设置内存上限
+
+    scope模式下systemd-run直接exec命令，进程仍位于启动器创建的进程组中，结束进程组不受影响。
+    """
+    memory_mb = (profile or {}).get('memory_mb')
+    if not memory_mb or not sys.platform.startswith('linux') or os.environ.get(CGROUP_ROOT_ENV):
+        return cmd
+    if not _systemd_run_available():
+        _warn_once('memory', "未找到可用的cgroup，内存上限未生效（可设置环境变量 XIAOZHI_CGROUP_ROOT）")
+        return cmd
+    return f"systemd-run --user --scope --quiet -p MemoryMax={int(memory_mb)}M -- sh -c {shlex.quote(cmd)}"
+
+
+def _systemd_run_available():
+    """检查当前用户能否创建systemd scope（没有用户会话总线时会失败），结果只检查一次"""
+    global _systemd_run_ok
+    if _systemd_run_ok is None:
+        _systemd_run_ok = False
+        if shutil.which('systemd-run'):
+            try:
+                result = subprocess.run(['systemd-run', '--user', '--scope', '--quiet', 'true'],
+                                        capture_output=True, timeout=10)
+                _systemd_run_ok = result.returncode == 0
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+    return _systemd_run_ok
+
+
+def posix_preexec(name, profile):
+    """返回在子进程exec之前执行的函数：加入cgroup、设置nice值和CPU亲和性，子进程全部继承"""
+    if not profile:
+        return None
+    nice = POSIX_NICE.get(profile.get('priority') or 'normal', 0)
+    cpus = resolve_cpus(profile.get('cpus'))
+    cgroup = _cgroup_dir(name, profile['memory_mb']) if profile.get('memory_mb') else None
+
+    def preexec():
+        if cgroup:
+            try:
+                with open(os.path.join(cgroup, 'cgroup.procs'), 'w') as f:
+                    f.write(str(os.getpid()))
+            except OSError:
+                pass
+        if nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, 0, nice)
+            except (OSError, AttributeError):
+                pass
+        if cpus and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError:
+                pass
+
+    return preexec
+
+
+def popen_background(name, args, cwd=None):
+    """
+    按资源配置name启动后台命令（例如后台预取、git维护），标准输出和错误合并到管道
+
+    Windows先挂起创建并放入作业对象，POSIX在exec之前设置，子进程全部继承。
+    """
+    profile = get_profile(name)
+    if os.name == 'nt':
+        if not profile:
+            return subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    creationflags=subprocess.CREATE_NO_WINDOW)
+        process = subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   creationflags=CREATE_SUSPENDED | subprocess.CREATE_NO_WINDOW)
+        apply_windows_profile(process.pid, profile)
+        return process
+    return subprocess.Popen(args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            preexec_fn=posix_preexec(name, profile))
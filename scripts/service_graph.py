@@ -0,0 +1,176 @@
+import time
+import threading
+from tracing import span
+
+
+class ServiceNode:
+    """服务依赖图中的一个节点（一个服务或一个启动步骤）"""
+
+    def __init__(self, name, start, deps=None, ready=None, label=None, soft=False):
+        """
+        参数:
+        name: 节点名称，用于声明依赖
+        start: 启动动作，返回True/False表示是否成功
+        deps: 依赖的节点名称列表，只有依赖全部就绪后才会启动本节点
+        ready: 就绪检测函数，返回True/False；为None时启动动作完成即视为就绪
+        label: 报告中显示的中文名称
+        soft: 为True时即使依赖失败也继续启动（仅打印警告）
+        """
+        self.name = name
+        self.start = start
+        self.deps = list(deps or [])
+        self.ready = ready
+        self.label = label or name
+        self.soft = soft
+        # 运行时统计（相对于启动引擎开始的秒数）
+        self.started_at = None
+        self.launched_at = None
+        self.ready_at = None
+        self.success = None
+        self.skipped = False
+        self.done = threading.Event()
+
+
+def _check_graph(nodes):
+    """检查依赖是否存在以及是否有循环依赖，返回拓扑顺序"""
+    by_name = {node.name: node for node in nodes}
+    for node in nodes:
+        for dep in node.deps:
+            if dep not in by_name:
+                raise ValueError(f"节点 {node.name} 依赖了不存在的节点 {dep}")
+
+    order = []
+    state = {}
+
+    def visit(name, path):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"检测到循环依赖: {' -> '.join(path + [name])}")
+        state[name] = 'visiting'
+        for dep in by_name[name].deps:
+            visit(dep, path + [name])
+        state[name] = 'done'
+        order.append(by_name[name])
+
+    for node in nodes:
+        visit(node.name, [])
+    return order
+
+
+def _run_node(node, by_name, t0):
+    """在独立线程中运行单个节点：等待依赖 -> 启动 -> 等待就绪"""
+    try:
+        failed_deps = []
+        for dep in node.deps:
+            by_name[dep].done.wait()
+            if not by_name[dep].success:
+                failed_deps.append(by_name[dep].label)
+
+        if failed_deps and not node.soft:
+            print(f"⚠️ {node.label}：依赖 {'、'.join(failed_deps)} 未就绪，已跳过启动")
+            node.skipped = True
+            node.success = False
+            return
+        if failed_deps:
+            print(f"⚠️ {node.label}：依赖 {'、'.join(failed_deps)} 未就绪，仍继续启动")
+
+        node.started_at = time.perf_counter() - t0
+        with span(f"{node.label} 启动", cat='graph', node=node.name) as s:
+            launched = node.start()
+            s.set(result=bool(launched))
+        if not launched:
+            node.success = False
+            return
+        node.launched_at = time.perf_counter() - t0
+
+        if node.ready:
+            with span(f"{node.label} 就绪", cat='graph', node=node.name) as s:
+                node.success = node.ready()
+                s.set(result=bool(node.success))
+        else:
+            node.success = True
+        node.ready_at = time.perf_counter() - t0
+    except Exception as e:
+        print(f"❌ {node.label} 启动时出错: {e}")
+        node.success = False
+    finally:
+        if node.success and node.ready_at is None:
+            node.ready_at = time.perf_counter() - t0
+        node.done.set()
+
+
+def run_service_graph(nodes):
+    """
+    按依赖图并行启动服务
+
+    没有依赖关系的节点同时启动，每个节点只等待自己真正依赖的节点就绪。
+    全部节点结束后返回 (是否全部成功, 总耗时秒数)。
+    """
+    order = _check_graph(nodes)
+    by_name = {node.name: node for node in nodes}
+    t0 = time.perf_counter()
+
+    threads = []
+    for node in order:
+        thread = threading.Thread(target=_run_node, args=(node, by_name, t0), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    total = time.perf_counter() - t0
+    return all(node.success for node in nodes), total
+
+
+def get_critical_path(nodes):
+    """从最晚就绪的节点沿“最晚就绪的依赖”回溯，得到关键路径"""
+    by_name = {node.name: node for node in nodes}
+    finished = [node for node in nodes if node.ready_at is not None]
+    if not finished:
+        return []
+    node = max(finished, key=lambda n: n.ready_at)
+    path = [node]
+    while node.deps:
+        deps = [by_name[dep] for dep in node.deps if by_name[dep].ready_at is not None]
+        if not deps:
+            break
+        node = max(deps, key=lambda n: n.ready_at)
+        path.append(node)
+    path.reverse()
+    return path
+
+
+def format_report(nodes, total):
+    """生成各阶段耗时和关键路径报告"""
+    def fmt(value):
+        return f"{value:7.2f}s" if value is not None else "      -"
+
+    lines = []
+    lines.append("=" * 60)
+    lines.append("启动耗时报告（时间为相对启动开始的秒数）")
+    lines.append("-" * 60)
+    lines.append(f"{'阶段':<16}{'开始':>9}{'已启动':>9}{'已就绪':>9}{'耗时':>9}  状态")
+    for node in sorted(nodes, key=lambda n: (n.started_at is None, n.started_at or 0)):
+        cost = node.ready_at - node.started_at if node.ready_at is not None and node.started_at is not None else None
+        if node.skipped:
+            status = "跳过"
+        elif node.success:
+            status = "✅"
+        else:
+            status = "❌"
+        lines.append(f"{node.label:<16}{fmt(node.started_at)}{fmt(node.launched_at)}{fmt(node.ready_at)}{fmt(cost)}  {status}")
+
+    path = get_critical_path(nodes)
+    if path:
+        lines.append("-" * 60)
+        lines.append("关键路径:")
+        prev_ready = 0.0
+        for node in path:
+            # 关键路径上每一段的耗时 = 本节点就绪时间 - 上一节点就绪时间
+            lines.append(f"  {node.label:<16}+{node.ready_at - prev_ready:7.2f}s  (就绪于 {node.ready_at:.2f}s)")
+            prev_ready = node.ready_at
+    lines.append("-" * 60)
+    lines.append(f"总耗时: {total:.2f} 秒")
+    lines.append("=" * 60)
+    return '\n'.join(lines)
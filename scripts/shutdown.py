@@ -0,0 +1,182 @@
+import os
+import time
+import subprocess
+from probes import MYSQL_PORT, REDIS_PORT, redis_command
+from tracing import span
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 后端配置文件，其中保存了MySQL的root密码
+MANAGER_API_CONFIG = os.path.join(base_dir, 'src', 'main', 'manager-api', 'src', 'main', 'resources', 'application-dev.yml')
+
+# 安全关闭的等待时间（秒），超时后才强制结束
+MYSQL_SHUTDOWN_TIMEOUT = 60   # InnoDB需要刷完脏页
+REDIS_SHUTDOWN_TIMEOUT = 60   # SHUTDOWN SAVE需要写完RDB快照
+SERVICE_STOP_TIMEOUT = 15
+
+
+class ShutdownStep:
+    """有序停止中的一步"""
+
+    def __init__(self, name, label, request, alive, force=None, timeout=SERVICE_STOP_TIMEOUT):
+        """
+        参数:
+        name: 步骤名称
+        label: 报告中显示的中文名称
+        request: 请求服务自行退出的函数，返回True表示请求已被接受
+        alive: 判断服务是否仍在运行的函数
+        force: 超时或请求失败后强制结束的函数
+        timeout: 请求被接受后等待服务退出的秒数
+        """
+        self.name = name
+        self.label = label
+        self.request = request
+        self.alive = alive
+        self.force = force
+        self.timeout = timeout
+        # 运行结果
+        self.result = None
+        self.duration = 0.0
+
+
+def read_mysql_password():
+    """从后端配置文件读取MySQL密码，读取失败返回None"""
+    try:
+        import ruamel.yaml
+        with open(MANAGER_API_CONFIG, 'r', encoding='utf-8') as f:
+            config = ruamel.yaml.YAML().load(f)
+        return config['spring']['datasource']['druid']['password'] or None
+    except Exception:
+        return None
+
+
+def mysql_password_candidates(password=None):
+    """依次尝试的密码：指定的密码、配置文件中的密码、无密码"""
+    candidates = []
+    for item in (password, read_mysql_password(), None):
+        if item not in candidates:
+            candidates.append(item)
+    return candidates
+
+
+def request_mysql_shutdown(password=None, mysqladmin='mysqladmin', host='127.0.0.1', port=MYSQL_PORT):
+    """
+    请求MySQL安全关闭（mysqladmin shutdown，不可用时执行SQL的SHUTDOWN）
+
+    安全关闭会让InnoDB刷完脏页并干净地关闭重做日志，下次启动不需要崩溃恢复。
+    返回请求是否被接受。
+    """
+    candidates = mysql_password_candidates(password)
+    last_error = None
+    for pw in candidates:
+        cmd = [mysqladmin, '-h', host, '-P', str(port), '-u', 'root', '--connect-timeout=5']
+        if pw:
+            cmd.append(f'--password={pw}')
+        cmd.append('shutdown')
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, errors='replace', timeout=30)
+        except FileNotFoundError:
+            last_error = "未找到mysqladmin"
+            break
+        except subprocess.TimeoutExpired:
+            last_error = "mysqladmin执行超时"
+            continue
+        if result.returncode == 0:
+            return True
+        last_error = result.stderr.strip() or result.stdout.strip()
+    else:
+        # mysqladmin可用但所有密码都被拒绝
+        print(f"   MySQL安全关闭请求失败: {last_error}")
+        return False
+
+    # mysql-connector-python为可选依赖，没有mysqladmin时用它执行SQL的SHUTDOWN语句（导入较慢，用到时才导入）
+    try:
+        import mysql.connector
+    except ImportError:
+        mysql = None
+    if mysql is not None:
+        for pw in candidates:
+            try:
+                conn = mysql.connector.connect(host=host, port=port, user='root', password=pw or '', connection_timeout=5)
+                try:
+                    conn.cursor().execute('SHUTDOWN')
+                finally:
+                    conn.close()
+                return True
+            except mysql.connector.Error as e:
+                last_error = str(e)
+    print(f"   MySQL安全关闭请求失败: {last_error}")
+    return False
+
+
+def request_redis_shutdown(host='127.0.0.1', port=REDIS_PORT):
+    """
+    请求Redis保存快照后退出（SHUTDOWN SAVE）
+
+    Redis执行成功时直接关闭连接而不回复，收到错误回复说明保存失败或需要认证。
+    """
+    reply = redis_command(['SHUTDOWN', 'SAVE'], host, port, timeout=REDIS_SHUTDOWN_TIMEOUT)
+    if reply is None:
+        print("   无法连接Redis，跳过安全关闭")
+        return False
+    if reply.startswith('-'):
+        print(f"   Redis安全关闭请求失败: {reply[1:]}")
+        return False
+    return True
+
+
+def wait_for_exit(alive, timeout, interval=0.2):
+    """等待服务退出，返回是否在超时前退出"""
+    deadline = time.perf_counter() + timeout
+    while alive():
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+def _run_step(step):
+    if not step.alive():
+        return "未运行"
+    print(f"正在停止 {step.label}...")
+    if step.request():
+        if wait_for_exit(step.alive, step.timeout):
+            return "安全关闭"
+        print(f"⚠️ {step.label} 在 {step.timeout} 秒内未退出，将强制结束")
+    elif not step.alive():
+        # 请求过程中连接被关闭（例如服务已在退出）
+        return "安全关闭"
+    if step.force is None:
+        return "停止失败"
+    print(f"⚠️ 正在强制结束 {step.label}...")
+    step.force()
+    return "强制结束" if wait_for_exit(step.alive, 10) else "停止失败"
+
+
+def run_ordered_shutdown(steps):
+    """
+    按顺序停止服务：先请求服务自行退出，超时或请求失败后才强制结束
+
+    返回是否全部服务都已停止。
+    """
+    for step in steps:
+        start = time.perf_counter()
+        with span(f"停止: {step.label}", cat='shutdown', step=step.name) as s:
+            try:
+                step.result = _run_step(step)
+            except Exception as e:
+                print(f"❌ 停止 {step.label} 时出错: {e}")
+                step.result = "停止失败"
+            s.set(result=step.result)
+        step.duration = time.perf_counter() - start
+    print(format_shutdown_report(steps))
+    return all(step.result != "停止失败" for step in steps)
+
+
+def format_shutdown_report(steps):
+    lines = ["=" * 55, "有序停止报告:"]
+    for step in steps:
+        detail = "" if step.result == "未运行" else f"{step.duration:6.1f} 秒"
+        lines.append(f"  {step.label:<12} {step.result:<6} {detail}")
+    lines.append("=" * 55)
+    return '\n'.join(lines)
@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from tracing import span
+from launcher_settings import load_settings, save_settings
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC_DIR = os.path.join(base_dir, 'src')
+EMBEDDED_GIT = os.path.join(base_dir, "runtime", "git-2.48.1", "cmd", "git.exe")
+# 每次检出的耗时和文件数
+STATS_FILE = os.path.join(base_dir, 'data', 'sparse_checkout_stats.json')
+
+# 一键包会运行的模块：名称 -> (显示名称, 在src仓库中的目录)，每个启用的模块是一个稀疏检出的cone
+SPARSE_MODULES = {
+    'xiaozhi_server': ("小智AI服务端", 'main/xiaozhi-server'),
+    'manager_api': ("智控台后端", 'main/manager-api'),
+    'manager_web': ("智控台前端", 'main/manager-web'),
+    'digital_human': ("数字人测试页", 'main/digital-human'),
+}
+
+
+def find_git():
+    if os.path.exists(EMBEDDED_GIT):
+        return EMBEDDED_GIT
+    return shutil.which('git')
+
+
+def _git(git, cwd, args):
+    result = subprocess.run([git] + args, cwd=cwd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    return result.returncode, (result.stdout + result.stderr).strip()
+
+
+def sparse_paths(modules):
+    """把模块名转换为cone目录列表，忽略未知的模块名"""
+    return [SPARSE_MODULES[name][1] for name in modules if name in SPARSE_MODULES]
+
+
+def current_paths(git, repo_path=SRC_DIR):
+    """返回当前稀疏检出的目录列表，未启用稀疏检出时返回None"""
+    code, enabled = _git(git, repo_path, ['config', '--bool', 'core.sparseCheckout'])
+    if code != 0 or enabled != 'true':
+        return None
+    code, output = _git(git, repo_path, ['sparse-checkout', 'list'])
+    return [line for line in output.splitlines() if line] if code == 0 else None
+
+
+def count_files(git, repo_path=SRC_DIR):
+    """返回 (已检出的文件数, 仓库中的文件总数)，稀疏检出跳过的文件在索引中带有skip-worktree标记"""
+    code, output = _git(git, repo_path, ['ls-files', '-t'])
+    if code != 0:
+        return 0, 0
+    lines = output.splitlines()
+    skipped = sum(1 for line in lines if line.startswith('S '))
+    return len(lines) - skipped, len(lines)
+
+
+def record_checkout(kind, seconds, files, total):
+    """
+    记录一次检出的耗时和文件数，返回估算的节省
+
+    按本次每个文件的平均写入耗时，估算完整检出还需要写入的文件要多花的时间。
+    """
+    skipped = total - files
+    saved_seconds = seconds / files * skipped if files else 0
+    try:
+        with open(STATS_FILE, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    except (OSError, ValueError):
+        history = []
+    history.append({'kind': kind, 'at': time.time(), 'seconds': round(seconds, 3), 'files': files,
+                    'skipped': skipped, 'saved_seconds': round(saved_seconds, 3)})
+    try:
+        os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+        with open(STATS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(history[-50:], f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+    return skipped, saved_seconds
+
+
+def format_checkout(seconds, files, skipped, saved_seconds):
+    text = f"检出 {files} 个文件，用时 {seconds:.1f}s"
+    if skipped:
+        text += f"；稀疏检出跳过 {skipped} 个文件，估计节省 {saved_seconds:.1f}s"
+    return text
+
+
+def measured(git, kind, action, repo_path=SRC_DIR):
+    """
+    执行会写入工作区的操作（拉取、重置、切换稀疏目录）并记录耗时和文件数
+
+    action为无参数函数，返回值原样返回。
+    """
+    started = time.perf_counter()
+    with span(f"检出 {kind}", cat='git') as s:
+        result = action()
+    seconds = time.perf_counter() - started
+    files, total = count_files(git, repo_path)
+    skipped, saved_seconds = record_checkout(kind, seconds, files, total)
+    s.set(files=files, skipped=skipped)
+    print(format_checkout(seconds, files, skipped, saved_seconds))
+    return result
+
+
+def apply_profile(git, modules, repo_path=SRC_DIR):
+    """按模块列表设置稀疏检出（cone模式），modules为None时恢复完整检出，返回是否成功"""
+    if modules is None:
+        if current_paths(git, repo_path) is None:
+            return True
+        code, output = measured(git, 'disable', lambda: _git(git, repo_path, ['sparse-checkout', 'disable']), repo_path)
+    else:
+        paths = sparse_paths(modules)
+        if not paths:
+            print("⚠️ 没有启用任何模块，已取消稀疏检出设置")
+            return False
+        if sorted(current_paths(git, repo_path) or []) == sorted(paths):
+            return True
+        code, output = measured(git, 'set', lambda: _git(git, repo_path, ['sparse-checkout', 'set', '--cone'] + paths),
+                                repo_path)
+    if code != 0:
+        print(f"❌ 设置稀疏检出失败：{output}")
+        return False
+    return True
+
+
+def ensure_profile(git, repo_path=SRC_DIR, settings=None):
+    """按启动器设置同步src仓库的稀疏检出，在拉取之前调用，使拉取只写入启用的模块"""
+    settings = settings or load_settings()
+    modules = settings['sparse_modules'] if settings['sparse_checkout'] else None
+    return apply_profile(git, modules, repo_path)
+
+
+def describe(git, repo_path=SRC_DIR):
+    paths = current_paths(git, repo_path)
+    files, total = count_files(git, repo_path)
+    if paths is None:
+        return [f"稀疏检出：未启用（已检出全部 {total} 个文件）"]
+    lines = [f"稀疏检出：已启用（已检出 {files}/{total} 个文件）"]
+    for name, (label, path) in SPARSE_MODULES.items():
+        lines.append(f"  [{'x' if path in paths else ' '}] {name:<16}{label}（{path}）")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='管理src仓库的稀疏检出（只检出一键包会运行的模块）')
+    parser.add_argument('action', choices=['status', 'enable', 'disable'], help='查看状态 / 启用 / 恢复完整检出')
+    parser.add_argument('modules', nargs='*', help=f"启用的模块（默认全部）：{'、'.join(SPARSE_MODULES)}")
+    parser.add_argument('--repo', default=SRC_DIR, help='仓库目录')
+    args = parser.parse_args()
+
+    git = find_git()
+    if git is None:
+        print(f"[ERROR] 未找到Git程序：{EMBEDDED_GIT}")
+        sys.exit(1)
+    if not os.path.exists(os.path.join(args.repo, '.git')):
+        print(f"[ERROR] 未找到仓库：{args.repo}")
+        sys.exit(1)
+
+    if args.action != 'status':
+        unknown = [name for name in args.modules if name not in SPARSE_MODULES]
+        if unknown:
+            print(f"[ERROR] 未知的模块：{'、'.join(unknown)}")
+            sys.exit(1)
+        settings = load_settings()
+        settings['sparse_checkout'] = args.action == 'enable'
+        if args.modules:
+            settings['sparse_modules'] = args.modules
+        save_settings(settings)
+        if not ensure_profile(git, args.repo, settings):
+            sys.exit(1)
+    for line in describe(git, args.repo):
+        print(line)
@@ -0,0 +1,213 @@
+import os
+import re
+import gzip
+import argparse
+import mimetypes
+import http.client
+import email.utils
+from urllib.parse import urlsplit, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# brotli为可选依赖，未安装时只生成gzip预压缩文件
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 需要预压缩的文本类资源
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.css', '.json', '.svg', '.txt', '.map', '.xml', '.ico', '.wasm'}
+# 小于该大小的文件不值得压缩
+MIN_COMPRESS_SIZE = 1024
+# 文件名中带有内容哈希的资源（例如 app.3f2a1b9c.js）可以长期缓存
+HASHED_NAME = re.compile(r'[.-][0-9a-f]{8,}\.')
+# 转发请求时不应透传的逐跳头部
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+}
+# Windows注册表中的MIME类型可能有误（例如.js被识别为text/plain），这里固定常用类型
+mimetypes.add_type('application/javascript', '.js')
+mimetypes.add_type('text/css', '.css')
+mimetypes.add_type('image/svg+xml', '.svg')
+mimetypes.add_type('application/wasm', '.wasm')
+
+
+def precompress_dir(root):
+    """为构建产物中的文本资源生成 .gz（以及安装了brotli时的 .br）预压缩文件，返回生成的文件数"""
+    count = 0
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            if os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            count += 1
+            if brotli is not None:
+                with open(path + '.br', 'wb') as f:
+                    f.write(brotli.compress(data, quality=11))
+                count += 1
+    return count
+
+
+class StaticHandler(BaseHTTPRequestHandler):
+    """静态文件处理器：预压缩协商、缓存头、HTTP/1.1长连接、单页应用回退和API反向代理"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'XiaozhiStatic/1.0'
+    root = None
+    api_prefix = '/xiaozhi/'
+    api_upstream = None
+
+    def log_request(self, code='-', size='-'):
+        # 只记录出错的请求，避免刷屏
+        if isinstance(code, int) and code >= 400:
+            super().log_request(code, size)
+
+    def do_GET(self):
+        self._dispatch(send_body=True)
+
+    def do_HEAD(self):
+        self._dispatch(send_body=False)
+
+    def do_POST(self):
+        self._dispatch(send_body=True)
+
+    do_PUT = do_POST
+    do_DELETE = do_POST
+    do_PATCH = do_POST
+    do_OPTIONS = do_POST
+
+    def _dispatch(self, send_body):
+        path = urlsplit(self.path).path
+        if self.api_upstream and path.startswith(self.api_prefix):
+            self._proxy()
+        elif self.command in ('GET', 'HEAD'):
+            self._serve_static(path, send_body)
+        else:
+            self.send_error(405)
+
+    def _resolve(self, path):
+        """把URL路径映射为dist中的文件，找不到时回退到index.html（前端路由）"""
+        rel = unquote(path).lstrip('/')
+        full = os.path.realpath(os.path.join(self.root, rel))
+        # 按路径组件比较：字符串前缀判断会放过 /../dist-old/ 这类同名前缀的兄弟目录
+        if full != self.root and not full.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(full):
+            full = os.path.join(full, 'index.html')
+        if os.path.isfile(full):
+            return full
+        if '.' not in os.path.basename(rel):
+            return os.path.join(self.root, 'index.html')
+        return None
+
+    def _serve_static(self, path, send_body):
+        file_path = self._resolve(path)
+        if file_path is None or not os.path.isfile(file_path):
+            self.send_error(404)
+            return
+
+        # 选择客户端支持的预压缩版本
+        accept = self.headers.get('Accept-Encoding', '')
+        encoding = None
+        send_path = file_path
+        for enc, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if enc in accept and os.path.isfile(file_path + suffix):
+                encoding, send_path = enc, file_path + suffix
+                break
+
+        stat = os.stat(send_path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+        if os.path.basename(file_path) == 'index.html':
+            cache_control = 'no-cache'
+        elif HASHED_NAME.search(os.path.basename(file_path)):
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'public, max-age=3600'
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(stat.st_size))
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        if send_body:
+            with open(send_path, 'rb') as f:
+                while True:
+                    chunk = f.read(64 * 1024)
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+
+    def _proxy(self):
+        """把API请求转发给后端（替代开发服务器的proxy配置）"""
+        upstream = urlsplit(self.api_upstream)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        headers['Host'] = upstream.netloc
+        conn = http.client.HTTPConnection(upstream.hostname, upstream.port, timeout=60)
+        try:
+            conn.request(self.command, self.path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.send_error(502, f"后端API服务器不可用: {e}")
+            return
+        finally:
+            conn.close()
+
+        self.send_response(response.status, response.reason)
+        for key, value in response.getheaders():
+            if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() != 'content-length':
+                self.send_header(key, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+
+def serve(root, port=8001, host='0.0.0.0', api_upstream=None):
+    """启动静态文件服务器（阻塞）"""
+    # root在这里一次性解析为真实路径，_resolve中直接与请求文件的真实路径比较
+    handler = type('Handler', (StaticHandler,), {'root': os.path.realpath(root), 'api_upstream': api_upstream})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    print(f"前端静态服务器已启动: http://localhost:{port}  目录: {root}")
+    if api_upstream:
+        print(f"API请求 {StaticHandler.api_prefix}* 将转发到 {api_upstream}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='智控台前端静态文件服务器')
+    parser.add_argument('--root', required=True, help='构建产物目录（dist）')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--api', default='http://127.0.0.1:8002', help='后端API地址，留空则不转发')
+    args = parser.parse_args()
+    serve(args.root, args.port, args.host, args.api or None)
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import subprocess
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 步骤缓存记录文件
+CACHE_FILE = os.path.join(base_dir, 'data', '.step_cache.json')
+# 遍历源码目录时跳过的目录（构建产物和依赖目录不属于输入）
+SKIP_DIRS = {'.git', 'node_modules', 'target', 'dist', '__pycache__', '.idea', '.vscode'}
+
+# 并行执行的步骤写入缓存时加锁
+_lock = threading.Lock()
+# 本次运行中因缓存命中而跳过的步骤 [(名称, 节省的秒数)]
+skipped_steps = []
+
+
+def _hash_file(hasher, path):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+
+
+def fingerprint(inputs, extra=None):
+    """
+    计算一组输入的指纹
+
+    inputs中的文件按内容计算哈希；目录按其中每个文件的相对路径、大小和修改时间计算，
+    避免每次启动都完整读取整个源码树。不存在的路径也会记入指纹。
+    extra为额外参与计算的字符串（例如解释器版本）。
+    """
+    hasher = hashlib.sha256()
+    for path in inputs:
+        hasher.update(f"\0{os.path.basename(path)}\0".encode('utf-8'))
+        if os.path.isfile(path):
+            _hash_file(hasher, path)
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(file_path)
+                    except OSError:
+                        continue
+                    rel = os.path.relpath(file_path, path).replace('\\', '/')
+                    hasher.update(f"{rel}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+        else:
+            hasher.update(b'<missing>')
+    if extra:
+        hasher.update(f"\0{extra}".encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def load_cache():
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        tmp_file = CACHE_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ 保存步骤缓存失败: {e}")
+
+
+def run_cached_step(name, label, inputs, action, extra=None, outputs=None, force=False):
+    """
+    带输入指纹缓存的步骤执行
+
+    参数:
+    name: 步骤的唯一名称，作为缓存键
+    label: 输出中显示的中文名称
+    inputs: 输入文件/目录列表
+    action: 实际执行步骤的函数，返回True/False
+    extra: 额外参与指纹计算的字符串
+    outputs: 步骤产物路径列表，任意一个不存在时不使用缓存
+    force: 为True时忽略缓存强制执行
+    返回:
+    步骤是否成功（命中缓存视为成功）
+    """
+    digest = fingerprint(inputs, extra)
+    cache = load_cache()
+    entry = cache.get(name, {})
+    outputs_ok = all(os.path.exists(path) for path in (outputs or []))
+
+    if not force and outputs_ok and entry.get('fingerprint') == digest:
+        saved = entry.get('duration', 0)
+        skipped_steps.append((label, saved))
+        print(f"⏭️ {label}：输入未变化，已跳过（上次耗时 {saved:.1f} 秒）")
+        return True
+
+    start = time.perf_counter()
+    success = action()
+    duration = time.perf_counter() - start
+    if success:
+        # 步骤可能改写自己的输入（例如npm install改写package-lock.json），按执行后的内容记录指纹，
+        # 否则下次启动时指纹总是不同，缓存永远不会命中
+        digest = fingerprint(inputs, extra)
+        # 重新读取缓存，避免并行执行的其他步骤写入的记录被覆盖
+        with _lock:
+            cache = load_cache()
+            cache[name] = {
+                'fingerprint': digest,
+                'duration': round(duration, 2),
+                'finished_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            save_cache(cache)
+    return success
+
+
+def get_skipped_summary():
+    """返回本次运行跳过步骤的汇总文本，没有跳过的步骤时返回空字符串"""
+    if not skipped_steps:
+        return ""
+    total = sum(saved for _, saved in skipped_steps)
+    names = '、'.join(label for label, _ in skipped_steps)
+    return f"⏭️ 已跳过 {len(skipped_steps)} 个未变化的步骤（{names}），节省约 {total:.1f} 秒"
+
+
+def python_fingerprint_extra():
+    """pip步骤额外的指纹内容：解释器路径和版本"""
+    return f"{sys.executable}|{sys.version}"
+
+
+def pip_install_cached(requirements_file, mirror_url=None, label=None, force=False, extra_args=None, cwd=None):
+    """requirements.txt和解释器版本都未变化时跳过pip install"""
+    label = label or f"安装依赖 {os.path.basename(os.path.dirname(os.path.abspath(requirements_file)))}"
+
+    def install():
+        cmd = [sys.executable, "-m", "pip", "install", "-r", requirements_file]
+        if mirror_url:
+            cmd += ["-i", mirror_url]
+        cmd += extra_args or []
+        return subprocess.run(cmd, cwd=cwd).returncode == 0
+
+    name = "pip:" + os.path.relpath(os.path.abspath(requirements_file), base_dir).replace('\\', '/')
+    return run_cached_step(name, label, [requirements_file], install, extra=python_fingerprint_extra(), force=force)
+
+
+if __name__ == "__main__":
+    # 供批处理调用：python step_cache.py pip <requirements.txt> [-i 镜像地址] [--force]
+    parser = argparse.ArgumentParser(description='带缓存的依赖安装')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pip_parser = subparsers.add_parser('pip', help='requirements.txt未变化时跳过pip install')
+    pip_parser.add_argument('requirements')
+    pip_parser.add_argument('-i', '--index-url', default=None)
+    pip_parser.add_argument('--force', action='store_true', help='忽略缓存强制安装')
+    args = parser.parse_args()
+
+    if args.command == 'pip':
+        ok = pip_install_cached(args.requirements, args.index_url, force=args.force)
+        print(get_skipped_summary())
+        sys.exit(0 if ok else 1)
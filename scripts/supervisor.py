@@ -0,0 +1,209 @@
+import time
+import threading
+from process_control import get_backend
+from tracing import span, instant
+from resource_profiles import describe_profile
+
+# 用户关闭控制台窗口或按Ctrl+C时的退出码（STATUS_CONTROL_C_EXIT），视为主动停止
+STATUS_CONTROL_C_EXIT = 0xC000013A
+
+# 重启策略
+RESTART_BASE_DELAY = 1.0     # 首次重启等待秒数
+RESTART_MAX_DELAY = 30.0     # 重启等待上限
+STABLE_SECONDS = 60.0        # 连续运行超过该时长后重置退避
+CRASH_LOOP_COUNT = 5         # 在窗口期内崩溃达到该次数判定为崩溃循环
+CRASH_LOOP_WINDOW = 120.0    # 崩溃循环判定窗口（秒）
+
+
+class ManagedService:
+    """被守护的服务及其运行状态"""
+
+    def __init__(self, name, cmd, cwd=None, label=None, profile=None):
+        self.name = name
+        self.cmd = cmd
+        self.cwd = cwd
+        self.label = label or name
+        self.profile = profile
+        self.process = None
+        self.status = "未启动"
+        self.wanted = False          # 期望运行（用户主动停止后为False）
+        self.started_at = None
+        self.restarts = 0
+        self.crash_times = []
+        self.backoff = RESTART_BASE_DELAY
+        self.next_restart_at = None
+        self.last_exit_code = None
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+
+class Supervisor:
+    """
+    常驻进程守护器
+
+    通过PID和进程组持有每个子进程，后台线程检测子进程退出，
+    对异常退出的服务按指数退避自动重启，短时间内反复崩溃则判定为崩溃循环并停止重启。
+    """
+
+    def __init__(self, backend=None, poll_interval=0.5):
+        self.backend = backend or get_backend()
+        self.services = {}
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._monitor = None
+
+    def register(self, name, cmd, cwd=None, label=None, profile=None):
+        """登记一个可被守护的服务，profile为每次启动（包括重启）时应用的资源配置"""
+        with self._lock:
+            if name not in self.services:
+                self.services[name] = ManagedService(name, cmd, cwd, label, profile)
+            return self.services[name]
+
+    def _spawn(self, service):
+        """通过进程控制后端在新的进程组中启动子进程，cmd可以是在启动时才生成命令的函数"""
+        with span(f"创建进程: {service.label}", cat='process', service=service.name) as s:
+            cmd = service.cmd() if callable(service.cmd) else service.cmd
+            service.process = self.backend.spawn(service.name, cmd, cwd=service.cwd, title=service.label,
+                                                 profile=service.profile)
+            s.set(pid=service.pid, cmd=cmd, profile=describe_profile(service.profile))
+        service.started_at = time.time()
+        service.status = "运行中"
+        service.next_restart_at = None
+
+    def start(self, name):
+        """启动服务并开始守护，已在运行时直接返回True"""
+        with self._lock:
+            service = self.services[name]
+            if service.is_running():
+                print(f"{service.label} 已在运行中（PID {service.pid}）")
+                return True
+            pid = self.backend.read_pid(service.name)
+            if pid is not None:
+                print(f"{service.label} 已在运行中（PID {pid}，由之前的启动器启动，不受本次守护）")
+                return True
+            service.wanted = True
+            service.crash_times = []
+            service.backoff = RESTART_BASE_DELAY
+            try:
+                self._spawn(service)
+            except Exception as e:
+                service.status = "启动失败"
+                print(f"❌ 启动 {service.label} 失败: {e}")
+                return False
+        self._ensure_monitor()
+        return True
+
+    def stop(self, name, timeout=10):
+        """停止服务（不再自动重启），返回是否已停止"""
+        with self._lock:
+            service = self.services[name]
+            service.wanted = False
+            service.next_restart_at = None
+            process = service.process
+        if process is None or process.poll() is not None:
+            service.status = "已停止"
+            self.backend.remove_pid(service.name)
+            return True
+        stopped = self.backend.terminate(process.pid, timeout, process=process)
+        if stopped:
+            self.backend.remove_pid(service.name)
+        service.status = "已停止" if stopped else "停止失败"
+        return stopped
+
+    def release(self, name):
+        """不再自动重启服务，用于服务被请求自行退出（例如MySQL安全关闭）之前"""
+        with self._lock:
+            service = self.services[name]
+            service.wanted = False
+            service.next_restart_at = None
+
+    def stop_all(self):
+        for name in list(self.services):
+            self.stop(name)
+
+    def _ensure_monitor(self):
+        if self._monitor is None or not self._monitor.is_alive():
+            self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+            self._monitor.start()
+
+    def _monitor_loop(self):
+        while True:
+            with self._lock:
+                for service in self.services.values():
+                    self._check(service)
+            time.sleep(self.poll_interval)
+
+    def _check(self, service):
+        """检查单个服务，必要时安排或执行重启"""
+        now = time.time()
+        if service.next_restart_at is not None:
+            if service.wanted and now >= service.next_restart_at:
+                service.restarts += 1
+                print(f"\n🔁 正在重启 {service.label}（第 {service.restarts} 次）...")
+                try:
+                    self._spawn(service)
+                except Exception as e:
+                    print(f"❌ 重启 {service.label} 失败: {e}")
+                    self._on_crash(service, now)
+            return
+
+        if not service.wanted or service.process is None or service.process.poll() is None:
+            return
+
+        code = service.process.returncode
+        service.last_exit_code = code
+        if code == 0 or (code & 0xFFFFFFFF) == STATUS_CONTROL_C_EXIT:
+            # 正常退出或用户关闭了窗口，视为主动停止
+            service.wanted = False
+            service.status = "已退出"
+            return
+
+        # 稳定运行一段时间后再崩溃，重置退避时间
+        if service.started_at and now - service.started_at >= STABLE_SECONDS:
+            service.backoff = RESTART_BASE_DELAY
+        print(f"\n⚠️ {service.label} 异常退出（退出码 {code}）")
+        memory_mb = (service.profile or {}).get('memory_mb')
+        if memory_mb:
+            print(f"   该服务设置了 {memory_mb}MB 的内存上限，达到上限时分配内存会失败，"
+                  f"如果频繁退出请在启动器设置中调高或删除 resource_profiles 中的 memory_mb")
+        instant(f"异常退出: {service.label}", cat='process', service=service.name, pid=service.pid, exit_code=code)
+        self._on_crash(service, now)
+
+    def _on_crash(self, service, now):
+        service.crash_times = [t for t in service.crash_times if now - t < CRASH_LOOP_WINDOW] + [now]
+        if len(service.crash_times) >= CRASH_LOOP_COUNT:
+            service.wanted = False
+            service.next_restart_at = None
+            service.status = "崩溃循环"
+            print(f"❌ {service.label} 在 {CRASH_LOOP_WINDOW:.0f} 秒内崩溃 {len(service.crash_times)} 次，已停止自动重启，请检查服务窗口或日志")
+            return
+        service.status = "等待重启"
+        service.next_restart_at = now + service.backoff
+        print(f"   将在 {service.backoff:.0f} 秒后自动重启")
+        service.backoff = min(service.backoff * 2, RESTART_MAX_DELAY)
+
+    def status_lines(self):
+        """生成菜单中显示的服务状态"""
+        lines = []
+        now = time.time()
+        with self._lock:
+            for service in self.services.values():
+                if service.status == "未启动":
+                    continue
+                detail = ""
+                if service.is_running():
+                    uptime = int(now - service.started_at)
+                    detail = f"PID {service.pid}，已运行 {uptime // 60}分{uptime % 60}秒"
+                elif service.next_restart_at:
+                    detail = f"{max(0, service.next_restart_at - now):.0f} 秒后重启"
+                elif service.last_exit_code is not None:
+                    detail = f"退出码 {service.last_exit_code}"
+                if service.restarts:
+                    detail += f"，已重启 {service.restarts} 次"
+                lines.append(f"  {service.label:<12} {service.status:<6} {detail}")
+        return lines
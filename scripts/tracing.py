@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import functools
+from contextlib import contextmanager
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 时间线事件日志（每行一个JSON事件）和导出目录
+TRACE_DIR = os.path.join(base_dir, 'data', 'trace')
+EVENTS_FILE = os.path.join(TRACE_DIR, 'events.jsonl')
+# 事件日志超过该大小时轮转为 events.jsonl.1
+MAX_EVENTS_BYTES = 5 * 1024 * 1024
+# 会话ID通过环境变量传给子进程（例如init_mysql.py），使子进程的事件归入同一次启动
+SESSION_ENV = 'XIAOZHI_TRACE_SESSION'
+SESSION_ID = os.environ.setdefault(SESSION_ENV, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+# 进程名称，用于在时间线中区分启动器、MySQL初始化和更新程序
+PROCESS_NAME = os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+
+_lock = threading.Lock()
+_rotated = False
+
+
+class Span:
+    """一个计时区间，可以在执行过程中补充参数（例如子进程PID）"""
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = dict(args)
+        self.start = None
+        self.end = None
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+def _rotate():
+    global _rotated
+    if _rotated:
+        return
+    _rotated = True
+    try:
+        if os.path.getsize(EVENTS_FILE) > MAX_EVENTS_BYTES:
+            os.replace(EVENTS_FILE, EVENTS_FILE + '.1')
+    except OSError:
+        pass
+
+
+def _write_event(event):
+    """追加一条事件，写入失败不影响启动流程"""
+    line = json.dumps(event, ensure_ascii=False, default=str) + '\n'
+    with _lock:
+        try:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            _rotate()
+            with open(EVENTS_FILE, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError:
+            pass
+
+
+def _record(name, cat, start, end, args):
+    thread = threading.current_thread()
+    _write_event({
+        'session': SESSION_ID,
+        'name': name,
+        'cat': cat,
+        'start': round(start, 6),
+        'end': round(end, 6),
+        'duration_ms': round((end - start) * 1000, 3),
+        'pid': os.getpid(),
+        'process': PROCESS_NAME,
+        'tid': thread.ident,
+        'thread': thread.name,
+        'args': args,
+    })
+
+
+@contextmanager
+def span(name, cat='launcher', **args):
+    """
+    记录一个阶段的墙钟开始/结束时间
+
+    用法:
+    with span('启动MySQL', cat='service') as s:
+        ...
+        s.set(pid=child_pid)
+    出现异常时在参数中记录错误信息后继续抛出。
+    """
+    current = Span(name, cat, args)
+    current.start = time.time()
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end = time.time()
+        _record(name, cat, current.start, current.end, current.args)
+
+
+def traced(name=None, cat='launcher'):
+    """把整个函数记录为一个区间的装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__, cat=cat) as s:
+                result = func(*args, **kwargs)
+                if isinstance(result, bool):
+                    s.set(result=result)
+                return result
+        return wrapper
+    return decorator
+
+
+class Phases:
+    """
+    顺序执行的多个阶段：开始下一个阶段时自动结束上一个阶段
+
+    适合在已有的长函数中按步骤打点，而不必把每一步改写成with语句块。
+    """
+
+    def __init__(self, cat='launcher'):
+        self.cat = cat
+        self._current = None
+
+    def begin(self, name, **args):
+        self.end()
+        self._current = Span(name, self.cat, args)
+        self._current.start = time.time()
+
+    def end(self, **args):
+        if self._current is None:
+            return
+        current, self._current = self._current, None
+        current.set(**args)
+        current.end = time.time()
+        _record(current.name, current.cat, current.start, current.end, current.args)
+
+
+def instant(name, cat='launcher', **args):
+    """记录一个时间点事件（例如服务崩溃）"""
+    now = time.time()
+    _record(name, cat, now, now, args)
+
+
+def load_events(path=None):
+    events = []
+    try:
+        with open(path or EVENTS_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return events
+
+
+def list_sessions(events):
+    """按出现顺序返回 [(会话ID, 事件数, 总时长秒)]"""
+    sessions = {}
+    for event in events:
+        info = sessions.setdefault(event['session'], [0, event['start'], event['end']])
+        info[0] += 1
+        info[1] = min(info[1], event['start'])
+        info[2] = max(info[2], event['end'])
+    return [(sid, count, end - start) for sid, (count, start, end) in sessions.items()]
+
+
+def to_chrome_trace(events):
+    """转换为Chrome Trace Event格式（可在 ui.perfetto.dev 或 chrome://tracing 中打开）"""
+    trace_events = []
+    named = set()
+    for event in events:
+        pid, tid = event['pid'], event['tid']
+        if ('p', pid) not in named:
+            named.add(('p', pid))
+            trace_events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f"{event['process']} ({pid})"}})
+        if ('t', pid, tid) not in named:
+            named.add(('t', pid, tid))
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': event['thread']}})
+        item = {
+            'name': event['name'],
+            'cat': event['cat'],
+            'ts': int(event['start'] * 1_000_000),
+            'pid': pid,
+            'tid': tid,
+            'args': event.get('args', {}),
+        }
+        if event['end'] > event['start']:
+            item.update(ph='X', dur=int((event['end'] - event['start']) * 1_000_000))
+        else:
+            item.update(ph='i', s='t')
+        trace_events.append(item)
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+
+def export_chrome_trace(output=None, session=None):
+    """
+    把事件日志导出为Chrome Trace文件
+
+    参数:
+    output: 输出文件路径，默认 data/trace/<会话ID>.trace.json
+    session: 会话ID，None表示当前进程所在的会话，'last'表示最近一次会话，'all'表示全部
+    返回:
+    输出文件路径，没有事件时返回None
+    """
+    events = load_events()
+    if session == 'last':
+        sessions = list_sessions(events)
+        session = sessions[-1][0] if sessions else None
+    elif session is None:
+        session = SESSION_ID
+    if session != 'all':
+        events = [event for event in events if event['session'] == session]
+    if not events:
+        return None
+    output = output or os.path.join(TRACE_DIR, f"{session}.trace.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(to_chrome_trace(events), f, ensure_ascii=False)
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='启动时间线事件日志工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='列出记录过的会话')
+    export_parser = subparsers.add_parser('export', help='导出为Chrome Trace（可用Perfetto打开）')
+    export_parser.add_argument('--session', default='last', help="会话ID，默认最近一次，'all'导出全部")
+    export_parser.add_argument('-o', '--output', default=None, help='输出文件路径')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for sid, count, duration in list_sessions(load_events()):
+            print(f"{sid:<28} {count:>5} 个事件  跨度 {duration:.1f} 秒")
+    else:
+        path = export_chrome_trace(args.output, args.session)
+        if path is None:
+            print("没有找到对应的时间线事件")
+            sys.exit(1)
+        print(f"已导出: {path}")
+        print("请在 https://ui.perfetto.dev 中打开该文件查看时间线")
@@ -0,0 +1,603 @@
+import os
+import sys
+import time
+import shutil
+import json
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from tracing import span
+from git_mirrors import MirrorScoreboard, try_mirrors, check_up_to_date
+from git_progress import GitProgress
+from sparse_profile import ensure_profile, measured
+from change_plan import ChangePlan, record_update, format_plan
+from resource_profiles import popen_background
+
+# psutil为可选依赖（已加入requirements.txt），未安装时后台预取只降低优先级、不限速
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 内嵌Git客户端路径，不存在时使用PATH中的git
+EMBEDDED_GIT = os.path.join(base_dir, "runtime", "git-2.48.1", "cmd", "git.exe")
+
+# 一起更新的仓库：(名称, 显示名称, 相对路径, 默认仓库地址)
+# 默认地址为None的仓库只使用其origin中记录的地址（例如可选安装的音乐服务端）
+REPOSITORIES = [
+    ('onekey', "一键包", '.', "https://github.com/VanillaNahida/xiaozhi-server-full-module-onekey.git"),
+    ('server', "小智服务端", 'src', "https://github.com/xinnan-tech/xiaozhi-esp32-server.git"),
+    ('music', "音乐服务端", os.path.join('src', 'main', 'music-xiaozhi-server'), None),
+]
+# 浅克隆模式：只保留最新的提交，文件内容在检出时才按需下载（partial clone）
+SHALLOW_DEPTH = 1
+PARTIAL_FILTER = 'blob:none'
+# 使用 --shallow 而不指定仓库时转换的仓库（小智服务端的历史、文档图片和移动端代码体积最大）
+SHALLOW_DEFAULT_REPOS = ['server']
+# 各仓库在完整模式和浅克隆模式下最近一次拉取的传输量和耗时
+STATS_FILE = os.path.join(base_dir, 'data', 'update_stats.json')
+# 汇总进度的刷新间隔（秒）
+PROGRESS_INTERVAL = 2.0
+# 后台预取的默认限速（字节/秒），以及限速时单次暂停的最长时间（秒），暂停过久服务器可能断开连接
+PREFETCH_RATE_LIMIT = 512 * 1024
+MAX_THROTTLE_PAUSE = 5.0
+
+
+def find_git():
+    if os.path.exists(EMBEDDED_GIT):
+        return EMBEDDED_GIT
+    return shutil.which('git')
+
+
+def canonical_github_url(url):
+    """去掉镜像代理前缀，还原为GitHub原始地址（例如 https://ghfast.top/https://github.com/a/b.git）"""
+    index = url.find('github.com/')
+    if index < 0:
+        return url
+    return "https://" + url[index:]
+
+
+class RepoUpdate:
+    """一个仓库的更新状态"""
+
+    def __init__(self, name, label, path, default_url):
+        self.name = name
+        self.label = label
+        self.path = path
+        self.default_url = default_url
+        self.repo_url = None
+        self.branch = None
+        self.state = "等待"
+        # 当前拉取的进度解析器（git_progress.GitProgress）
+        self.progress = None
+        self.mirror = None
+        self.error = None
+        self.before = None
+        self.after = None
+        # 浅克隆模式；convert表示本次才从完整克隆转换过来
+        self.shallow = False
+        self.convert = False
+        # 本地分支上有远程没有的提交（浅克隆模式下无法用祖先关系判断能否快进，需要事先检查）
+        self.local_commits = False
+        self.received_bytes = None
+        self.fetch_seconds = None
+        self.git_size_before = None
+        self.git_size_after = None
+
+    @property
+    def mode(self):
+        return 'shallow' if self.shallow else 'full'
+
+    @property
+    def fetched(self):
+        return self.after is not None
+
+    def progress_text(self):
+        if self.progress is not None and self.progress.phase and self.state.startswith("下载"):
+            return f"{self.label} {self.progress.status_text()}"
+        return f"{self.label} {self.state}"
+
+
+def _format_bytes(value):
+    if value is None:
+        return "-"
+    for unit in ('B', 'KB', 'MB'):
+        if value < 1024:
+            return f"{value:.0f}{unit}" if unit == 'B' else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.2f}GB"
+
+
+def directory_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def mirror_config_args(repo, url):
+    """
+    浅克隆模式下通过远程名origin拉取（partial clone只能从origin按需下载文件内容），
+    用临时的 url.<镜像>.insteadOf 配置把origin指向镜像，不修改仓库配置
+    """
+    if not url or url == repo.repo_url:
+        return []
+    return ['-c', f'url.{url}.insteadOf={repo.repo_url}']
+
+
+def git_output(git, cwd, args):
+    """执行git命令并返回 (退出码, 输出)"""
+    result = subprocess.run([git] + args, cwd=cwd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    return result.returncode, (result.stdout + result.stderr).strip()
+
+
+def discover_repositories(git, root=base_dir):
+    """找出已安装的仓库，读取当前分支和仓库地址"""
+    repos = []
+    for name, label, rel_path, default_url in REPOSITORIES:
+        path = os.path.normpath(os.path.join(root, rel_path))
+        if not os.path.exists(os.path.join(path, '.git')):
+            continue
+        repo = RepoUpdate(name, label, path, default_url)
+        code, branch = git_output(git, path, ['rev-parse', '--abbrev-ref', 'HEAD'])
+        code_origin, origin = git_output(git, path, ['remote', 'get-url', 'origin'])
+        repo.branch = branch if code == 0 and branch != 'HEAD' else 'main'
+        repo.repo_url = canonical_github_url(origin) if code_origin == 0 and origin else default_url
+        if not repo.repo_url:
+            continue
+        code, head = git_output(git, path, ['rev-parse', 'HEAD'])
+        repo.before = head if code == 0 else None
+        code, shallow = git_output(git, path, ['rev-parse', '--is-shallow-repository'])
+        repo.shallow = code == 0 and shallow == 'true'
+        code, _ = git_output(git, path, ['merge-base', '--is-ancestor', 'HEAD', f'refs/remotes/origin/{repo.branch}'])
+        repo.local_commits = code != 0
+        repos.append(repo)
+    return repos
+
+
+def prepare_partial_clone(git, repo):
+    """把完整克隆标记为partial clone：origin改回原始地址并设置为按需下载文件内容的promisor远程"""
+    repo.git_size_before = directory_size(os.path.join(repo.path, '.git'))
+    git_output(git, repo.path, ['remote', 'set-url', 'origin', repo.repo_url])
+    git_output(git, repo.path, ['config', 'remote.origin.promisor', 'true'])
+    git_output(git, repo.path, ['config', 'remote.origin.partialclonefilter', PARTIAL_FILTER])
+    # 之后直接执行git pull/fetch时也只拉取当前分支、不拉取标签，不会重新下载完整历史
+    git_output(git, repo.path, ['config', 'remote.origin.fetch', f'+refs/heads/{repo.branch}:refs/remotes/origin/{repo.branch}'])
+    git_output(git, repo.path, ['config', 'remote.origin.tagOpt', '--no-tags'])
+
+
+class BandwidthLimiter:
+    """
+    按git进度输出中的已接收字节数限速
+
+    git没有限速选项：平均速度超出上限时挂起git进程树（包括实际下载的git-remote-https），
+    暂停期间TCP接收窗口填满，服务器随之暂停发送。需要psutil，未安装时不限速。
+    """
+
+    def __init__(self, pid, rate):
+        self.rate = rate
+        # 从收到第一行下载进度开始计时，服务器压缩对象的时间不计入
+        self.started = None
+        self.process = None
+        if psutil is not None and rate:
+            try:
+                self.process = psutil.Process(pid)
+            except psutil.Error:
+                pass
+
+    def update(self, received_bytes):
+        if self.process is None or received_bytes is None:
+            return
+        if self.started is None:
+            self.started = time.perf_counter() - received_bytes / self.rate
+            return
+        wait = received_bytes / self.rate - (time.perf_counter() - self.started)
+        if wait <= 0:
+            return
+        suspended = []
+        try:
+            for process in [self.process] + self.process.children(recursive=True):
+                process.suspend()
+                suspended.append(process)
+            time.sleep(min(wait, MAX_THROTTLE_PAUSE))
+        except psutil.Error:
+            pass
+        finally:
+            for process in suspended:
+                try:
+                    process.resume()
+                except psutil.Error:
+                    pass
+
+
+def run_fetch(git, repo, url, background=False, rate_limit=None):
+    """
+    从指定地址拉取分支到 origin/<分支>，实时解析进度，返回 (是否成功, 最后几行输出, (传输字节数, 传输耗时))
+
+    background为True时以低优先级运行（后台预取），rate_limit为限速（字节/秒）。
+    """
+    refspec = f'+refs/heads/{repo.branch}:refs/remotes/origin/{repo.branch}'
+    if repo.shallow:
+        args = mirror_config_args(repo, url) + ['fetch', '--progress', '--no-tags', f'--depth={SHALLOW_DEPTH}',
+                                                 f'--filter={PARTIAL_FILTER}', 'origin', refspec]
+    else:
+        args = ['fetch', '--progress', '--no-tags', url, refspec]
+    with span(f"git fetch {repo.name}", cat='git', url=url, background=background) as s:
+        if background:
+            process = popen_background('prefetch', [git] + args, repo.path)
+        else:
+            process = subprocess.Popen([git] + args, cwd=repo.path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        limiter = BandwidthLimiter(process.pid, rate_limit)
+        progress = repo.progress = GitProgress()
+        updates = 0
+        while True:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                break
+            progress.feed(chunk)
+            if progress.updates != updates:
+                updates = progress.updates
+                limiter.update(progress.received_bytes)
+        progress.finish()
+        code = process.wait()
+        s.set(returncode=code, received_bytes=progress.received_bytes)
+    return code == 0, progress.output, progress.transfer
+
+
+def is_prefetched(git, repo, remote):
+    """远程提交是否已经由后台预取下载到 origin/<分支>（拉取成功后才会更新该引用）"""
+    code, tip = git_output(git, repo.path, ['rev-parse', f'refs/remotes/origin/{repo.branch}'])
+    return code == 0 and tip == remote
+
+
+def fetch_repository(git, repo, scoreboard, print_lock):
+    """为一个仓库选择镜像并拉取，不修改工作区"""
+    def log(message):
+        message = message.strip()
+        if message:
+            with print_lock:
+                print(f"[{repo.label}] {message}")
+
+    def attempt(url):
+        repo.state = "下载中"
+        repo.progress = None
+        repo.mirror = url
+        started = time.perf_counter()
+        ok, output, transfer = run_fetch(git, repo, url)
+        if ok:
+            repo.received_bytes = transfer[0] if transfer else None
+            repo.fetch_seconds = time.perf_counter() - started
+        else:
+            lines = [line for line in output.splitlines() if line]
+            log(f"❌ 从 {url} 拉取失败：{lines[-1] if lines else '未知错误'}")
+            repo.state = "切换镜像"
+        return ok, output, transfer
+
+    if not repo.convert:
+        # 先用一次请求比较本地和远程的提交，已是最新时不拉取
+        repo.state = "检查更新"
+        up_to_date, remote, _ = check_up_to_date(git, repo.path, repo.repo_url, repo.branch, scoreboard=scoreboard)
+        if up_to_date:
+            repo.after = repo.before
+            repo.state = "已是最新"
+            log("已是最新版本，无需拉取")
+            return
+        if up_to_date is False and is_prefetched(git, repo, remote):
+            repo.after = remote
+            repo.state = "已拉取"
+            log("✅ 新版本已在后台预先下载，无需拉取")
+            return
+
+    repo.state = "选择镜像"
+    if repo.convert:
+        prepare_partial_clone(git, repo)
+    result = try_mirrors(repo.repo_url, attempt, scoreboard=scoreboard, log=log)
+    if result is None:
+        repo.state = "失败"
+        repo.error = "所有镜像都拉取失败"
+        return
+    code, after = git_output(git, repo.path, ['rev-parse', f'refs/remotes/origin/{repo.branch}'])
+    if code != 0:
+        repo.state = "失败"
+        repo.error = after
+        return
+    repo.after = after
+    repo.state = "已拉取"
+    log(f"✅ 已从 {result.label} 拉取完成")
+
+
+def progress_loop(repos, stop, print_lock):
+    last = None
+    while not stop.wait(PROGRESS_INTERVAL):
+        text = " | ".join(repo.progress_text() for repo in repos)
+        if text != last:
+            with print_lock:
+                print(f"进度: {text}")
+            last = text
+
+
+def fetch_all(git, repos):
+    """并发拉取所有仓库，返回是否全部成功"""
+    scoreboard = MirrorScoreboard()
+    print_lock = threading.Lock()
+    stop = threading.Event()
+    reporter = threading.Thread(target=progress_loop, args=(repos, stop, print_lock), daemon=True)
+    reporter.start()
+    try:
+        with span("并发拉取所有仓库", cat='git', repos=len(repos)):
+            with ThreadPoolExecutor(max_workers=len(repos)) as executor:
+                for future in [executor.submit(fetch_repository, git, repo, scoreboard, print_lock) for repo in repos]:
+                    future.result()
+    finally:
+        stop.set()
+        reporter.join()
+    return all(repo.fetched for repo in repos)
+
+
+def check_fast_forward(git, repo):
+    """检查本地分支能否快进到拉取的提交，返回错误信息，可以快进时返回None"""
+    if repo.before == repo.after:
+        return None
+    if repo.shallow:
+        return "本地分支有未推送的提交，浅克隆模式下无法快进" if repo.local_commits else None
+    code, _ = git_output(git, repo.path, ['merge-base', '--is-ancestor', 'HEAD', repo.after])
+    if code != 0:
+        return "本地分支有未推送的提交或与远程分叉，无法快进"
+    return None
+
+
+def apply_all(git, repos):
+    """所有仓库都能快进时才依次快进，返回是否全部成功"""
+    problems = [(repo, check_fast_forward(git, repo)) for repo in repos]
+    problems = [(repo, problem) for repo, problem in problems if problem]
+    if problems:
+        for repo, problem in problems:
+            print(f"❌ {repo.label}：{problem}")
+        print("为保持各仓库版本一致，本次未更新任何仓库，请处理后重试（或使用对应的单独更新脚本强制更新）")
+        return False
+    ok = True
+    for repo in repos:
+        if repo.before == repo.after and not repo.convert:
+            repo.state = "已是最新"
+            continue
+        if repo.shallow:
+            # 浅克隆没有完整历史，事先确认没有本地提交后直接移动分支；--keep保留未提交的修改，
+            # 检出时缺少的文件内容通过镜像按需下载
+            args = mirror_config_args(repo, repo.mirror) + ['reset', '--keep', repo.after]
+        else:
+            args = ['merge', '--ff-only', repo.after]
+        if repo.name == 'server':
+            # 按设置同步稀疏检出后再更新，只写入启用的模块，并记录检出耗时和跳过的文件数
+            ensure_profile(git, repo.path)
+            code, output = measured(git, 'update', lambda: git_output(git, repo.path, args), repo.path)
+        else:
+            code, output = git_output(git, repo.path, args)
+        if code == 0:
+            repo.state = "已更新" if repo.before != repo.after else "已是最新"
+            if repo.shallow:
+                compact_shallow_repo(git, repo)
+        else:
+            repo.state = "失败"
+            repo.error = output.splitlines()[-1] if output else "快进失败"
+            ok = False
+    return ok
+
+
+def trim_shallow_refs(git, repo):
+    """
+    删除浅克隆用不到的引用：其他远程分支、标签和ORIG_HEAD
+
+    这些引用仍指向完整历史，只要还在，gc就会保留全部旧对象。本地的其他分支和stash属于用户数据，不删除。
+    """
+    keep = f'refs/remotes/origin/{repo.branch}'
+    code, output = git_output(git, repo.path, ['for-each-ref', '--format=%(refname)', 'refs/remotes/origin', 'refs/tags'])
+    refs = [ref for ref in output.splitlines() if ref and ref != keep] if code == 0 else []
+    refs.append('ORIG_HEAD')
+    # --no-deref：origin/HEAD是指向某个远程分支的符号引用，只删除它本身
+    subprocess.run([git, 'update-ref', '--no-deref', '--stdin'], cwd=repo.path, capture_output=True,
+                   input=''.join(f'delete {ref}\n' for ref in refs), text=True, encoding='utf-8')
+    code, output = git_output(git, repo.path, ['for-each-ref', '--format=%(refname:short)', 'refs/heads'])
+    others = [branch for branch in output.splitlines() if branch and branch != repo.branch] if code == 0 else []
+    if others and repo.convert:
+        print(f"⚠️ {repo.label}的其他本地分支（{'、'.join(others)}）仍保留完整历史，删除后再次更新才能进一步减小体积")
+
+
+def ensure_shallow_file(git, repo):
+    """
+    确保当前提交记录在 .git/shallow 中
+
+    转换时远程提交已在本地（例如完整克隆本来就是最新的），fetch --depth可能不写入shallow文件，
+    此时仓库仍被视为完整克隆，gc会保留全部历史。
+    """
+    code, shallow = git_output(git, repo.path, ['rev-parse', '--is-shallow-repository'])
+    if code == 0 and shallow == 'true':
+        return
+    with open(os.path.join(repo.path, '.git', 'shallow'), 'w', encoding='utf-8') as f:
+        f.write(repo.after + '\n')
+
+
+def compact_shallow_repo(git, repo):
+    """清理浅克隆边界之外的旧提交和文件内容，让磁盘占用保持在浅克隆的大小"""
+    trim_shallow_refs(git, repo)
+    if repo.convert:
+        ensure_shallow_file(git, repo)
+    git_output(git, repo.path, ['reflog', 'expire', '--expire=now', '--all'])
+    git_output(git, repo.path, ['gc', '--prune=now', '--quiet'])
+    if repo.convert:
+        repo.git_size_after = directory_size(os.path.join(repo.path, '.git'))
+
+
+def load_stats():
+    try:
+        with open(STATS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_stats(stats, repos):
+    """记录各仓库本次拉取的传输量，返回记录之前的数据"""
+    previous = json.loads(json.dumps(stats))
+    for repo in repos:
+        if repo.fetched and repo.received_bytes is not None:
+            stats.setdefault(repo.name, {})[repo.mode] = {
+                'received_bytes': repo.received_bytes,
+                'seconds': round(repo.fetch_seconds or 0, 1),
+                'at': time.time(),
+            }
+    try:
+        os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+        with open(STATS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+    except OSError:
+        pass
+    return previous
+
+
+def format_summary(git, repos, previous_stats=None):
+    lines = []
+    for repo in repos:
+        line = f"  {repo.label:<8}{repo.state}"
+        if repo.state == "已更新" and not repo.shallow:
+            code, count = git_output(git, repo.path, ['rev-list', '--count', f'{repo.before}..{repo.after}'])
+            line += f"（{repo.before[:7]} → {repo.after[:7]}，{count} 个提交）" if code == 0 else ""
+        elif repo.state == "已更新":
+            line += f"（{repo.before[:7]} → {repo.after[:7]}，浅克隆）"
+        elif repo.error:
+            line += f"（{repo.error}）"
+        lines.append(line)
+        if repo.fetched:
+            transfer = f"    传输 {_format_bytes(repo.received_bytes)}，用时 {repo.fetch_seconds or 0:.1f}s"
+            other = 'full' if repo.shallow else 'shallow'
+            last = ((previous_stats or {}).get(repo.name) or {}).get(other)
+            if last:
+                transfer += (f"（{'完整模式' if other == 'full' else '浅克隆模式'}上次传输 "
+                             f"{_format_bytes(last['received_bytes'])}，用时 {last['seconds']:.1f}s）")
+            lines.append(transfer)
+        if repo.git_size_before is not None and repo.git_size_after is not None:
+            lines.append(f"    .git占用 {_format_bytes(repo.git_size_before)} → {_format_bytes(repo.git_size_after)}")
+    return lines
+
+
+def check_repositories(root=base_dir):
+    """
+    检查各仓库是否有更新（每个仓库只发一次请求，不拉取、不修改任何文件），供启动器在后台调用
+
+    返回 {仓库名: {'label': 显示名称, 'up_to_date': 是否最新（无法确定时为None）}}。
+    """
+    git = find_git()
+    if git is None:
+        return {}
+    repos = discover_repositories(git, root)
+    scoreboard = MirrorScoreboard()
+    status = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(repos))) as executor:
+        futures = {repo.name: executor.submit(check_up_to_date, git, repo.path, repo.repo_url, repo.branch,
+                                              scoreboard=scoreboard) for repo in repos}
+    for repo in repos:
+        status[repo.name] = {'label': repo.label, 'up_to_date': futures[repo.name].result()[0]}
+    return status
+
+
+def prefetch_repositories(root=base_dir, rate_limit=PREFETCH_RATE_LIMIT, live=None):
+    """
+    检查各仓库是否有更新，并在后台预先下载新的提交（低优先级、限速），不修改工作区和本地分支
+
+    之后运行update_all时发现新提交已在本地，跳过拉取直接快进。仓库逐个下载，限速对总带宽生效。
+    live为dict时写入 {仓库名: RepoUpdate}，供启动器菜单实时显示进度。
+    返回 {仓库名: {'label': 显示名称, 'up_to_date': 是否最新（无法确定时为None）, 'ready': 新提交是否已下载}}。
+    """
+    git = find_git()
+    if git is None:
+        return {}
+    repos = discover_repositories(git, root)
+    if live is not None:
+        live.clear()
+        live.update((repo.name, repo) for repo in repos)
+    scoreboard = MirrorScoreboard()
+    status = {}
+    for repo in repos:
+        def attempt(url):
+            repo.state = "下载中"
+            repo.progress = None
+            return run_fetch(git, repo, url, background=True, rate_limit=rate_limit)
+
+        repo.state = "检查更新"
+        up_to_date, remote, _ = check_up_to_date(git, repo.path, repo.repo_url, repo.branch, scoreboard=scoreboard)
+        if up_to_date is None:
+            repo.state = "无法检查"
+        elif up_to_date:
+            repo.state = "已是最新"
+        elif is_prefetched(git, repo, remote):
+            repo.state = "已预取"
+        else:
+            repo.state = "选择镜像"
+            with span(f"后台预取 {repo.name}", cat='git'):
+                result = try_mirrors(repo.repo_url, attempt, scoreboard=scoreboard, log=lambda message: None)
+            repo.state = "已预取" if result is not None else "预取失败"
+        status[repo.name] = {'label': repo.label, 'up_to_date': up_to_date, 'ready': repo.state == "已预取"}
+    return status
+
+
+def update_all(root=base_dir, shallow=None):
+    """
+    并发拉取所有仓库，全部成功后再统一快进，返回是否成功
+
+    shallow为需要转换为浅克隆的仓库名列表；已经是浅克隆的仓库始终以浅克隆方式拉取。
+    """
+    git = find_git()
+    if git is None:
+        print(f"[ERROR] 未找到Git程序：{EMBEDDED_GIT}")
+        return False
+    repos = discover_repositories(git, root)
+    if not repos:
+        print("未找到需要更新的仓库")
+        return False
+    for repo in repos:
+        if repo.name in (shallow or []) and not repo.shallow:
+            repo.shallow = repo.convert = True
+            print(f"{repo.label}将转换为浅克隆（--depth={SHALLOW_DEPTH} --filter={PARTIAL_FILTER}）")
+    print(f"开始同时更新 {len(repos)} 个仓库：{'、'.join(repo.label for repo in repos)}")
+
+    started = time.perf_counter()
+    if fetch_all(git, repos):
+        print("\n所有仓库拉取完成，开始快进...")
+        ok = apply_all(git, repos)
+    else:
+        print("\n❌ 部分仓库拉取失败，为保持各仓库版本一致，本次未更新任何仓库")
+        ok = False
+    previous_stats = save_stats(load_stats(), repos)
+    print(f"\n更新结果（耗时 {time.perf_counter() - started:.1f}s）：")
+    for line in format_summary(git, repos, previous_stats):
+        print(line)
+    if ok and any(repo.state == "已更新" for repo in repos):
+        plan = ChangePlan()
+        for repo in repos:
+            if repo.state == "已更新":
+                plan.merge(record_update(git, repo.name, repo.path, repo.before, repo.after))
+        print("\n✅ 更新完成！")
+        for line in format_plan(plan):
+            print(line)
+        if plan.builds or plan.restarts:
+            print("请在启动器菜单中选择“应用代码更新”，只重建和重启受影响的服务。")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='同时更新一键包、小智服务端和音乐服务端的代码')
+    parser.add_argument('--root', default=base_dir, help='一键包根目录')
+    parser.add_argument('--shallow', nargs='*', metavar='NAME',
+                        help=f"把仓库转换为浅克隆并保持（不指定时为{'、'.join(SHALLOW_DEFAULT_REPOS)}），"
+                             f"可选：{'、'.join(name for name, *_ in REPOSITORIES)}")
+    args = parser.parse_args()
+
+    shallow = None if args.shallow is None else (args.shallow or SHALLOW_DEFAULT_REPOS)
+    success = update_all(args.root, shallow)
+    sys.exit(0 if success else 1)
@@ -4,15 +4,12 @@ import os
 import sys
 import time
 import wave
-import shutil
-import pyaudio
 import argparse
-import requests
 import threading
-import subprocess
-from datetime import datetime
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+from tracing import span
+from git_mirrors import GITHUB_PROXY_URLS, try_mirrors, check_up_to_date
+from git_progress import run_git
+from step_cache import pip_install_cached
 
 # 没用的功能
 def get_windows_version():
@@ -97,6 +94,8 @@ def print_logo():
 def play_audio_async(file_path):
     """使用线程实现非阻塞播放"""
     def _play():
+        # pyaudio导入较慢，只在真正播放提示音时才导入
+        import pyaudio
         # 打开wav文件
         wf = wave.open(file_path, 'rb')
         
@@ -132,78 +131,52 @@ DEFAULT_REPO_URL = "https://github.com/VanillaNahida/xiaozhi-server-full-module-
 
 def get_github_proxy_urls():
     """返回GitHub镜像代理地址列表"""
-    return [
-        "https://ghfast.top",
-        "https://github.acmsz.top",
-        "https://gh.b52m.cn",
-        "https://gh.nxnow.top",
-        "https://gh.ddlc.top",
-        "https://slink.ltd",
-        "https://cors.isteed.cc",
-        "https://hub.gitmirror.com",
-        "https://sciproxy.com",
-        "https://ghproxy.net",
-        "https://gitclone.com",
-        "https://hub.incept.pw",
-        "https://github.moeyy.xyz",
-        "https://dl.ghpig.top",
-        "https://gh-proxy.com",
-        "https://hub.whtrys.space",
-        "https://gh-proxy.ygxz.in",
-        "https://ghproxy.net"
-    ]
+    return list(GITHUB_PROXY_URLS)
 
 def run_git_command(git_path, args):
-    """执行 Git 命令并实时显示输出"""
-    process = subprocess.Popen(
-        [git_path] + args,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        encoding='utf-8',
-        errors='replace'
-    )
-
-    output_lines = []
-    print(f"\n执行命令: git {' '.join(args)}")
-    print("-" * 60)
-    while True:
-        output = process.stdout.readline()
-        if output == '' and process.poll() is not None:
-            break
-        if output:
-            cleaned = output.strip()
-            print(cleaned)
-            output_lines.append(cleaned)
-    print("-" * 60)
-    return process.poll(), '\n'.join(output_lines)
+    """执行 Git 命令并实时显示输出，返回 (退出码, 最后几行输出)"""
+    code, progress = run_git_progress(git_path, args)
+    return code, progress.output
+
+def run_git_progress(git_path, args):
+    """执行 Git 命令并实时显示输出（传输进度在同一行刷新），返回 (退出码, GitProgress)"""
+    with span(f"git {args[0]}", cat='git', command=' '.join(args)) as s:
+        print(f"\n执行命令: git {' '.join(args)}")
+        print("-" * 60)
+        code, progress = run_git(git_path, args)
+        print("-" * 60)
+        s.set(returncode=code, lines=progress.line_count)
+    return code, progress
     
 def pull_with_proxy(git_path):
     """使用代理更新代码（传参Git所在位置），返回是否成功"""
     # 获取脚本所在目录的上级目录
     script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-    # 获取代理地址列表
-    proxy_list = get_github_proxy_urls()
-    success = False
-    for proxy in proxy_list:
-        # 拼接代理地址
-        new_url = f"{proxy.rstrip('/')}/{DEFAULT_REPO_URL}"
+    def attempt(new_url):
         print(f"\n开始更新一键包，使用代理地址：{new_url}")
         run_git_command(git_path, ["remote", "set-url", "origin", new_url])
         # 更新代码
-        code, output = run_git_command(git_path, ["pull"])
+        code, progress = run_git_progress(git_path, ["pull"])
+        output = progress.output
         if code == 0:
             # 成功提示音
             if os.path.exists(f'{script_dir}/scripts/assets/success.wav'): play_audio_async(f'{script_dir}/scripts/assets/success.wav')
 
             print("\n✅ 一键包更新成功！" if "Already up" not in output else "\n🎉 恭喜，你本地的代码已经是最新版本！")
-            success = True
-            break
-        else:
-            print("\n❌ 更新失败，正在切换代理地址重试！")
-            if os.path.exists(f'{script_dir}/scripts/assets/failed.wav'): play_audio_async(f'{script_dir}/scripts/assets/failed.wav')
-    return success
+            return True, output, progress.transfer
+        print("\n❌ 更新失败，正在切换代理地址重试！")
+        if os.path.exists(f'{script_dir}/scripts/assets/failed.wav'): play_audio_async(f'{script_dir}/scripts/assets/failed.wav')
+        return False, output, progress.transfer
+
+    # 先用一次请求比较本地和远程的提交，已是最新时不改写远程地址、不拉取
+    up_to_date, _, _ = check_up_to_date(git_path, script_dir, DEFAULT_REPO_URL, proxies=get_github_proxy_urls())
+    if up_to_date:
+        print("\n🎉 恭喜，你本地的代码已经是最新版本！")
+        return True
+
+    # 并发探测所有镜像，从响应最快的开始更新
+    return try_mirrors(DEFAULT_REPO_URL, attempt, get_github_proxy_urls()) is not None
 
 def get_pull_mode():
     """选择更新模式"""
@@ -223,13 +196,13 @@ def install_scripts_requirements(script_dir):
     mirror_url = "https://pypi.tuna.tsinghua.edu.cn/simple/"
 
     print("\n开始安装一键包脚本依赖...")
-    result = subprocess.run([
-        sys.executable, "-m", "pip", "install", "-r", requirements_file,
-        "-i", mirror_url,
-        "--trusted-host", "mirrors.aliyun.com"
-    ], cwd=script_dir)
+    # requirements.txt和Python版本未变化时跳过安装
+    success = pip_install_cached(
+        requirements_file, mirror_url, label="一键包脚本依赖",
+        extra_args=["--trusted-host", "mirrors.aliyun.com"], cwd=script_dir
+    )
 
-    if result.returncode == 0:
+    if success:
         print("✅ 一键包脚本依赖安装成功！")
         return True
 
@@ -372,11 +345,7 @@ def update_modules():
     # 更新一键包依赖
     print("正在更新一键包依赖...")
     try:
-        result = subprocess.run([
-            sys.executable, "-m", "pip", "install", "-r", scripts_requirements, "-i", mirror_url
-        ], cwd=script_dir)
-        
-        if result.returncode == 0:
+        if pip_install_cached(scripts_requirements, mirror_url, label="一键包依赖", cwd=script_dir):
             print("✅ 一键包依赖更新成功！")
             play_notification("success")
         else:
@@ -393,11 +362,7 @@ def update_modules():
     # 更新小智服务器依赖
     print("正在更新小智服务器依赖...")
     try:
-        result = subprocess.run([
-            sys.executable, "-m", "pip", "install", "-r", xiaozhi_server_requirements, "-i", mirror_url
-        ], cwd=script_dir)
-        
-        if result.returncode == 0:
+        if pip_install_cached(xiaozhi_server_requirements, mirror_url, label="小智服务器依赖", cwd=script_dir):
             print("✅ 小智服务器依赖更新成功！")
             play_notification("success")
         else:
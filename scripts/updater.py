@@ -5,13 +5,14 @@ import sys
 import time
 import wave
 import shutil
-import pyaudio
-import requests
 import threading
 import subprocess
 from datetime import datetime
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+from tracing import span
+from git_mirrors import GITHUB_PROXY_URLS, try_mirrors, check_up_to_date
+from git_progress import run_git
+from sparse_profile import ensure_profile, measured
+from change_plan import record_update, format_plan
 
 # 没用的功能
 def get_windows_version():
@@ -98,6 +99,8 @@ def print_logo():
 def play_audio_async(file_path):
     """使用线程实现非阻塞播放"""
     def _play():
+        # pyaudio导入较慢，只在真正播放提示音时才导入
+        import pyaudio
         # 打开wav文件
         wf = wave.open(file_path, 'rb')
         
@@ -133,72 +136,69 @@ DEFAULT_REPO_URL = "https://github.com/xinnan-tech/xiaozhi-esp32-server.git"
 
 def get_github_proxy_urls():
     """返回GitHub镜像代理地址列表"""
-    return [
-        "https://ghfast.top",
-        "https://github.acmsz.top",
-        "https://gh.b52m.cn",
-        "https://gh.nxnow.top",
-        "https://gh.ddlc.top",
-        "https://slink.ltd",
-        "https://cors.isteed.cc",
-        "https://hub.gitmirror.com",
-        "https://sciproxy.com",
-        "https://ghproxy.net",
-        "https://gitclone.com",
-        "https://hub.incept.pw",
-        "https://github.moeyy.xyz",
-        "https://dl.ghpig.top",
-        "https://gh-proxy.com",
-        "https://hub.whtrys.space",
-        "https://gh-proxy.ygxz.in",
-        "https://ghproxy.net"
-    ]
+    return list(GITHUB_PROXY_URLS)
 
 def run_git_command(git_path, args, cwd=None):
-    """执行 Git 命令并实时显示输出"""
-    process = subprocess.Popen(
-        [git_path] + args,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        encoding='utf-8',
-        errors='replace',
-        cwd=cwd
-    )
+    """执行 Git 命令并实时显示输出，返回 (退出码, 最后几行输出)"""
+    code, progress = run_git_progress(git_path, args, cwd)
+    return code, progress.output
 
-    output_lines = []
-    print(f"\n执行命令: git {' '.join(args)}")
-    print("-" * 60)
-    while True:
-        output = process.stdout.readline()
-        if output == '' and process.poll() is not None:
-            break
-        if output:
-            cleaned = output.strip()
-            print(cleaned)
-            output_lines.append(cleaned)
-    print("-" * 60)
-    return process.poll(), '\n'.join(output_lines)
+def run_git_progress(git_path, args, cwd=None):
+    """执行 Git 命令并实时显示输出（传输进度在同一行刷新），返回 (退出码, GitProgress)"""
+    with span(f"git {args[0]}", cat='git', command=' '.join(args)) as s:
+        print(f"\n执行命令: git {' '.join(args)}")
+        print("-" * 60)
+        code, progress = run_git(git_path, args, cwd=cwd)
+        print("-" * 60)
+        s.set(returncode=code, lines=progress.line_count)
+    return code, progress
     
 def pull_with_proxy(git_path, src_dir, script_dir):
-    """使用代理拉取更新代码（传参Git所在位置）"""
-    # 获取代理地址列表
-    proxy_list = get_github_proxy_urls()
-    for proxy in proxy_list:
-        # 拼接代理地址
-        new_url = f"{proxy.rstrip('/')}/{DEFAULT_REPO_URL}"
+    """使用代理拉取更新代码（传参Git所在位置），返回是否成功"""
+    def attempt(new_url):
         print(f"\n开始拉取，使用代理地址：{new_url}")
         run_git_command(git_path, ["remote", "set-url", "origin", new_url], cwd=src_dir)
         # 拉取代码
-        code, output = run_git_command(git_path, ["pull"], cwd=src_dir)
+        code, progress = run_git_progress(git_path, ["pull"], cwd=src_dir)
+        output = progress.output
         if code == 0:
             # 成功提示音
             if os.path.exists(f'{script_dir}/scripts/assets/success.wav'): play_audio_async(f'{script_dir}/scripts/assets/success.wav')
-            print("\n✅ 拉取成功，建议更新完成后运行该目录下的一键更新依赖批处理进行依赖更新。" if "Already up" not in output else "\n🎉 恭喜，你本地的代码已经是最新版本！")
-            break
-        else:
-            print("\n❌ 拉取失败，正在切换代理地址重试！")
-            if os.path.exists(f'{script_dir}/scripts/assets/failed.wav'): play_audio_async(f'{script_dir}/scripts/assets/failed.wav')
+            print("\n✅ 拉取成功！" if "Already up" not in output else "\n🎉 恭喜，你本地的代码已经是最新版本！")
+            return True, output, progress.transfer
+        print("\n❌ 拉取失败，正在切换代理地址重试！")
+        if os.path.exists(f'{script_dir}/scripts/assets/failed.wav'): play_audio_async(f'{script_dir}/scripts/assets/failed.wav')
+        return False, output, progress.transfer
+
+    # 先用一次请求比较本地和远程的提交，已是最新时不改写远程地址、不拉取
+    up_to_date, _, _ = check_up_to_date(git_path, src_dir, DEFAULT_REPO_URL, proxies=get_github_proxy_urls())
+    if up_to_date:
+        print("\n🎉 恭喜，你本地的代码已经是最新版本！")
+        return True
+
+    # 并发探测所有镜像，从响应最快的开始拉取
+    if try_mirrors(DEFAULT_REPO_URL, attempt, get_github_proxy_urls()) is None:
+        print("\n❌ 所有镜像均拉取失败，请检查网络后重试")
+        if os.path.exists(f'{script_dir}/scripts/assets/failed.wav'): play_audio_async(f'{script_dir}/scripts/assets/failed.wav')
+        return False
+    return True
+
+def get_head(git_path, cwd):
+    """返回当前HEAD提交，失败时返回None"""
+    result = subprocess.run([git_path, "rev-parse", "HEAD"], cwd=cwd, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def report_changes(git_path, src_dir, before):
+    """对比更新前后的提交，给出需要重建和重启的服务，并记录到待应用的更新计划中"""
+    after = get_head(git_path, src_dir)
+    if before is None or after is None or before == after:
+        return
+    plan = record_update(git_path, 'server', src_dir, before, after)
+    print("\n本次更新：")
+    for line in format_plan(plan):
+        print(line)
+    if plan.builds or plan.restarts:
+        print("请在启动器菜单中选择“应用代码更新”，只重建和重启受影响的服务。")
 
 def get_pull_mode():
     """选择拉取模式"""
@@ -258,6 +258,9 @@ def main():
         return
 
     print(f"当前工作目录：{src_dir}")
+    # 按启动器设置同步稀疏检出（只检出一键包会运行的模块），之后的拉取只写入这些模块
+    ensure_profile(git_path, src_dir)
+    before = get_head(git_path, src_dir)
 
     # 是否使用代理拉取
     use_proxy = input("\n是否设置并使用GitHub代理？（留空默认使用代理直接拉取，若需要进行强制更新操作，请输入N并按下回车）(y/n) ").lower() != 'n'
@@ -267,7 +270,8 @@ def main():
         # 询问是否使用代理
         if use_proxy:
             # 使用代理拉取代码 - 确保在src目录下执行
-            pull_with_proxy(git_path, src_dir, script_dir)
+            if not pull_with_proxy(git_path, src_dir, script_dir):
+                print("⚠️ 代码未更新，可稍后重试，或选择不使用代理直接拉取")
         else:
             reset = input("是否重置为默认地址？(若需要进行强制更新操作，请输入N并按下回车) (y/n): ").lower() == 'y'
             if reset:
@@ -284,7 +288,7 @@ def main():
                 if code == 0:
                     # 成功提示音
                     if os.path.exists(f'{script_dir}/scripts/assets/success.wav'): play_audio_async(f'{script_dir}/scripts/assets/success.wav')
-                    print("\n✅ 拉取成功，建议更新完成后运行该目录下的一键更新依赖批处理进行依赖更新。" if "Already up" not in output else "\n🎉 恭喜，你本地的代码已经是最新版本！")
+                    print("\n✅ 拉取成功！" if "Already up" not in output else "\n🎉 恭喜，你本地的代码已经是最新版本！")
 
                 else:
                     print("\n❌ 拉取失败，请检查日志")
@@ -299,7 +303,7 @@ def main():
                     
                     print("\n正在强制更新小智服务端...")
                     run_git_command(git_path, ["fetch", "--all"], cwd=src_dir)
-                    run_git_command(git_path, ["reset", "--hard", "origin/main"], cwd=src_dir)
+                    measured(git_path, 'reset', lambda: run_git_command(git_path, ["reset", "--hard", "origin/main"], cwd=src_dir), src_dir)
                     # 成功提示音
                     if os.path.exists(f'{script_dir}/scripts/assets/success.wav'): play_audio_async(f'{script_dir}/scripts/assets/success.wav')
                     print("\n🎉 强制更新完成！")
@@ -312,6 +316,7 @@ def main():
         print("\n当前远程地址：")
         run_git_command(git_path, ["remote", "-v"], cwd=src_dir)
 
+    report_changes(git_path, src_dir, before)
     print("\n操作完成！")
     time.sleep(2)
     # os.system("cls")
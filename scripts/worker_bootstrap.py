@@ -0,0 +1,44 @@
+"""
+以指定端口启动一个小智AI服务器工作进程（由ws_balancer.py调用）
+
+xiaozhi-server从配置中读取server.port和server.http_port，多个工作进程不能共用端口，
+所以在运行app.py之前替换配置加载函数，只覆盖这两个端口，其余配置保持不变。
+"""
+import os
+import sys
+import runpy
+import argparse
+
+parser = argparse.ArgumentParser(description='小智AI服务器工作进程')
+parser.add_argument('--ws-port', type=int, required=True, help='工作进程的WebSocket端口')
+parser.add_argument('--http-port', type=int, required=True, help='工作进程的HTTP端口')
+parser.add_argument('--server-dir', default=os.getcwd(), help='xiaozhi-server目录')
+args = parser.parse_args()
+
+os.chdir(args.server_dir)
+sys.path.insert(0, args.server_dir)
+
+import config.config_loader as config_loader
+
+_original_load_config = config_loader.load_config
+
+
+def load_config(*load_args, **load_kwargs):
+    config = _original_load_config(*load_args, **load_kwargs)
+    server = config.setdefault('server', {})
+    server['port'] = args.ws_port
+    server['http_port'] = args.http_port
+    return config
+
+
+config_loader.load_config = load_config
+# app.py通过config.settings间接导入load_config，同样需要替换
+try:
+    import config.settings as config_settings
+    if hasattr(config_settings, 'load_config'):
+        config_settings.load_config = load_config
+except ImportError:
+    pass
+
+sys.argv = [os.path.join(args.server_dir, 'app.py')]
+runpy.run_path(sys.argv[0], run_name='__main__')
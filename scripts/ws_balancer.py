@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import hashlib
+import argparse
+from urllib.parse import urlsplit, parse_qs
+from supervisor import Supervisor
+from launcher_settings import load_settings
+from resource_profiles import get_profile
+
+# 获取当前脚本所在目录的父目录作为基础路径
+base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SERVER_DIR = os.path.join(base_dir, 'src', 'main', 'xiaozhi-server')
+BOOTSTRAP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker_bootstrap.py')
+
+# 对外端口（与单进程模式相同，设备和OTA地址无需修改）
+PUBLIC_WS_PORT = 8000
+PUBLIC_HTTP_PORT = 8003
+# 工作进程端口从这里开始，第i个工作进程使用 BASE+2(i-1) 和 BASE+2(i-1)+1
+WORKER_BASE_PORT = 8100
+# 工作进程上限：每个工作进程都会完整加载模型，内存占用随数量线性增长
+MAX_WORKERS = 8
+# 请求头的最大长度
+MAX_HEADER_BYTES = 64 * 1024
+# 排空中的工作进程在该时间后即使仍有连接也会被停止（秒）
+DRAIN_TIMEOUT = 600
+HEALTH_INTERVAL = 1.0
+
+
+def default_worker_count():
+    """按CPU核心数确定工作进程数：每两个核心一个，至少1个，最多MAX_WORKERS个"""
+    return max(1, min((os.cpu_count() or 1) // 2, MAX_WORKERS))
+
+
+def resolve_worker_count(value):
+    """把设置中的值（数字或"auto"）转换为工作进程数"""
+    if value in (None, 'auto'):
+        return default_worker_count()
+    try:
+        return max(1, min(int(value), MAX_WORKERS))
+    except (TypeError, ValueError):
+        return 1
+
+
+def rendezvous_pick(key, workers):
+    """最高随机权重（rendezvous）哈希：同一个设备总是落到同一个工作进程，增减工作进程时只有少量设备需要迁移"""
+    return max(workers, key=lambda worker: hashlib.sha1(f"{key}|{worker.name}".encode('utf-8')).digest())
+
+
+class Worker:
+    """一个xiaozhi-server工作进程"""
+
+    def __init__(self, index):
+        self.index = index
+        self.name = f"xiaozhi_worker_{index}"
+        self.ws_port = WORKER_BASE_PORT + 2 * (index - 1)
+        self.http_port = self.ws_port + 1
+        self.ready = False
+        self.draining = False
+        self.drain_started = None
+        self.connections = 0
+        self.total_connections = 0
+
+    def port_for(self, kind):
+        return self.ws_port if kind == 'ws' else self.http_port
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'ws_port': self.ws_port,
+            'http_port': self.http_port,
+            'ready': self.ready,
+            'draining': self.draining,
+            'connections': self.connections,
+            'total_connections': self.total_connections,
+        }
+
+
+def _parse_request_head(head):
+    """解析HTTP请求头，返回 (路径, {小写头部名: 值})"""
+    lines = head.decode('latin-1').split('\r\n')
+    parts = lines[0].split(' ')
+    target = parts[1] if len(parts) > 1 else '/'
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return target, headers
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(64 * 1024)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        writer.close()
+
+
+class Balancer:
+    """
+    小智AI服务器的本地负载均衡器
+
+    在对外的WebSocket和HTTP端口上接收连接，读取请求头中的device-id，
+    按rendezvous哈希把同一设备固定分配到同一个工作进程，然后在两个方向上原样转发字节。
+    工作进程由守护器启动并在崩溃后自动重启；缩容时工作进程先排空（不再分配新连接），
+    现有连接全部结束后才停止。
+    """
+
+    def __init__(self, workers, server_dir=SERVER_DIR, host='0.0.0.0',
+                 ws_port=PUBLIC_WS_PORT, http_port=PUBLIC_HTTP_PORT, python=sys.executable, profile=None):
+        self.target_workers = workers
+        self.server_dir = server_dir
+        self.host = host
+        self.ws_port = ws_port
+        self.http_port = http_port
+        self.python = python
+        self.profile = profile
+        self.supervisor = Supervisor()
+        self.workers = {}
+        self._next_index = 1
+
+    def active_workers(self):
+        return [worker for worker in self.workers.values() if not worker.draining]
+
+    def add_worker(self):
+        worker = Worker(self._next_index)
+        self._next_index += 1
+        cmd = (f'"{self.python}" "{BOOTSTRAP_SCRIPT}" --ws-port {worker.ws_port} '
+               f'--http-port {worker.http_port} --server-dir "{self.server_dir}"')
+        self.supervisor.register(worker.name, cmd, cwd=self.server_dir, label=f"小智AI工作进程{worker.index}",
+                                 profile=self.profile)
+        self.workers[worker.name] = worker
+        self.supervisor.start(worker.name)
+        print(f"已启动工作进程 {worker.name}（WebSocket {worker.ws_port}，HTTP {worker.http_port}）")
+        return worker
+
+    def drain_worker(self, worker):
+        """不再给工作进程分配新连接，现有连接结束后停止它"""
+        if worker.draining:
+            return
+        worker.draining = True
+        worker.drain_started = time.time()
+        print(f"工作进程 {worker.name} 开始排空，当前连接数 {worker.connections}")
+
+    def scale(self, count):
+        """调整工作进程数量，缩容时从编号最大的工作进程开始排空"""
+        count = resolve_worker_count(count)
+        self.target_workers = count
+        active = sorted(self.active_workers(), key=lambda worker: worker.index)
+        for worker in active[count:]:
+            self.drain_worker(worker)
+        for _ in range(count - len(active)):
+            self.add_worker()
+
+    async def _port_open(self, port):
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), 1.0)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    async def health_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            for worker in list(self.workers.values()):
+                worker.ready = await self._port_open(worker.ws_port)
+                if worker.draining and (worker.connections == 0 or time.time() - worker.drain_started > DRAIN_TIMEOUT):
+                    # 停止进程会阻塞等待，放到线程池中执行
+                    await loop.run_in_executor(None, self.supervisor.stop, worker.name)
+                    del self.workers[worker.name]
+                    print(f"工作进程 {worker.name} 已排空并停止")
+            await asyncio.sleep(HEALTH_INTERVAL)
+
+    def pick_worker(self, key):
+        candidates = [worker for worker in self.active_workers() if worker.ready]
+        if not candidates:
+            return None
+        return rendezvous_pick(key, candidates)
+
+    async def handle(self, reader, writer, kind):
+        peer = writer.get_extra_info('peername') or ('', 0)
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        target, headers = _parse_request_head(head)
+        url = urlsplit(target)
+
+        if url.path.startswith('/balancer/') and peer[0] in ('127.0.0.1', '::1'):
+            await self._handle_control(url, writer)
+            return
+
+        # 设备ID优先取请求头，浏览器等无法设置请求头的客户端通过查询参数传递；都没有时按客户端IP分配
+        key = headers.get('device-id') or parse_qs(url.query).get('device-id', [None])[0] or peer[0]
+        worker = self.pick_worker(key)
+        if worker is None:
+            writer.write(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+            writer.close()
+            return
+
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection('127.0.0.1', worker.port_for(kind))
+        except OSError:
+            worker.ready = False
+            writer.write(b'HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            await writer.drain()
+            writer.close()
+            return
+
+        worker.connections += 1
+        worker.total_connections += 1
+        try:
+            upstream_writer.write(head)
+            await asyncio.gather(_pipe(reader, upstream_writer), _pipe(upstream_reader, writer))
+        finally:
+            worker.connections -= 1
+
+    async def _handle_control(self, url, writer):
+        """本机管理接口：GET /balancer/status 查看状态，GET /balancer/scale?workers=N 调整工作进程数"""
+        if url.path == '/balancer/scale':
+            self.scale(parse_qs(url.query).get('workers', [self.target_workers])[0])
+        body = json.dumps({
+            'target_workers': self.target_workers,
+            'workers': [worker.to_dict() for worker in self.workers.values()],
+        }, ensure_ascii=False).encode('utf-8')
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=utf-8\r\n'
+                     b'Content-Length: %d\r\nConnection: close\r\n\r\n' % len(body) + body)
+        await writer.drain()
+        writer.close()
+
+    async def run(self):
+        for _ in range(self.target_workers):
+            self.add_worker()
+        health = asyncio.create_task(self.health_loop())
+
+        # 至少一个工作进程就绪后才开始监听对外端口，使启动器的就绪探测反映真实可用状态
+        print("等待工作进程就绪...")
+        while not any(worker.ready for worker in self.workers.values()):
+            await asyncio.sleep(0.2)
+
+        servers = []
+        for kind, port in (('ws', self.ws_port), ('http', self.http_port)):
+            server = await asyncio.start_server(
+                lambda r, w, kind=kind: self.handle(r, w, kind), self.host, port, limit=MAX_HEADER_BYTES
+            )
+            servers.append(server)
+        print(f"负载均衡器已启动: WebSocket {self.ws_port}，HTTP {self.http_port}，工作进程 {self.target_workers} 个")
+        try:
+            await asyncio.gather(health, *(server.serve_forever() for server in servers))
+        finally:
+            for server in servers:
+                server.close()
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='小智AI服务器多进程负载均衡器')
+    parser.add_argument('--workers', default='auto', help="工作进程数，默认auto（按CPU核心数）")
+    parser.add_argument('--server-dir', default=SERVER_DIR, help='xiaozhi-server目录')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--ws-port', type=int, default=PUBLIC_WS_PORT)
+    parser.add_argument('--http-port', type=int, default=PUBLIC_HTTP_PORT)
+    args = parser.parse_args()
+
+    settings = load_settings()
+    profile = get_profile('xiaozhi_server', settings['resource_profiles']) if settings['resource_profiles_enabled'] else None
+    balancer = Balancer(resolve_worker_count(args.workers), args.server_dir, args.host, args.ws_port, args.http_port,
+                        profile=profile)
+    # 被启动器停止时一并停止所有工作进程（POSIX下工作进程位于独立的进程组中）
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        asyncio.run(balancer.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("正在停止所有工作进程...")
+        balancer.supervisor.stop_all()
@@ -0,0 +1,95 @@
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import tracing
+import update_all
+
+GIT = shutil.which('git')
+pytestmark = pytest.mark.skipif(GIT is None, reason="需要git")
+
+
+def git(cwd, *args):
+    env = dict(os.environ, GIT_AUTHOR_NAME='test', GIT_AUTHOR_EMAIL='test@example.com',
+               GIT_COMMITTER_NAME='test', GIT_COMMITTER_EMAIL='test@example.com')
+    result = subprocess.run([GIT] + list(args), cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+def commit(repo, name, content):
+    with open(os.path.join(repo, name), 'w', encoding='utf-8') as f:
+        f.write(content)
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', name)
+
+
+def object_count(repo):
+    stats = dict(line.split(': ') for line in git(repo, 'count-objects', '-v').splitlines())
+    return int(stats['count']) + int(stats['in-pack'])
+
+
+@pytest.fixture
+def full_clone(tmp_path, monkeypatch):
+    """上游有较长的历史、标签和另一个分支，本地是它的完整克隆，之后上游又有一个新提交"""
+    monkeypatch.setattr(tracing, 'TRACE_DIR', str(tmp_path / 'trace'))
+    monkeypatch.setattr(tracing, 'EVENTS_FILE', str(tmp_path / 'trace' / 'events.jsonl'))
+    upstream = str(tmp_path / 'upstream')
+    os.makedirs(upstream)
+    git(upstream, 'init', '-q', '-b', 'main')
+    git(upstream, 'config', 'uploadpack.allowFilter', 'true')
+    for i in range(30):
+        commit(upstream, 'data.txt', f"version {i}\n" * 200)
+        if i % 10 == 0:
+            git(upstream, 'tag', f'v{i}')
+    git(upstream, 'checkout', '-q', '-b', 'dev')
+    for i in range(10):
+        commit(upstream, 'dev.txt', f"dev {i}\n" * 200)
+    git(upstream, 'checkout', '-q', 'main')
+    local = str(tmp_path / 'local')
+    git(str(tmp_path), 'clone', '-q', 'file://' + upstream, local)
+
+    repo = update_all.RepoUpdate('music', "测试仓库", local, None)
+    repo.repo_url = 'file://' + upstream
+    repo.branch = 'main'
+    repo.before = git(local, 'rev-parse', 'HEAD')
+    repo.shallow = repo.convert = True
+    return upstream, repo
+
+
+def convert(repo):
+    update_all.prepare_partial_clone(GIT, repo)
+    ok, output, _ = update_all.run_fetch(GIT, repo, repo.repo_url)
+    assert ok, output
+    repo.after = git(repo.path, 'rev-parse', f'refs/remotes/origin/{repo.branch}')
+    assert update_all.apply_all(GIT, [repo])
+
+
+def test_convert_full_clone_drops_history(full_clone):
+    upstream, repo = full_clone
+    commit(upstream, 'data.txt', "latest\n")
+    before = object_count(repo.path)
+
+    convert(repo)
+
+    assert git(repo.path, 'rev-parse', '--is-shallow-repository') == 'true'
+    assert git(repo.path, 'rev-parse', 'HEAD') == git(upstream, 'rev-parse', 'HEAD')
+    assert git(repo.path, 'tag') == ''
+    assert git(repo.path, 'for-each-ref', '--format=%(refname)', 'refs/remotes') == 'refs/remotes/origin/main'
+    # 只剩最新提交及其目录树（文件内容按需下载）
+    assert object_count(repo.path) < before / 10
+
+
+def test_convert_up_to_date_clone_becomes_shallow(full_clone):
+    _, repo = full_clone
+    before = object_count(repo.path)
+
+    convert(repo)
+
+    assert repo.after == repo.before
+    assert git(repo.path, 'rev-parse', '--is-shallow-repository') == 'true'
+    assert object_count(repo.path) < before / 10